@@ -6,55 +6,146 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 from datetime import timedelta
+from typing import Any, Dict, Mapping, Optional
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.components.persistent_notification import create
 
-from .evse_client import get_evse_client, EVSEClient
+from .evse_client import DISCOVERY_TIMEOUT, get_evse_client, EVSEClient
+from .protocol.cache import CACHE_VERSION, DEFAULT_CACHE_TTL, DEFAULT_SAVE_DELAY, DiscoveryCache
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "evsemasterudp"
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BUTTON, Platform.NUMBER]
 
- # Update interval (in seconds)
+ # Update interval (in seconds), only a safety net: updates are pushed by the client
 UPDATE_INTERVAL = timedelta(seconds=60)
+# Minimum delay between two pushed updates of the same EVSE (in seconds)
+PUSH_DEBOUNCE = 0.5
+
+class StoreDiscoveryCache(DiscoveryCache):
+    """Discovery cache kept in Home Assistant's storage (.storage/evsemasterudp.discovery)
+
+    Store does the reads and writes in the executor and writes pending
+    updates when Home Assistant stops.
+    """
+
+    def __init__(self, hass: HomeAssistant, ttl: float = DEFAULT_CACHE_TTL,
+                 save_delay: float = DEFAULT_SAVE_DELAY) -> None:
+        self._store: Store[Dict[str, Any]] = Store(hass, CACHE_VERSION, f"{DOMAIN}.discovery", atomic_writes=True)
+        super().__init__(self._store.path, ttl, save_delay)
+        self._dirty = False
+
+    async def async_load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the stored entries, dropping expired ones"""
+        data = await self._store.async_load()
+        if data is None:
+            return {}
+        return self._restore({**data, 'version': CACHE_VERSION})
+
+    def schedule_save(self) -> None:
+        """Write the entries after save_delay (updates in between are grouped)"""
+        self._dirty = True
+        self._store.async_delay_save(self._stored_data, self.save_delay)
+
+    def _stored_data(self) -> Dict[str, Any]:
+        self._dirty = False
+        return {'evses': self._snapshot()['evses']}
+
+    async def async_flush(self) -> None:
+        """Write pending updates now"""
+        if self._dirty:
+            await self._store.async_save(self._stored_data())
 
 class EVSEDataUpdateCoordinator(DataUpdateCoordinator):
-    """Coordinator to update EVSE data"""
+    """Coordinator to update the data of one EVSE
 
-    def __init__(self, hass: HomeAssistant, client: EVSEClient) -> None:
+    data is the read-only snapshot of the EVSE (see EVSEClient.get_evse),
+    so an update only wakes the entities of that EVSE.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: EVSEClient, serial: str,
+                 push_debounce: float = PUSH_DEBOUNCE) -> None:
         """Initialize the coordinator"""
         super().__init__(
             hass,
             _LOGGER,
-            name=DOMAIN,
+            name=f"{DOMAIN}_{serial}",
             update_interval=UPDATE_INTERVAL,
         )
         self.client = client
+        self.serial = serial
+        # First change pushed immediately, then at most one push per window
+        self._push_debouncer = Debouncer(
+            hass, _LOGGER, cooldown=push_debounce, immediate=True, function=self._async_push,
+        )
+        # Arrival time of the oldest frame not yet pushed
+        self._pending_since: Optional[float] = None
+        # Frame arrival -> entity state write latency of the pushes (seconds)
+        self.push_latency: Dict[str, float] = {"count": 0, "last": 0.0, "max": 0.0, "total": 0.0}
 
     async def _async_update_data(self):
         """Fetch EVSE data"""
         try:
-            # Retrieve all EVSEs
-            evses = self.client.get_all_evses()
+            evse = self.client.get_evse(self.serial)
 
-            if not evses:
-                _LOGGER.debug("No EVSE found during update")
+            if evse is None:
+                _LOGGER.debug(f"EVSE {self.serial} not found during update")
                 return {}
 
-            _LOGGER.debug(f"EVSE data updated: {len(evses)} stations found")
-            return evses
+            return evse
             
         except Exception as err:
             _LOGGER.warning(f"Error updating EVSE data: {err}")
             # Return previous data instead of raising exception
             return self.data if hasattr(self, 'data') and self.data else {}
 
+    async def async_handle_evse_event(self, serial: str, data: Mapping[str, Any], changes: Optional[Dict[str, Any]]) -> None:
+        """EVSEClient callback: push the new data of the EVSE (debounced)"""
+        if self._pending_since is None:
+            self._pending_since = self.client.get_last_frame_time(serial) or time.monotonic()
+        await self._push_debouncer.async_call()
+
+    @callback
+    def _async_push(self) -> None:
+        """Publish the current snapshot of the EVSE to its entities"""
+        arrival, self._pending_since = self._pending_since, None
+        evse = self.client.get_evse(self.serial)
+        if evse is None:
+            return
+        # Listeners write their state synchronously in async_set_updated_data
+        self.async_set_updated_data(evse)
+        if arrival is not None:
+            self._record_push_latency(time.monotonic() - arrival)
+
+    def _record_push_latency(self, latency: float) -> None:
+        stats = self.push_latency
+        stats["count"] += 1
+        stats["last"] = latency
+        stats["max"] = max(stats["max"], latency)
+        stats["total"] += latency
+        _LOGGER.debug(f"EVSE {self.serial} update pushed {latency * 1000:.1f} ms after frame arrival")
+
+    @property
+    def average_push_latency(self) -> float:
+        """Average frame arrival -> entity state write latency (seconds)"""
+        count = self.push_latency["count"]
+        return self.push_latency["total"] / count if count else 0.0
+
+    @callback
+    def async_shutdown_push(self) -> None:
+        """Cancel the pending push"""
+        self._push_debouncer.async_cancel()
+        self._pending_since = None
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up the EVSE integration from a config entry"""
     
@@ -70,36 +161,41 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     # Start the client if not already running
     if not client.running:
+        # Known EVSEs are restored at start, without waiting for their broadcast
+        client.set_discovery_cache(StoreDiscoveryCache(hass))
         try:
             await client.start()
         except Exception as err:
             _LOGGER.error(f"Unable to start EVSE client: {err}")
             return False
     
-    # Wait a bit to discover EVSEs
-    await asyncio.sleep(3)
-    
-    # Try to connect to the configured EVSE
+    # Try to connect to the configured EVSE as soon as it has been discovered
     if serial and password:
-        # Try login several times as the EVSE may not be immediately available
-        for attempt in range(3):
-            success = await client.login(serial, password)
-            if success:
-                _LOGGER.info(f"Successfully connected to EVSE {serial}")
-                break
-            else:
-                _LOGGER.warning(f"Connection attempt {attempt + 1}/3 to EVSE {serial} failed")
-                if attempt < 2:  # Wait before next attempt
-                    await asyncio.sleep(2)
+        if not await client.wait_for_evse(serial):
+            _LOGGER.warning(f"EVSE {serial} not discovered after {DISCOVERY_TIMEOUT:.0f} seconds")
         else:
-            _LOGGER.warning(f"Unable to connect to EVSE {serial} after 3 attempts")
+            # Try login several times as the EVSE may not answer the first request
+            for attempt in range(3):
+                success = await client.login(serial, password)
+                if success:
+                    _LOGGER.info(f"Successfully connected to EVSE {serial}")
+                    break
+                else:
+                    _LOGGER.warning(f"Connection attempt {attempt + 1}/3 to EVSE {serial} failed")
+                    if attempt < 2:  # Wait before next attempt
+                        await asyncio.sleep(2)
+            else:
+                _LOGGER.warning(f"Unable to connect to EVSE {serial} after 3 attempts")
     
     # Create the data coordinator
-    coordinator = EVSEDataUpdateCoordinator(hass, client)
+    coordinator = EVSEDataUpdateCoordinator(hass, client, serial)
 
     # First data refresh
     await coordinator.async_config_entry_first_refresh()
 
+    # Push updates as soon as the client receives them
+    client.add_callback(f"coordinator_{entry.entry_id}", coordinator.async_handle_evse_event, serial=serial)
+
     # Store the coordinator in hass.data
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
@@ -111,7 +207,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         "base_name": entry.data.get("name") or "EVSEMaster",
     }
 
-    # Set up platforms (sensor, switch, number)
+    # Set up platforms (sensor, button, number)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     # Notification recommending a restart after installation/update
@@ -134,6 +230,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok:
         # Clean up data
         data = hass.data[DOMAIN].pop(entry.entry_id)
+        data["client"].remove_callback(f"coordinator_{entry.entry_id}")
+        data["coordinator"].async_shutdown_push()
 
         # Stop the client if there are no other entries
         if not hass.data[DOMAIN]:
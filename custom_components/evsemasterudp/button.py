@@ -5,9 +5,9 @@ from homeassistant.components.button import ButtonEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import DOMAIN
+from .entity import EVSEEntity
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -27,22 +27,10 @@ async def async_setup_entry(
     async_add_entities(entities)
 
 
-class EVSEBaseButton(CoordinatorEntity, ButtonEntity):
+class EVSEBaseButton(EVSEEntity, ButtonEntity):
     def __init__(self, coordinator, client, serial: str, base_name: str):
-        super().__init__(coordinator)
+        super().__init__(coordinator, serial, base_name)
         self.client = client
-        self.serial = serial
-        self.base_name = base_name
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, serial)},
-            "name": base_name,
-            "manufacturer": "Oniric75",
-            "model": "EVSE Master UDP",
-        }
-
-    @property
-    def evse_data(self):
-        return self.coordinator.data.get(self.serial, {})
 
     @property
     def available(self) -> bool:
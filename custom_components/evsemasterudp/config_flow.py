@@ -1,6 +1,7 @@
 """Config flow for the EVSE Master UDP integration"""
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any
 
@@ -11,7 +12,7 @@ from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
-from .evse_client import get_evse_client
+from .evse_client import DISCOVERY_TIMEOUT, get_evse_client
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -77,20 +78,11 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
             raise CannotConnect
     
     try:
-    # Wait longer to discover EVSEs (like test_full.py)
-        import asyncio
-        await asyncio.sleep(5)
-        
-    # Check if EVSE is found - Retry on failure
-        evse = client.get_evse(serial)
-        if not evse:
-            # Retry after 2 additional seconds
-            _LOGGER.warning(f"EVSE {serial} not found, retrying...")
-            await asyncio.sleep(2)
-            evse = client.get_evse(serial)
+    # Wait for the EVSE broadcast (returns as soon as it has been received)
+        evse = await client.wait_for_evse(serial)
             
         if not evse:
-            _LOGGER.error(f"EVSE {serial} not found after 7 seconds")
+            _LOGGER.error(f"EVSE {serial} not found after {DISCOVERY_TIMEOUT:.0f} seconds")
             raise CannotConnect
         
         _LOGGER.info(f"EVSE {serial} found, attempting connection...")
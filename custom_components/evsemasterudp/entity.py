@@ -0,0 +1,52 @@
+"""Base entity for the EVSE EmProto integration"""
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import DOMAIN
+
+class EVSEEntity(CoordinatorEntity):
+    """Entity reading the data of one EVSE from its coordinator
+
+    A coordinator update only writes the state when the entity's own
+    state, attributes or availability changed.
+    """
+
+    def __init__(self, coordinator, serial: str, base_name: str):
+        super().__init__(coordinator)
+        self.serial = serial
+        self.base_name = base_name
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, serial)},
+            "name": base_name,
+            "manufacturer": "Oniric75",
+            "model": "EVSE Master UDP",
+        }
+        # What was last written to the state machine
+        self._written_state: tuple | None = None
+
+    @property
+    def evse_data(self) -> Mapping[str, Any]:
+        """Get EVSE data"""
+        return self.coordinator.data or {}
+
+    def _state_signature(self) -> tuple:
+        """Everything async_write_ha_state would write for this entity"""
+        return (self.available, self.state, self.extra_state_attributes)
+
+    async def async_added_to_hass(self) -> None:
+        """The platform writes the initial state right after this call"""
+        await super().async_added_to_hass()
+        self._written_state = self._state_signature()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if it changed"""
+        signature = self._state_signature()
+        if signature == self._written_state:
+            return
+        self._written_state = signature
+        self.async_write_ha_state()
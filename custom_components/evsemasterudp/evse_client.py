@@ -3,13 +3,53 @@ EVSE client for Home Assistant
 """
 import asyncio
 import logging
-from typing import Optional, Dict, Any, Callable
+import time
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Awaitable, Callable, Iterable, Mapping, Tuple, Union
 from datetime import datetime, timedelta
 
 from .protocol import Communicator, EVSE, get_communicator
+from .protocol.cache import DEFAULT_CACHE_TTL, DiscoveryCache
+from .protocol.callbacks import CallbackRegistry
+from .protocol.communicator import CONFIRM_ATTEMPTS, CONFIRM_TIMEOUT
 
 _LOGGER = logging.getLogger(__name__)
 
+# Maximum wait for the first datagram of an EVSE (in seconds)
+DISCOVERY_TIMEOUT = 7.0
+# Fleet commands: targets handled at the same time (stops: frames being sent),
+# and maximum wait per target
+# (in seconds): the whole retransmission schedule of a confirmed command
+# (sends at 0, 1, 3, 7 s, given up at 15 s) plus a margin
+FLEET_CONCURRENCY = 8
+FLEET_TIMEOUT = CONFIRM_TIMEOUT * (2 ** CONFIRM_ATTEMPTS - 1) + 1.0
+# Protocol stats of an EVSE are reused for this long (the diagnostic
+# sensors of one EVSE are polled together) (in seconds)
+PROTOCOL_STATS_MAX_AGE = 1.0
+
+# Dictionary keys of the EVSEState / EVSECurrentCharge fields
+STATE_KEYS = {
+    'current_power': 'current_power',
+    'l1_voltage': 'voltage_l1',
+    'l2_voltage': 'voltage_l2',
+    'l3_voltage': 'voltage_l3',
+    'l1_electricity': 'current_l1',
+    'l2_electricity': 'current_l2',
+    'l3_electricity': 'current_l3',
+    'inner_temp': 'temperature_inner',
+    'outer_temp': 'temperature_outer',
+    'gun_state': 'gun_state',
+    'output_state': 'output_state',
+    'errors': 'errors',
+}
+CHARGE_KEYS = {
+    'charge_kwh': 'charge_kwh',
+    'charge_id': 'charge_id',
+    'start_date': 'start_date',
+    'duration_seconds': 'duration_seconds',
+    'current_state': 'charge_state',
+}
+
 class EVSEClient:
     """Client for communicating with EVSE stations via UDP"""
     
@@ -17,7 +57,15 @@ class EVSEClient:
         self.port = port
         self.communicator = get_communicator()
         self.running = False
-        self.callbacks: Dict[str, Callable] = {}
+        self.callbacks = CallbackRegistry()
+        # Snapshot of each EVSE with the key it was built for (see _snapshot)
+        self._snapshots: Dict[str, Tuple[tuple, Mapping[str, Any]]] = {}
+        # Stops of stop_many() not sent yet: set-current commands wait for them
+        self._stops_sent = asyncio.Event()
+        self._stops_sent.set()
+        self._stops_unsent = 0
+        # Protocol stats of each EVSE with the monotonic time they were read
+        self._protocol_stats: Dict[str, Dict[str, Any]] = {}
         
     # Protection against rapid changes
         self._fast_change_protection: Dict[str, int] = {}  # serial -> minutes
@@ -41,6 +89,18 @@ class EVSEClient:
             _LOGGER.error(f"Error while starting EVSE client: {e}")
             raise
     
+    def set_discovery_cache(self, cache: Union[str, DiscoveryCache], ttl: float = DEFAULT_CACHE_TTL):
+        """Persist the discovered EVSEs, restored when the client starts
+        
+        cache is the path of a JSON file or a DiscoveryCache (ttl is then
+        ignored). Ignored if the communicator is already running or has a cache.
+        """
+        if self.running or self.communicator.discovery_cache is not None:
+            return
+        if isinstance(cache, str):
+            cache = DiscoveryCache(cache, ttl)
+        self.communicator.discovery_cache = cache
+    
     async def stop(self):
         """Stop the client"""
         self.running = False
@@ -48,19 +108,43 @@ class EVSEClient:
         await self.communicator.stop()
         _LOGGER.info("EVSE client stopped")
     
-    async def _handle_evse_event(self, event: str, evse: EVSE):
+    async def _handle_evse_event(self, event: str, evse: EVSE, changes: Optional[Dict[str, Any]] = None):
         """Handle EVSE events"""
+        serial = evse.info.serial
+        callbacks = self.callbacks.select(event, serial)
+        if not callbacks:
+            return
         # Convert EVSE to Home Assistant compatible format
-        evse_data = self._evse_to_dict(evse)
+        evse_data = self._snapshot(evse)
+        # Changed fields under their dictionary keys (None: anything may have changed)
+        if changes is not None:
+            keys = CHARGE_KEYS if event in ('evse_charge_status_changed', 'evse_charge_changed') else STATE_KEYS
+            changes = {keys[name]: evse_data[keys[name]] for name in changes if name in keys}
+            if not changes:
+                return
         
         # Notify our callbacks
-        for callback in self.callbacks.values():
-            try:
-                await callback(evse.info.serial, evse_data)
-            except Exception as e:
-                _LOGGER.error(f"Error in callback: {e}")
+        await self.callbacks.dispatch(callbacks, serial, evse_data, changes)
+    
+    def _snapshot(self, evse: EVSE) -> Mapping[str, Any]:
+        """Read-only dictionary of an EVSE, rebuilt only when it changed
+        
+        The key holds the EVSE version, whether it is online, the polling
+        interval recorded when its status polling was last scheduled (it
+        follows the meta state and the configured intervals) and last_seen
+        floored to that interval: an EVSE that keeps talking without
+        changing gets a fresh last_seen once per interval.
+        """
+        interval = evse.poll_interval or self.communicator.get_poll_interval(evse)
+        key = (evse.version, evse.is_online(), interval, evse.last_seen.timestamp() // interval)
+        cached = self._snapshots.get(evse.info.serial)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        snapshot = MappingProxyType(self._evse_to_dict(evse, interval))
+        self._snapshots[evse.info.serial] = (key, snapshot)
+        return snapshot
     
-    def _evse_to_dict(self, evse: EVSE) -> Dict[str, Any]:
+    def _evse_to_dict(self, evse: EVSE, poll_interval: float) -> Dict[str, Any]:
         """Convert an EVSE object to a dictionary"""
         data = {
             'serial': evse.info.serial,
@@ -69,7 +153,9 @@ class EVSEClient:
             'last_seen': evse.last_seen,
             'online': evse.is_online(),
             'logged_in': evse.is_logged_in(),
+            'session': evse.session,
             'state': evse.get_meta_state(),
+            'poll_interval': poll_interval,
             
             # EVSE information
             'brand': evse.info.brand,
@@ -139,27 +225,75 @@ class EVSEClient:
         
         return data
     
-    def add_callback(self, name: str, callback: Callable):
-        """Add a callback for state changes"""
-        self.callbacks[name] = callback
+    def add_callback(self, name: str, callback: Callable, *,
+                     events: Optional[Iterable[str]] = None, serial: Optional[str] = None):
+        """Add a callback for state changes
+        
+        Called as callback(serial, data, changes) where changes holds the
+        changed keys of data, or None when anything may have changed.
+        With events, only the events of these types are delivered (e.g.
+        'evse_charge_status_changed'); with serial, only the events of that EVSE.
+        """
+        self.callbacks.add(name, callback, events=events, serial=serial)
     
     def remove_callback(self, name: str):
         """Remove a callback"""
-        self.callbacks.pop(name, None)
+        self.callbacks.remove(name)
+    
+    def get_callback_stats(self) -> Dict[str, Dict[str, float]]:
+        """Calls, errors, timeouts and latency of each callback"""
+        return self.callbacks.stats()
     
-    def get_evse(self, serial: str) -> Optional[Dict[str, Any]]:
-        """Get the data for an EVSE"""
+    def get_evse(self, serial: str) -> Optional[Mapping[str, Any]]:
+        """Get the data for an EVSE (read-only snapshot)"""
         evse = self.communicator.get_evse(serial)
         if evse:
-            return self._evse_to_dict(evse)
+            return self._snapshot(evse)
         return None
     
-    def get_all_evses(self) -> Dict[str, Dict[str, Any]]:
-        """Get all EVSEs"""
-        result = {}
-        for serial, evse in self.communicator.get_all_evses().items():
-            result[serial] = self._evse_to_dict(evse)
-        return result
+    def get_last_frame_time(self, serial: str) -> Optional[float]:
+        """Monotonic time of the last frame received from an EVSE"""
+        evse = self.communicator.get_evse(serial)
+        return evse.last_frame if evse else None
+    
+    def get_protocol_stats(self, serial: str) -> Optional[Dict[str, Any]]:
+        """Protocol health of an EVSE, from the communicator metrics
+        
+        Counters are cumulative (rates are computed by the caller from two
+        readings and their 'time'); last_rtt and status_age are in seconds.
+        """
+        now = time.monotonic()
+        stats = self._protocol_stats.get(serial)
+        if stats is not None and now - stats['time'] < PROTOCOL_STATS_MAX_AGE:
+            return stats
+        evse = self.communicator.get_evse(serial)
+        if evse is None:
+            return None
+        metrics = self.communicator.metrics
+        # Running sums of the registry: no scan of the other EVSEs' counters
+        totals = metrics.totals(serial)
+        stats = self._protocol_stats[serial] = {
+            'time': now,
+            'frames_received': totals.get('frames_received', 0),
+            'frames_sent': totals.get('frames_sent', 0),
+            'parse_errors': totals.get('checksum_errors', 0) + totals.get('parse_errors', 0),
+            'logins': totals.get('logins', 0),
+            'last_rtt': metrics.gauge('last_rtt', serial),
+            'status_age': now - evse.last_status_frame if evse.last_status_frame is not None else None,
+            'ingest_queue_depth': self.communicator.inbound_depth(serial),
+        }
+        return stats
+    
+    def get_all_evses(self) -> Dict[str, Mapping[str, Any]]:
+        """Get all EVSEs (read-only snapshots)"""
+        return {serial: self._snapshot(evse) for serial, evse in self.communicator.evses.items()}
+    
+    async def wait_for_evse(self, serial: str, timeout: float = DISCOVERY_TIMEOUT) -> Optional[Mapping[str, Any]]:
+        """Wait until the EVSE has been discovered (immediate if already online)"""
+        evse = await self.communicator.wait_for_evse(serial, timeout)
+        if evse:
+            return self._snapshot(evse)
+        return None
     
     async def login(self, serial: str, password: str) -> bool:
         """Log in to an EVSE"""
@@ -197,8 +331,8 @@ class EVSEClient:
     # Starting no longer triggers cooldown (only stops from CHARGING state do)
         return await evse.charge_start(amps, single_phase)
     
-    async def stop_charging(self, serial: str) -> bool:
-        """Stop charging"""
+    async def stop_charging(self, serial: str, sent: Optional[asyncio.Future] = None) -> bool:
+        """Stop charging (sent is resolved once the stop frame is sent)"""
         evse = self.communicator.get_evse(serial)
         if not evse:
             _LOGGER.error(f"EVSE {serial} not found")
@@ -206,7 +340,7 @@ class EVSEClient:
         
     # Always allow stop (safety)
         was_charging = evse.get_meta_state() == "CHARGING"
-        result = await evse.charge_stop()
+        result = await evse.charge_stop(sent=sent)
     # Record the stop only if we were actually charging
         if result and was_charging:
             self._record_charge_state_change(serial)
@@ -222,6 +356,104 @@ class EVSEClient:
         
         return await evse.set_max_electricity(amps)
     
+    async def stop_many(self, serials: Iterable[str], concurrency: int = FLEET_CONCURRENCY,
+                        timeout: float = FLEET_TIMEOUT) -> Dict[str, bool]:
+        """Stop charging on several EVSEs at once
+        
+        Returns the result of each serial. Every stop frame is sent right
+        away: concurrency only limits the stops still being sent, each one
+        frees its slot once its frame is out and waits for its confirmation
+        outside the limit. The set-current commands of set_max_current_many()
+        wait until every stop has been sent (not confirmed), so a stop is
+        never queued behind a current confirmation.
+        """
+        serials = list(dict.fromkeys(serials))
+        unsent = set(serials)
+        self._stops_unsent += len(unsent)
+        self._stops_sent.clear()
+        
+        def mark_sent(serial: str):
+            if serial in unsent:
+                unsent.discard(serial)
+                self._stops_unsent -= 1
+                if not self._stops_unsent:
+                    self._stops_sent.set()
+        
+        async def stop(serial: str, release: Callable[[], None]) -> bool:
+            sent = asyncio.get_running_loop().create_future()
+            task = asyncio.ensure_future(self.stop_charging(serial, sent))
+            try:
+                # Until the stop frame is sent, or the stop ended without sending one
+                await asyncio.wait((sent, task), return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            mark_sent(serial)
+            # The confirmation wait does not hold back the other stops
+            release()
+            return await task
+        
+        try:
+            return await self._run_many(
+                {serial: (lambda release, serial=serial: stop(serial, release)) for serial in serials},
+                concurrency, timeout,
+            )
+        finally:
+            for serial in list(unsent):
+                mark_sent(serial)
+    
+    async def set_max_current_many(self, targets: Mapping[str, int], concurrency: int = FLEET_CONCURRENCY,
+                                   timeout: float = FLEET_TIMEOUT) -> Dict[str, bool]:
+        """Set the maximum current of several EVSEs at once ({serial: amps})
+        
+        Up to concurrency EVSEs are handled at the same time, each one
+        waiting at most timeout seconds for its confirmation. Returns the
+        result of each serial.
+        """
+        async def set_current(serial: str, amps: int) -> bool:
+            await self._stops_sent.wait()
+            return await self.set_max_current(serial, amps)
+        
+        # Let stop_many() calls issued at the same time go out first
+        await asyncio.sleep(0)
+        return await self._run_many(
+            {serial: (lambda release, serial=serial, amps=amps: set_current(serial, amps))
+             for serial, amps in targets.items()},
+            concurrency, timeout,
+        )
+    
+    async def _run_many(self, commands: Mapping[str, Callable[[Callable[[], None]], Awaitable[bool]]],
+                        concurrency: int, timeout: float) -> Dict[str, bool]:
+        """Run one command per serial, concurrency at a time, each within timeout
+        
+        Each command is called with a release function: a command may call it
+        to free its slot early and finish outside the concurrency limit.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(serial: str, command: Callable[[Callable[[], None]], Awaitable[bool]]) -> bool:
+            held = True
+            
+            def release():
+                nonlocal held
+                if held:
+                    held = False
+                    semaphore.release()
+            
+            await semaphore.acquire()
+            try:
+                return bool(await asyncio.wait_for(command(release), timeout))
+            except asyncio.TimeoutError:
+                _LOGGER.error(f"No confirmation from {serial} within {timeout:g} seconds")
+            except Exception as e:
+                _LOGGER.error(f"Command failed for {serial}: {e}")
+            finally:
+                release()
+            return False
+        
+        results = await asyncio.gather(*(run(serial, command) for serial, command in commands.items()))
+        return dict(zip(commands, results))
+    
     async def set_name(self, serial: str, name: str) -> bool:
         """Set the EVSE name"""
         evse = self.communicator.get_evse(serial)
@@ -284,7 +516,7 @@ class EVSEClient:
     def _record_charge_state_change(self, serial: str) -> None:
         """Record a charge stop (to protect the next start)"""
         self._last_charge_change[serial] = datetime.now()
-    _LOGGER.debug(f"Charge stop recorded for {serial}")
+        _LOGGER.debug(f"Charge stop recorded for {serial}")
 
     # --- Utility exposure for UI / sensors ---
     def get_cooldown_remaining(self, serial: str) -> timedelta:
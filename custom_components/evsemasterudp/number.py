@@ -6,9 +6,9 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import UnitOfElectricCurrent, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import DOMAIN
+from .entity import EVSEEntity
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -31,13 +31,12 @@ async def async_setup_entry(
     
     async_add_entities(entities)
 
-class EVSECurrentControl(CoordinatorEntity, NumberEntity):
+class EVSECurrentControl(EVSEEntity, NumberEntity):
     """Control for EVSE maximum current"""
     
     def __init__(self, coordinator, client, serial: str, base_name: str):
-        super().__init__(coordinator)
+        super().__init__(coordinator, serial, base_name)
         self.client = client
-        self.serial = serial
         self._attr_name = f"{base_name} Max Current"
         self._attr_unique_id = f"{serial}_max_current"
         self._attr_icon = "mdi:current-ac"
@@ -45,18 +44,6 @@ class EVSECurrentControl(CoordinatorEntity, NumberEntity):
         self._attr_native_min_value = 6
         self._attr_native_max_value = 32
         self._attr_native_step = 1
-
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, serial)},
-            "name": base_name,
-            "manufacturer": "Oniric75",
-            "model": "EVSE Master UDP",
-        }
-    
-    @property
-    def evse_data(self):
-        """Get EVSE data"""
-        return self.coordinator.data.get(self.serial, {})
     
     @property
     def native_value(self) -> float | None:
@@ -77,14 +64,13 @@ class EVSECurrentControl(CoordinatorEntity, NumberEntity):
             await self.coordinator.async_request_refresh()
 
 
-class EVSEFastChangeProtection(CoordinatorEntity, NumberEntity):
+class EVSEFastChangeProtection(EVSEEntity, NumberEntity):
     """Control for fast change protection"""
     
     def __init__(self, coordinator, client, serial: str, base_name: str):
         """Initialize the protection control"""
-        super().__init__(coordinator)
+        super().__init__(coordinator, serial, base_name)
         self.client = client
-        self.serial = serial
         self._attr_name = f"{base_name} Fast Change Protection"
         self._attr_unique_id = f"{serial}_fast_change_protection"
         self._attr_icon = "mdi:shield-alert"
@@ -99,11 +85,6 @@ class EVSEFastChangeProtection(CoordinatorEntity, NumberEntity):
         # the request to reduce cooldown while avoiding spam.
         self._protection_minutes = 1  # Default: 1 minute
     
-    @property
-    def evse_data(self) -> dict:
-        """EVSE data from the coordinator"""
-        return self.coordinator.data.get(self.serial, {})
-    
     @property
     def native_value(self) -> float | None:
         """Return the current protection value (in minutes)"""
@@ -0,0 +1,199 @@
+"""
+Per-EVSE actors
+
+Each EVSE has two mailboxes, each served by its own task:
+- inbound: packets received from the EVSE, handled in arrival order;
+- commands: requests to the EVSE (login, charge start, current change),
+  run one at a time so they never interleave on the same charger.
+
+Commands wait for their responses while the inbound mailbox keeps
+delivering them. A slow or flooding EVSE only fills its own mailboxes.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Packets waiting to be handled, per EVSE
+INBOUND_QUEUE_SIZE = 64
+# Commands waiting to run, per EVSE
+COMMAND_QUEUE_SIZE = 16
+
+
+class Mailbox:
+    """Bounded queue served by one task, with depth and processing time stats
+
+    The task is started by post() and exits once the mailbox is empty,
+    then on_idle() is called. When the mailbox is full, the oldest item
+    for which droppable(item) is True makes room for the new one; if there
+    is none, the new item is dropped. on_drop(item) is called for every
+    dropped item.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[None]], maxsize: int,
+                 droppable: Optional[Callable[[Any], bool]] = None,
+                 on_drop: Optional[Callable[[Any], None]] = None,
+                 on_idle: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self._handler = handler
+        self._droppable = droppable
+        self._on_drop = on_drop
+        self._on_idle = on_idle
+        self._items: deque = deque()
+        self._task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        # Time spent handling items (in seconds)
+        self.busy_time = 0.0
+        self.max_time = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def post(self, item: Any) -> bool:
+        """Queue an item, False if the mailbox is full and the item was dropped"""
+        if len(self._items) >= self.maxsize and not self._make_room():
+            self._drop(item)
+            return False
+        self._items.append(item)
+        self.max_depth = max(self.max_depth, len(self._items))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self._task.add_done_callback(self._task_done)
+        return True
+
+    def _task_done(self, task: asyncio.Task):
+        if task is self._task and not self._items and self._on_idle is not None:
+            self._on_idle()
+
+    def _make_room(self) -> bool:
+        """Drop the oldest droppable item, False if there is none"""
+        if self._droppable is None:
+            return False
+        for index, queued in enumerate(self._items):
+            if self._droppable(queued):
+                del self._items[index]
+                self._drop(queued)
+                return True
+        return False
+
+    def _drop(self, item: Any):
+        self.dropped += 1
+        if self._on_drop is not None:
+            self._on_drop(item)
+
+    @property
+    def running(self) -> bool:
+        """A task is serving the mailbox"""
+        return self._task is not None and not self._task.done()
+
+    async def _run(self):
+        # No await between the emptiness check and the return: an item
+        # posted meanwhile starts a new task
+        while self._items:
+            item = self._items.popleft()
+            start = time.perf_counter()
+            try:
+                await self._handler(item)
+            except Exception as e:
+                _LOGGER.error(f"Error in {self.name} mailbox: {e}")
+            elapsed = time.perf_counter() - start
+            self.processed += 1
+            self.busy_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+            if self._items:
+                # Handlers rarely suspend: let the other mailboxes run
+                await asyncio.sleep(0)
+
+    def stop(self):
+        """Cancel the task and forget the queued items"""
+        self._items.clear()
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'depth': len(self._items),
+            'max_depth': self.max_depth,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'mean_time': self.busy_time / self.processed if self.processed else 0.0,
+            'max_time': self.max_time,
+        }
+
+
+class EVSEActor:
+    """Inbound and command mailboxes of one EVSE"""
+
+    def __init__(self, serial: str, inbound_handler: Callable[[Any], Awaitable[None]],
+                 inbound_size: int = INBOUND_QUEUE_SIZE, command_size: int = COMMAND_QUEUE_SIZE,
+                 inbound_droppable: Optional[Callable[[Any], bool]] = None,
+                 on_inbound_drop: Optional[Callable[[Any], None]] = None,
+                 on_idle: Optional[Callable[['EVSEActor'], None]] = None):
+        """on_idle(actor) is called when both mailboxes become idle"""
+        self.serial = serial
+        self._on_idle = on_idle
+        self.inbound = Mailbox(f"{serial} inbound", inbound_handler, inbound_size,
+                               inbound_droppable, on_inbound_drop, self._mailbox_idle)
+        self.commands = Mailbox(f"{serial} commands", self._run_command, command_size,
+                                on_idle=self._mailbox_idle)
+
+    def _mailbox_idle(self):
+        if self._on_idle is not None and self.idle:
+            self._on_idle(self)
+
+    @property
+    def idle(self) -> bool:
+        """Nothing queued or running in either mailbox"""
+        return not (len(self.inbound) or len(self.commands) or self.inbound.running or self.commands.running)
+
+    def post_inbound(self, item: Any) -> bool:
+        """Queue a received packet, False if it was dropped"""
+        return self.inbound.post(item)
+
+    async def call(self, function: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Run function(*args) after the commands already queued for this EVSE
+
+        Cancelling the caller cancels the command, queued or running.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if not self.commands.post((function, args, future)):
+            raise RuntimeError(f"Too many commands waiting for {self.serial}")
+        return await future
+
+    async def _run_command(self, item):
+        function, args, future = item
+        if future.done():
+            # Cancelled while waiting in the mailbox
+            return
+        task = asyncio.ensure_future(function(*args))
+        future.add_done_callback(lambda _: task.cancel() if future.cancelled() else None)
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # The caller gave up
+                return
+            # The mailbox is stopping
+            task.cancel()
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def stop(self):
+        self.inbound.stop()
+        self.commands.stop()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {'inbound': self.inbound.stats(), 'commands': self.commands.stats()}
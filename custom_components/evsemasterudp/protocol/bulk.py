@@ -0,0 +1,286 @@
+"""
+Bulk decoding of captured EmProto frames into columns
+
+Offline analysis of UDP captures does not need one Datagram object per
+frame: the fixed-position fields of SingleACStatus and
+SingleACChargingStatusPublicAuto are decoded column by column, driven by
+the same Layout descriptions as unpack_payload.
+
+With NumPy installed the frames are decoded vectorised (np.frombuffer with
+big-endian dtypes) into a structured array. Without it a pure-Python
+decoder returns a dict of lists. Both produce the same values, so
+result[name] gives the same column either way and the two can be
+cross-checked.
+
+Differences with the Datagram objects, so every column has a single type:
+  - sentinel values (None on the objects) are NaN
+  - errors is the raw 32-bit bitfield (decode_error_bits gives the list)
+"""
+import math
+import struct
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from .datagram import Datagram
+from .datagrams import (
+    SingleACStatus, SingleACChargingStatusPublicAuto,
+    decode_error_bits, decode_temperature,
+)
+from .layout import Field, Layout, decode_string
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only needed for the vectorised path
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Frame envelope: 21 bytes before the payload, checksum and tail after it
+_PAYLOAD_OFFSET = 21
+_ENVELOPE_SIZE = 25
+_ENVELOPE = struct.Struct('>HH')  # magic header, total length
+_UINT16 = struct.Struct('>H')
+
+
+class BulkSpec:
+    """What to decode in bulk for one datagram type
+
+    required is decoded for every frame whose payload is at least
+    min_payload bytes long (shorter frames are skipped). optional holds
+    (min_payload, layout) pairs decoded only when the payload is long
+    enough, the columns keep the zero default of the object otherwise.
+    state_override mirrors the variable position of the charging state:
+    (payload offset, accepted values) replacing current_state.
+    """
+
+    def __init__(self, datagram_cls: Type[Datagram], required: Layout, min_payload: int,
+                 optional: Sequence[Tuple[int, Layout]] = (),
+                 state_override: Optional[Tuple[int, Tuple[int, ...]]] = None):
+        self.datagram_cls = datagram_cls
+        self.command = datagram_cls.COMMAND
+        self.required = required
+        self.min_payload = min_payload
+        self.optional = tuple(optional)
+        self.state_override = state_override
+
+    @property
+    def layouts(self) -> List[Tuple[int, Layout]]:
+        """All layouts with the payload length they need"""
+        return [(self.min_payload, self.required)] + list(self.optional)
+
+    @property
+    def fields(self) -> List[Field]:
+        return [field for _, layout in self.layouts for field in layout.fields]
+
+
+BULK_SPECS: Dict[Type[Datagram], BulkSpec] = {
+    SingleACStatus: BulkSpec(
+        SingleACStatus, SingleACStatus.LAYOUT, 25,
+        optional=[(33, SingleACStatus.THREE_PHASE_LAYOUT)],
+    ),
+    SingleACChargingStatusPublicAuto: BulkSpec(
+        SingleACChargingStatusPublicAuto, SingleACChargingStatusPublicAuto.LAYOUT, 74,
+        state_override=(74, (18, 19)),
+    ),
+}
+
+
+###############################################################################
+# SCALAR CONVERSIONS (same formulas as Field.converter)
+###############################################################################
+
+def _temperature(raw: int) -> float:
+    # (raw - 20000) / 100 is bit-identical to round((raw - 20000) * 0.01, 2)
+    return -1.0 if raw == 0xffff else (raw - 20000) / 100
+
+def _scalar_converter(field: Field) -> Optional[Callable[[Any], Any]]:
+    """Conversion of a raw value for the pure-Python decoder"""
+    if field.decode is decode_temperature:
+        return _temperature
+    if field.decode is decode_error_bits:
+        return None
+    if field.decode is decode_string:
+        return decode_string
+    if field.decode is not None:
+        raise ValueError(f"No bulk conversion for field {field.name}")
+    scale, sentinel = field.scale, field.sentinel
+    if sentinel is not None:
+        nan = math.nan
+        if scale is not None:
+            return lambda raw: nan if raw == sentinel else raw * scale
+        return lambda raw: nan if raw == sentinel else float(raw)
+    if scale is not None:
+        return lambda raw: raw * scale
+    return None
+
+
+###############################################################################
+# PURE-PYTHON DECODER
+###############################################################################
+
+def _frame_payload_length(frame: bytes, command: int) -> Optional[int]:
+    """Validate the envelope of a frame and return its payload length"""
+    if len(frame) < _ENVELOPE_SIZE:
+        return None
+    header, length = _ENVELOPE.unpack_from(frame, 0)
+    if header != Datagram.PACKET_HEADER or length < _ENVELOPE_SIZE or length > len(frame):
+        return None
+    if _UINT16.unpack_from(frame, 19)[0] != command:
+        return None
+    if sum(frame[:length - 4]) % 0xFFFF != _UINT16.unpack_from(frame, length - 4)[0]:
+        return None
+    return length - _ENVELOPE_SIZE
+
+def _decode_python(frames: Sequence[bytes], spec: BulkSpec) -> Dict[str, list]:
+    columns: Dict[str, list] = {'frame': [], 'serial': []}
+    decoders = []
+    for min_payload, layout in spec.layouts:
+        fields = [(field.name, _scalar_converter(field)) for field in layout.fields]
+        for name, _ in fields:
+            columns[name] = []
+        # Missing optional fields keep the zero default of the object
+        defaults = [0.0 if field.scale is not None else 0 for field in layout.fields]
+        decoders.append((min_payload, layout, fields, defaults))
+
+    for index, frame in enumerate(frames):
+        frame = bytes(frame)
+        payload_length = _frame_payload_length(frame, spec.command)
+        if payload_length is None or payload_length < spec.min_payload:
+            continue
+        columns['frame'].append(index)
+        columns['serial'].append(frame[5:13].hex())
+        for min_payload, layout, fields, defaults in decoders:
+            if payload_length >= min_payload:
+                raw = layout.struct.unpack_from(frame, _PAYLOAD_OFFSET + layout.start)
+                for (name, convert), value in zip(fields, raw):
+                    columns[name].append(convert(value) if convert else value)
+            else:
+                for (name, _), value in zip(fields, defaults):
+                    columns[name].append(value)
+        if spec.state_override is not None:
+            offset, accepted = spec.state_override
+            if payload_length > offset and frame[_PAYLOAD_OFFSET + offset] in accepted:
+                columns['current_state'][-1] = frame[_PAYLOAD_OFFSET + offset]
+
+    return columns
+
+
+###############################################################################
+# NUMPY DECODER
+###############################################################################
+
+def _raw_dtype(field: Field) -> str:
+    if field.fmt.endswith('s'):
+        return f"S{struct.calcsize(field.fmt)}"
+    return {'B': 'u1', 'H': '>u2', 'I': '>u4'}[field.fmt]
+
+def _hex_column(raw):
+    """Hex strings of a (rows, n) uint8 array, like bytes.hex()"""
+    digits = np.array([f"{value:02x}" for value in range(256)], dtype='U2')
+    # n consecutive 2-character cells are laid out exactly like one 2n-character cell
+    return np.ascontiguousarray(digits[raw]).view(f"U{2 * raw.shape[1]}").reshape(-1)
+
+def _convert_column(field: Field, raw):
+    """Vectorised version of _scalar_converter"""
+    if field.decode is decode_temperature:
+        return np.where(raw == 0xffff, -1.0, (raw.astype(np.int64) - 20000) / 100)
+    if field.decode is decode_error_bits:
+        return raw.astype(np.uint32)
+    if field.decode is decode_string:
+        return np.char.rstrip(np.char.decode(raw, 'ascii', 'ignore'), '\x00')
+    if field.decode is not None:
+        raise ValueError(f"No bulk conversion for field {field.name}")
+    value = raw.astype(np.float64) * field.scale if field.scale is not None else raw
+    if field.sentinel is not None:
+        value = np.where(raw == field.sentinel, np.nan, value.astype(np.float64))
+    return value
+
+def _decode_numpy(frames: Sequence[bytes], spec: BulkSpec):
+    frames = [frame if isinstance(frame, bytes) else bytes(frame) for frame in frames]
+    count = len(frames)
+    # Wide enough for the longest frame and for every field (and the state byte)
+    min_width = _PAYLOAD_OFFSET + max(layout.end for _, layout in spec.layouts) + 1
+    width = max([min_width] + [len(frame) for frame in frames])
+
+    # One fixed-stride buffer: every frame padded to the same record width
+    frame_lengths = np.fromiter((len(frame) for frame in frames), dtype=np.int64, count=count)
+    matrix = np.frombuffer(b''.join(frame.ljust(width, b'\x00') for frame in frames),
+                           dtype=np.uint8).reshape(count, width)
+
+    # Envelope validation
+    header = matrix[:, 0].astype(np.int64) << 8 | matrix[:, 1]
+    length = matrix[:, 2].astype(np.int64) << 8 | matrix[:, 3]
+    command = matrix[:, 19].astype(np.int64) << 8 | matrix[:, 20]
+    valid = ((frame_lengths >= _ENVELOPE_SIZE) & (header == Datagram.PACKET_HEADER)
+             & (length >= _ENVELOPE_SIZE) & (length <= frame_lengths) & (command == spec.command))
+    rows = np.arange(count)
+    checksum_at = np.clip(length - 4, 0, width - 2)
+    checksum = matrix[rows, checksum_at].astype(np.int64) << 8 | matrix[rows, checksum_at + 1]
+    summed = np.where(np.arange(width) < (length - 4)[:, None], matrix, 0).sum(axis=1, dtype=np.int64)
+    payload_length = length - _ENVELOPE_SIZE
+    valid &= (summed % 0xFFFF == checksum) & (payload_length >= spec.min_payload)
+
+    selected = np.flatnonzero(valid)
+    matrix = matrix[selected]
+    payload_length = payload_length[selected]
+
+    # Raw columns read through big-endian dtypes at the layout offsets
+    fields = spec.fields
+    raw_dtype = np.dtype({
+        'names': [field.name for field in fields],
+        'formats': [_raw_dtype(field) for field in fields],
+        'offsets': [_PAYLOAD_OFFSET + field.offset for field in fields],
+        'itemsize': width,
+    })
+    raw = np.frombuffer(np.ascontiguousarray(matrix).tobytes(), dtype=raw_dtype)
+
+    columns: Dict[str, Any] = {
+        'frame': selected,
+        'serial': _hex_column(matrix[:, 5:13]),
+    }
+    for min_payload, layout in spec.layouts:
+        present = payload_length >= min_payload
+        for field in layout.fields:
+            value = _convert_column(field, raw[field.name])
+            if min_payload > spec.min_payload:
+                value = np.where(present, value, 0)
+            columns[field.name] = value
+    if spec.state_override is not None:
+        offset, accepted = spec.state_override
+        state = matrix[:, _PAYLOAD_OFFSET + offset]
+        override = (payload_length > offset) & np.isin(state, accepted)
+        columns['current_state'] = np.where(override, state, columns['current_state'])
+
+    result = np.empty(len(selected), dtype=[(name, value.dtype) for name, value in columns.items()])
+    for name, value in columns.items():
+        result[name] = value
+    return result
+
+
+###############################################################################
+# PUBLIC API
+###############################################################################
+
+def decode_frames(frames: Iterable[bytes], datagram_cls: Type[Datagram] = SingleACStatus,
+                  use_numpy: Optional[bool] = None):
+    """Decode captured frames of one datagram type into columns
+
+    frames holds one datagram per item, starting at offset 0. Frames of
+    another command, with a bad envelope or checksum, or too short for
+    the required layout are skipped; the 'frame' column gives the index
+    of each decoded frame in the input.
+
+    Returns a NumPy structured array when NumPy is used (by default when
+    it is installed), a dict of lists otherwise.
+    """
+    spec = BULK_SPECS.get(datagram_cls)
+    if spec is None:
+        raise ValueError(f"No bulk decoder for {datagram_cls.__name__}")
+    if use_numpy is None:
+        use_numpy = HAS_NUMPY
+    elif use_numpy and not HAS_NUMPY:
+        raise ImportError("NumPy is required for the vectorised decoder")
+
+    frames = list(frames)
+    if use_numpy:
+        return _decode_numpy(frames, spec)
+    return _decode_python(frames, spec)
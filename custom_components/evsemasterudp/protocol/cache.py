@@ -0,0 +1,167 @@
+"""
+On-disk cache of discovered EVSEs
+
+Keeps the address, EVSEInfo fields and configured max current of every
+known EVSE, so the communicator can log in by unicast right after a
+restart instead of waiting for the next Login broadcast.
+
+Reads and writes run in the default executor, never in the event loop;
+writes are debounced and atomic (temporary file + os.replace). Subclasses
+can keep the entries elsewhere (e.g. Home Assistant's storage helper) by
+overriding async_load, schedule_save and async_flush.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Entries not refreshed for this long are dropped (in seconds)
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+# Delay grouping the updates of one write (in seconds)
+DEFAULT_SAVE_DELAY = 10.0
+# last_seen alone only triggers a write when it moved by this much (in seconds)
+LAST_SEEN_REFRESH = 3600
+
+CACHE_VERSION = 1
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """Write JSON so that readers see either the old or the new file"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            json.dump(data, tmp_file, indent=2, sort_keys=True)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DiscoveryCache:
+    """Cache of discovered EVSEs (serial -> entry)
+
+    An entry is a JSON-compatible dict holding at least 'last_seen'
+    (epoch seconds), used to expire it after ttl seconds.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_CACHE_TTL, save_delay: float = DEFAULT_SAVE_DELAY):
+        self.path = path
+        self.ttl = ttl
+        self.save_delay = save_delay
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._save_task: Optional[asyncio.Future] = None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the cache file, dropping expired entries (blocking)"""
+        return self._restore(self._read())
+
+    async def async_load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the cache, dropping expired entries, without blocking the event loop"""
+        data = await asyncio.get_running_loop().run_in_executor(None, self._read)
+        return self._restore(data)
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        """Stored data ({'version', 'evses'}), None if missing or unreadable"""
+        try:
+            with open(self.path, encoding='utf-8') as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            _LOGGER.warning(f"Ignoring unreadable discovery cache {self.path}: {e}")
+            return None
+
+    def _restore(self, data: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Keep the entries of data that have not expired"""
+        if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+            return {}
+
+        oldest = time.time() - self.ttl
+        entries = data.get('evses', {})
+        self.entries = {
+            serial: entry for serial, entry in entries.items()
+            if isinstance(entry, dict) and entry.get('last_seen', 0) >= oldest
+        }
+        expired = len(entries) - len(self.entries)
+        if expired:
+            _LOGGER.info(f"Dropped {expired} expired EVSE(s) from the discovery cache")
+            self.schedule_save()
+        return dict(self.entries)
+
+    def update(self, serial: str, entry: Dict[str, Any]) -> None:
+        """Record an entry and schedule a write if it changed
+        
+        A new last_seen alone is only written once it is LAST_SEEN_REFRESH
+        newer than the stored one, so an active EVSE does not cause a
+        write every few seconds.
+        """
+        current = self.entries.get(serial)
+        if current is not None:
+            same = all(current.get(key) == value for key, value in entry.items() if key != 'last_seen')
+            if same and len(current) == len(entry) and \
+                    entry.get('last_seen', 0) - current.get('last_seen', 0) < LAST_SEEN_REFRESH:
+                return
+        self.entries[serial] = entry
+        self.schedule_save()
+
+    def remove(self, serial: str) -> None:
+        """Forget an entry and schedule a write if it was cached"""
+        if self.entries.pop(serial, None) is not None:
+            self.schedule_save()
+
+    def schedule_save(self) -> None:
+        """Write the cache after save_delay (updates in between are grouped)"""
+        if self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop: write right away
+            self.save()
+            return
+        self._save_handle = loop.call_later(self.save_delay, self._save_in_executor)
+
+    def _save_in_executor(self) -> None:
+        self._save_handle = None
+        loop = asyncio.get_running_loop()
+        self._save_task = loop.run_in_executor(None, self.save, self._snapshot())
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {'version': CACHE_VERSION, 'evses': {serial: dict(entry) for serial, entry in self.entries.items()}}
+
+    def save(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """Write the cache now (blocking)"""
+        try:
+            write_json_atomic(self.path, data if data is not None else self._snapshot())
+        except OSError as e:
+            _LOGGER.warning(f"Unable to write the discovery cache {self.path}: {e}")
+
+    async def async_flush(self) -> None:
+        """Write pending updates now, without blocking the event loop"""
+        if self._save_task is not None:
+            await self._save_task
+            self._save_task = None
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+            await asyncio.get_running_loop().run_in_executor(None, self.save, self._snapshot())
+
+    def flush(self) -> None:
+        """Write pending updates now (blocking, for synchronous shutdown)"""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+            self.save()
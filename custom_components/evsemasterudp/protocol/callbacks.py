@@ -0,0 +1,113 @@
+"""
+Event callbacks
+
+Callbacks subscribe by name, optionally to some event types and to one
+EVSE. The callbacks of an event run concurrently, each one bounded by a
+timeout, so a slow consumer neither adds its latency to the others nor
+blocks the caller forever.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Maximum time a callback may take for one event (in seconds)
+CALLBACK_TIMEOUT = 5.0
+
+
+class Subscription:
+    """A registered callback, its filters and its latency stats"""
+
+    def __init__(self, name: str, callback: Callable[..., Awaitable[Any]],
+                 events: Optional[Iterable[str]] = None, serial: Optional[str] = None):
+        self.name = name
+        self.callback = callback
+        # None: every event / every EVSE
+        self.events = frozenset(events) if events is not None else None
+        self.serial = serial
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        # Time spent in the callback (in seconds)
+        self.busy_time = 0.0
+        self.max_time = 0.0
+
+    def matches(self, event: str, serial: Optional[str]) -> bool:
+        return ((self.events is None or event in self.events)
+                and (self.serial is None or self.serial == serial))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'mean_time': self.busy_time / self.calls if self.calls else 0.0,
+            'max_time': self.max_time,
+        }
+
+
+class CallbackRegistry:
+    """Named callbacks, dispatched concurrently with a timeout"""
+
+    def __init__(self, timeout: float = CALLBACK_TIMEOUT):
+        self.timeout = timeout
+        self._subscriptions: Dict[str, Subscription] = {}
+
+    def add(self, name: str, callback: Callable[..., Awaitable[Any]], *,
+            events: Optional[Iterable[str]] = None, serial: Optional[str] = None):
+        """Add (or replace) a callback, for events of these types (all if None)
+        and of this EVSE (all if None)"""
+        self._subscriptions[name] = Subscription(name, callback, events, serial)
+
+    def remove(self, name: str):
+        self._subscriptions.pop(name, None)
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._subscriptions
+
+    def select(self, event: str, serial: Optional[str] = None) -> List[Subscription]:
+        """Subscriptions interested in an event of an EVSE"""
+        return [subscription for subscription in self._subscriptions.values()
+                if subscription.matches(event, serial)]
+
+    async def dispatch(self, subscriptions: List[Subscription], *args):
+        """Call the selected callbacks with args, concurrently"""
+        if len(subscriptions) == 1:
+            await self._call(subscriptions[0], args)
+        elif subscriptions:
+            await asyncio.gather(*(self._call(subscription, args) for subscription in subscriptions))
+
+    async def notify(self, event: str, serial: Optional[str], *args):
+        """Call the callbacks interested in an event of an EVSE with args"""
+        await self.dispatch(self.select(event, serial), *args)
+
+    async def _call(self, subscription: Subscription, args: tuple):
+        start = time.perf_counter()
+        deadline = asyncio.timeout(self.timeout)
+        try:
+            async with deadline:
+                await subscription.callback(*args)
+        except TimeoutError:
+            # A TimeoutError raised by the callback itself is an error
+            if deadline.expired():
+                subscription.timeouts += 1
+                _LOGGER.warning(f"Callback {subscription.name} timed out after {self.timeout}s")
+            else:
+                subscription.errors += 1
+                _LOGGER.error(f"Error in callback {subscription.name}: timeout inside the callback")
+        except Exception as e:
+            subscription.errors += 1
+            _LOGGER.error(f"Error in callback {subscription.name}: {e}")
+        elapsed = time.perf_counter() - start
+        subscription.calls += 1
+        subscription.busy_time += elapsed
+        subscription.max_time = max(subscription.max_time, elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Calls, errors, timeouts and latency of each callback"""
+        return {name: subscription.stats() for name, subscription in self._subscriptions.items()}
@@ -5,20 +5,106 @@ import asyncio
 import socket
 import struct
 import logging
-from typing import Dict, Optional, Callable, Any, List
+import time
+from collections import deque
+from typing import Dict, Optional, Callable, Any, List, Iterable, Tuple, Type, Awaitable
 from datetime import datetime, timedelta
 
-from .datagram import Datagram, parse_datagrams
+from .actor import EVSEActor
+from .cache import DiscoveryCache
+from .callbacks import CallbackRegistry
+from .datagram import DATAGRAM_TYPES, UNKNOWN_SERIAL, Datagram, FrameCache, is_valid_frame, parse_datagrams
+from .metrics import LatencyHistogram, MetricsRegistry
+from .scheduler import Scheduler
 from .datagrams import (
     RequestLogin, LoginConfirm, PasswordErrorResponse, 
     Heading, HeadingResponse, SingleACStatus, SingleACStatusResponse,
     CurrentChargeRecord, RequestChargeStatusRecord, ChargeStart, ChargeStop,
+    ChargeStartResponse, ChargeStopResponse,
     SetAndGetOutputElectricity, SetAndGetOutputElectricityResponse,
     Login, LoginResponse, SingleACChargingStatusPublicAuto, SingleACChargingStatusResponse
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+# Maximum number of frames held while the transport is paused
+OUTBOUND_QUEUE_SIZE = 256
+
+# Priorities of the frames held while the transport is paused, most urgent first
+PRIORITY_SAFETY = 0
+PRIORITY_CONTROL = 1
+PRIORITY_ACK = 2
+PRIORITY_POLL = 3
+PRIORITY_NAMES = ('safety', 'control', 'ack', 'poll')
+# Priority of each command (PRIORITY_CONTROL if not listed)
+COMMAND_PRIORITIES: Dict[int, int] = {
+    ChargeStop.COMMAND: PRIORITY_SAFETY,
+    SingleACStatusResponse.COMMAND: PRIORITY_ACK,
+    SingleACChargingStatusResponse.COMMAND: PRIORITY_ACK,
+    HeadingResponse.COMMAND: PRIORITY_ACK,
+    RequestChargeStatusRecord.COMMAND: PRIORITY_POLL,
+}
+# After this many frames in a row while less urgent ones wait, the
+# longest-waiting less urgent frame is sent (starvation protection)
+STARVATION_LIMIT = 8
+
+# Status polling interval for each meta state (in seconds)
+DEFAULT_POLL_INTERVALS: Dict[str, float] = {
+    'CHARGING': 5.0,
+    'PLUGGED_IN': 15.0,
+    'ERROR': 15.0,
+    'IDLE': 60.0,
+    'NOT_LOGGED_IN': 60.0,
+    'OFFLINE': 120.0,
+}
+# Interval of the states missing from poll_intervals (in seconds)
+FALLBACK_POLL_INTERVAL = 60.0
+# Keepalive checks of an EVSE that is not logged in (in seconds)
+KEEPALIVE_INTERVAL = 5.0
+# A session without authenticated inbound traffic for this long is stale (in seconds)
+LOGIN_TIMEOUT = 30.0
+# A stale session is probed, and logged in again if still silent after
+# a delay spread over RELOGIN_SPREAD (in seconds)
+RELOGIN_SPREAD = 2.0
+# Maximum number of re-logins running at the same time
+MAX_CONCURRENT_LOGINS = 8
+
+# Confirmed charge commands: wait for the first confirmation (in seconds),
+# doubled after each retransmission of the same frame
+CONFIRM_TIMEOUT = 1.0
+CONFIRM_ATTEMPTS = 4
+
+# Minimum change of a measurement before a new event is emitted
+DEFAULT_DEADBANDS: Dict[str, float] = {
+    'l1_voltage': 0.5, 'l2_voltage': 0.5, 'l3_voltage': 0.5,
+    'l1_electricity': 0.05, 'l2_electricity': 0.05, 'l3_electricity': 0.05,
+    'current_power': 10,
+}
+
+# Periodic status pushes: when an inbound mailbox is full, the oldest queued
+# one is dropped first, as a newer status supersedes it
+REDUNDANT_COMMANDS = frozenset({SingleACStatus.COMMAND, SingleACChargingStatusPublicAuto.COMMAND})
+
+# Stats of the mailboxes and callbacks copied as gauges by get_metrics()
+MAILBOX_STATS = ('depth', 'max_depth', 'processed', 'dropped', 'mean_time', 'max_time')
+CALLBACK_STATS = ('calls', 'errors', 'timeouts', 'mean_time', 'max_time')
+
+# Frames an EVSE also sends without a session (discovery and login replies)
+UNAUTHENTICATED_COMMANDS = frozenset({Login.COMMAND, LoginResponse.COMMAND, PasswordErrorResponse.COMMAND})
+
+def _mark_sent(sent: Optional[asyncio.Future]):
+    """Resolve the optional future of a caller waiting for a frame to be sent"""
+    if sent is not None and not sent.done():
+        sent.set_result(None)
+
+class SessionState:
+    """Login session states of an EVSE"""
+    DISCONNECTED = "DISCONNECTED"
+    AUTHENTICATING = "AUTHENTICATING"
+    ACTIVE = "ACTIVE"
+    # No authenticated traffic for LOGIN_TIMEOUT: probed, then logged in again
+    STALE = "STALE"
+
 class EVSEInfo:
     """Information about an EVSE"""
     def __init__(self, serial: str, ip: str, port: int):
@@ -47,9 +133,41 @@ class EVSEConfig:
         self.max_electricity = 6
         self.temperature_unit = 1
 
-class EVSEState:
+class TrackedState:
+    """State updated field by field, reporting what changed
+    
+    The attributes always hold the latest values. A field is reported as
+    changed when it differs from the last reported value, or for fields
+    with a deadband when it moved by at least the deadband since then.
+    """
+    
+    def __init__(self):
+        # Last reported value of each field
+        self._reported: Dict[str, Any] = {}
+    
+    def update(self, values: Dict[str, Any], deadbands: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Apply values and return the changed fields (name -> new value)"""
+        reported = self._reported
+        changes = {}
+        for name, value in values.items():
+            setattr(self, name, value)
+            if name not in reported:
+                changes[name] = value
+                continue
+            last = reported[name]
+            deadband = deadbands.get(name) if deadbands else None
+            if deadband is not None and value is not None and last is not None:
+                if abs(value - last) >= deadband:
+                    changes[name] = value
+            elif value != last:
+                changes[name] = value
+        reported.update(changes)
+        return changes
+
+class EVSEState(TrackedState):
     """Electrical state of an EVSE"""
     def __init__(self):
+        super().__init__()
         self.current_power = 0.0
         self.current_amount = 0.0
         self.l1_voltage = 0.0
@@ -65,9 +183,10 @@ class EVSEState:
         self.output_state = 0
         self.errors = []
 
-class EVSECurrentCharge:
+class EVSECurrentCharge(TrackedState):
     """Current charging session"""
     def __init__(self):
+        super().__init__()
         self.port = 1
         self.current_state = 0
         self.charge_id = ""
@@ -96,10 +215,25 @@ class EVSE:
         self.current_charge: Optional[EVSECurrentCharge] = None
         
         self.last_seen = datetime.now()
+        # Monotonic time of the last received frame (latency measurements)
+        self.last_frame = time.monotonic()
+        # Monotonic time of the last status push (see REDUNDANT_COMMANDS)
+        self.last_status_frame: Optional[float] = None
         self.last_active_login: Optional[datetime] = None
+        # last_active_login for which a skipped re-login was counted
+        self.login_avoided_for: Optional[datetime] = None
         self.password: Optional[str] = None
-        self._logged_in = False
-        self._last_response = None  # To wait for authentication responses
+        self._session = SessionState.DISCONNECTED
+        # Monotonic time of the last authenticated frame received (or login)
+        self.last_authenticated: Optional[float] = None
+        self._frame_cache: Optional[FrameCache] = None
+        # Incremented on every change of the data exposed to clients
+        self.version = 0
+        # Restored from the discovery cache, nothing received since start
+        self.restored = False
+        # Meta state the status polling was scheduled for, and its interval
+        self.poll_mode: Optional[str] = None
+        self.poll_interval: Optional[float] = None
         
         # Possible states according to the protocol
         self.GUN_STATES = {
@@ -127,15 +261,76 @@ class EVSE:
         
         return changed
     
+    def mark_changed(self) -> None:
+        """Record a change of the EVSE data (invalidates cached snapshots)"""
+        self.version += 1
+        self.communicator._evse_changed(self)
+    
+    def to_cache_entry(self) -> Dict[str, Any]:
+        """Discovery cache entry of the EVSE (see protocol.cache)"""
+        info = {key: value for key, value in vars(self.info).items() if key not in ('serial', 'ip', 'port')}
+        return {
+            'serial': self.info.serial,
+            'ip': self.info.ip,
+            'port': self.info.port,
+            'last_seen': self.last_seen.timestamp(),
+            'info': info,
+            'max_electricity': self.config.max_electricity,
+        }
+    
+    @classmethod
+    def from_cache_entry(cls, communicator: 'Communicator', entry: Dict[str, Any]) -> 'EVSE':
+        """Rebuild an EVSE from its discovery cache entry"""
+        evse = cls(communicator, entry['serial'], entry['ip'], int(entry['port']))
+        for key, value in entry.get('info', {}).items():
+            if hasattr(evse.info, key) and key not in ('serial', 'ip', 'port'):
+                setattr(evse.info, key, value)
+        evse.config.max_electricity = int(entry.get('max_electricity', evse.config.max_electricity))
+        evse.last_seen = datetime.fromtimestamp(entry['last_seen'])
+        evse.restored = True
+        return evse
+    
     def is_online(self) -> bool:
         """Check if the EVSE is online"""
         # Consider offline after 90 seconds (adjusted for 60s poll interval)
         return (datetime.now() - self.last_seen).total_seconds() < 90
     
+    @property
+    def session(self) -> str:
+        """Login session state (see SessionState)"""
+        return self._session
+    
+    @session.setter
+    def session(self, session: str) -> None:
+        # Every transition is a change of the data exposed to clients
+        if session != self._session:
+            self._session = session
+            self.mark_changed()
+    
+    @property
+    def _logged_in(self) -> bool:
+        """The session is established (possibly stale)"""
+        return self.session in (SessionState.ACTIVE, SessionState.STALE)
+    
+    @_logged_in.setter
+    def _logged_in(self, logged_in: bool) -> None:
+        if logged_in:
+            self.session = SessionState.ACTIVE
+            self.last_authenticated = time.monotonic()
+        else:
+            self.session = SessionState.DISCONNECTED
+    
     def is_logged_in(self) -> bool:
         """Check if logged in to the EVSE"""
         return self._logged_in and self.is_online()
     
+    def session_alive(self) -> None:
+        """Record authenticated inbound traffic (proof that the session is alive)"""
+        self.last_authenticated = time.monotonic()
+        if self.session == SessionState.STALE:
+            _LOGGER.debug(f"Session with {self.info.serial} is alive again")
+            self.session = SessionState.ACTIVE
+    
     def get_meta_state(self) -> str:
         """Get the meta state of the EVSE"""
         if not self.is_online():
@@ -156,6 +351,14 @@ class EVSE:
             return "PLUGGED_IN"
         return "IDLE"
     
+    @property
+    def frames(self) -> FrameCache:
+        """Frame cache for the current serial and password (rebuilt when either changes)"""
+        cache = self._frame_cache
+        if cache is None or not cache.matches(self.info.serial, self.password):
+            cache = self._frame_cache = FrameCache(self.info.serial, self.password)
+        return cache
+    
     async def send_datagram(self, datagram: Datagram) -> int:
         """Send a datagram to the EVSE"""
         if isinstance(datagram, HeadingResponse):
@@ -163,32 +366,50 @@ class EVSE:
         
         return await self.communicator.send(datagram, self)
     
+    async def send_cached(self, datagram_cls: Type[Datagram]) -> int:
+        """Send a constant-payload datagram (ack, poll) from its pre-packed frame"""
+        if datagram_cls is HeadingResponse:
+            self.last_active_login = datetime.now()
+        
+        return await self.communicator.send_frame(self.frames.packed(datagram_cls), self)
+    
+    @property
+    def actor(self) -> EVSEActor:
+        """Mailboxes of the EVSE (commands run one at a time)"""
+        return self.communicator._actor(self.info.serial)
+    
     async def login(self, password: str) -> bool:
+        """Log in to the EVSE, after the commands already queued for it"""
+        return await self.actor.call(self._login, password)
+    
+    async def _login(self, password: str) -> bool:
         """Log in to the EVSE following the TypeScript sequence"""
         try:
             _LOGGER.info(f"Attempting to connect to {self.info.serial} with password")
             
             # 0. Reset connection state before starting
-            self._logged_in = False
+            self.session = SessionState.AUTHENTICATING
             self.last_active_login = None
+            self.communicator.metrics.inc('logins', self.info.serial)
             
             # 1. Send RequestLogin with password
             login_request = RequestLogin()
             login_request.set_device_serial(self.info.serial)
             login_request.set_device_password(password)
             
-            await self.send_datagram(login_request)
-            _LOGGER.debug(f"RequestLogin sent to {self.info.serial}")
-            
             # 2. Wait for LoginResponse or PasswordErrorResponse (max 3 seconds)
-            response = await self._wait_for_response([LoginResponse.COMMAND, PasswordErrorResponse.COMMAND], 3.0)
+            response = await self._request(
+                login_request, [LoginResponse.COMMAND, PasswordErrorResponse.COMMAND], 3.0
+            )
             
             if response and response.get_command() == PasswordErrorResponse.COMMAND:
                 _LOGGER.error(f"Incorrect password for {self.info.serial}")
+                self.session = SessionState.DISCONNECTED
                 return False
             
             if not response or response.get_command() != LoginResponse.COMMAND:
                 _LOGGER.error(f"No login response from {self.info.serial}")
+                self.session = SessionState.DISCONNECTED
                 return False
             
             # 3. Password correct, save and send LoginConfirm
@@ -205,6 +426,7 @@ class EVSE:
             
             # 5. Mark as connected
             self._logged_in = True
+            self.mark_changed()
             self.last_active_login = datetime.now()
             _LOGGER.info(f"Connection established with {self.info.serial}")
             
@@ -218,25 +440,35 @@ class EVSE:
                 
         except Exception as e:
             _LOGGER.error(f"Error while connecting to {self.info.serial}: {e}")
+            if self.session == SessionState.AUTHENTICATING:
+                self.session = SessionState.DISCONNECTED
             return False
     
-    async def _wait_for_response(self, expected_commands: list, timeout: float):
-        """Wait for a response with specific commands"""
-        start_time = asyncio.get_event_loop().time()
+    async def _request(self, datagram: Datagram, expected_commands: Iterable[int], timeout: float) -> Optional[Datagram]:
+        """Send a datagram and wait for the first response with one of the expected commands
         
-    # Ignore any previous response by resetting to zero
-        self._last_response = None
-        
-        while (asyncio.get_event_loop().time() - start_time) < timeout:
-            # Check if a new response with an expected command was received
-            if self._last_response and self._last_response.get_command() in expected_commands:
-                response = self._last_response
-                self._last_response = None  # Consume the response
-                return response
-            
-            await asyncio.sleep(0.1)
-        
-        return None
+        The waiter is registered before sending so a fast response cannot be
+        missed, and a timeout only cancels this request's own waiter.
+        """
+        waiter = self.communicator.expect_response(self.info.serial, expected_commands)
+        try:
+            await self.send_datagram(datagram)
+            _LOGGER.debug(f"{datagram.__class__.__name__} sent to {self.info.serial}")
+            sent = time.monotonic()
+            response = await asyncio.wait_for(waiter, timeout)
+            self._record_rtt(datagram.get_command(), time.monotonic() - sent)
+            return response
+        except asyncio.TimeoutError:
+            self.communicator.metrics.inc('request_timeouts', self.info.serial, datagram.get_command())
+            return None
+        finally:
+            self.communicator.discard_response(self.info.serial, waiter)
+    
+    def _record_rtt(self, command: int, elapsed: float):
+        """Record the round-trip time of a request (and keep it as the last one)"""
+        metrics = self.communicator.metrics
+        metrics.observe('rtt', elapsed, self.info.serial, command)
+        metrics.set('last_rtt', elapsed, self.info.serial)
     
     async def _fetch_config(self):
         """Fetch the EVSE configuration"""
@@ -247,9 +479,76 @@ class EVSE:
         await self.send_datagram(heading)
         _LOGGER.debug(f"Configuration request sent to {self.info.serial}")
     
+    async def _confirmed_request(self, datagram: Datagram, expected_commands: Iterable[int],
+                                 predicate: Optional[Callable[[Datagram], bool]] = None,
+                                 sent: Optional[asyncio.Future] = None) -> Optional[Datagram]:
+        """Send a datagram until it is confirmed
+        
+        The frame is packed once and sent again, unchanged, after CONFIRM_TIMEOUT,
+        then twice that, etc. (CONFIRM_ATTEMPTS sends at most), so a repeat is
+        idempotent. Returns the confirming datagram, None if none came.
+        The optional sent future is resolved once the first frame is sent.
+        """
+        name = datagram.__class__.__name__
+        frame = self.frames.pack(datagram)
+        waiter = self.communicator.expect_response(self.info.serial, expected_commands, predicate)
+        start = time.monotonic()
+        try:
+            timeout = CONFIRM_TIMEOUT
+            for attempt in range(1, CONFIRM_ATTEMPTS + 1):
+                if attempt > 1:
+                    _LOGGER.debug(f"{name} not confirmed by {self.info.serial}, attempt {attempt}")
+                await self.communicator.send_frame(frame, self)
+                _mark_sent(sent)
+                sent_at = time.monotonic()
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(waiter), timeout)
+                except asyncio.TimeoutError:
+                    timeout *= 2
+                    continue
+                self._record_rtt(datagram.get_command(), time.monotonic() - sent_at)
+                self.communicator._record_confirmation(self.info.serial, datagram.get_command(),
+                                                       time.monotonic() - start, attempt)
+                return response
+            self.communicator._record_confirmation(self.info.serial, datagram.get_command(), None, CONFIRM_ATTEMPTS)
+            return None
+        finally:
+            self.communicator.discard_response(self.info.serial, waiter)
+    
+    def _output_reaches(self, target: int) -> Callable[[Datagram], bool]:
+        """Predicate confirming a charge command by its response or an output transition
+        
+        A status only confirms once it shows the output at target after the
+        output was seen in another state, in the last status before the
+        command or in a status received since: a status sent before the
+        EVSE handled the command, or the status of an output that was
+        already at target, confirms nothing.
+        """
+        left = self.state is not None and self.state.output_state != target
+        
+        def predicate(datagram: Datagram) -> bool:
+            nonlocal left
+            if not isinstance(datagram, SingleACStatus):
+                return True
+            if datagram.output_state != target:
+                left = True
+                return False
+            return left
+        return predicate
+    
     async def charge_start(self, max_amps: int = 6, single_phase: bool = False, 
-                          user_id: str = "", charge_id: str = "") -> bool:
-        """Start charging"""
+                          user_id: str = "", charge_id: str = "", confirm: bool = True) -> bool:
+        """Start charging, after the commands already queued for the EVSE"""
+        return await self.actor.call(self._charge_start, max_amps, single_phase, user_id, charge_id, confirm)
+    
+    async def _charge_start(self, max_amps: int, single_phase: bool, user_id: str, charge_id: str,
+                            confirm: bool) -> bool:
+        """Start charging
+        
+        With confirm, the command is retransmitted (same charge_id) until a
+        ChargeStartResponse or a status showing the output turn on is
+        received (see _output_reaches).
+        """
         if not self.is_logged_in():
             raise RuntimeError("Non connecté à l'EVSE")
         
@@ -269,16 +568,35 @@ class EVSE:
                 import time
                 charge_start.set_charge_id(f"{int(time.time())}")
             
-            await self.send_datagram(charge_start)
-            _LOGGER.info(f"Charge command sent: {max_amps}A")
+            if not confirm:
+                await self.send_datagram(charge_start)
+                _LOGGER.info(f"Charge command sent: {max_amps}A")
+                return True
+            
+            response = await self._confirmed_request(
+                charge_start, [ChargeStartResponse.COMMAND, SingleACStatus.COMMAND], self._output_reaches(1),
+            )
+            if response is None:
+                _LOGGER.error(f"Charge start not confirmed by {self.info.serial}")
+                return False
+            _LOGGER.info(f"Charge start confirmed: {max_amps}A")
             return True
             
         except Exception as e:
             _LOGGER.error(f"Error while starting charge: {e}")
             return False
     
-    async def charge_stop(self, user_id: str = "") -> bool:
-        """Stop charging"""
+    async def charge_stop(self, user_id: str = "", confirm: bool = True,
+                          sent: Optional[asyncio.Future] = None) -> bool:
+        """Stop charging
+        
+        For safety the stop bypasses the command mailbox: it is sent right
+        away, even while another command waits for its response. With
+        confirm, the command is retransmitted until a ChargeStopResponse or
+        a status showing the output turn off is received (see
+        _output_reaches). The optional sent future is resolved as soon as
+        the stop frame is sent.
+        """
         if not self.is_logged_in():
             raise RuntimeError("Non connecté à l'EVSE")
         
@@ -288,8 +606,19 @@ class EVSE:
             charge_stop.set_device_password(self.password)
             charge_stop.user_id = user_id
             
-            await self.send_datagram(charge_stop)
-            _LOGGER.info("Charge stop command sent")
+            if not confirm:
+                await self.send_datagram(charge_stop)
+                _mark_sent(sent)
+                _LOGGER.info("Charge stop command sent")
+                return True
+            
+            response = await self._confirmed_request(
+                charge_stop, [ChargeStopResponse.COMMAND, SingleACStatus.COMMAND], self._output_reaches(0), sent,
+            )
+            if response is None:
+                _LOGGER.error(f"Charge stop not confirmed by {self.info.serial}")
+                return False
+            _LOGGER.info("Charge stop confirmed")
             return True
             
         except Exception as e:
@@ -297,6 +626,10 @@ class EVSE:
             return False
     
     async def set_max_electricity(self, amps: int) -> bool:
+        """Set the maximum current, after the commands already queued for the EVSE"""
+        return await self.actor.call(self._set_max_electricity, amps)
+    
+    async def _set_max_electricity(self, amps: int) -> bool:
         """Set the maximum current"""
         if not self.is_logged_in():
             _LOGGER.error(f"EVSE {self.info.serial} not connected")
@@ -311,11 +644,8 @@ class EVSE:
             set_current.action = 1  # SET action
             set_current.electricity = amps
             
-            await self.send_datagram(set_current)
-            _LOGGER.debug(f"SetAndGetOutputElectricity sent to {self.info.serial}")
-            
             # Wait for SetAndGetOutputElectricityResponse
-            response = await self._wait_for_response([SetAndGetOutputElectricityResponse.COMMAND], 5.0)
+            response = await self._request(set_current, [SetAndGetOutputElectricityResponse.COMMAND], 5.0)
             
             if not response:
                 _LOGGER.error(f"No response for set_max_electricity from {self.info.serial}")
@@ -323,6 +653,7 @@ class EVSE:
                 
             if hasattr(response, 'electricity') and response.electricity == amps:
                 self.config.max_electricity = amps
+                self.mark_changed()
                 _LOGGER.info(f"Max current confirmed at {amps}A for {self.info.serial}")
                 return True
             else:
@@ -371,16 +702,90 @@ class EVSE:
             _LOGGER.error(f"Error during synchronization: {e}")
             return False
 
+# Registry of datagram handlers: command -> coroutine(communicator, evse, datagram)
+DatagramHandler = Callable[['Communicator', EVSE, Datagram], Awaitable[None]]
+DATAGRAM_HANDLERS: Dict[int, DatagramHandler] = {}
+
+def register_handler(*datagram_classes: Type[Datagram]) -> Callable[[DatagramHandler], DatagramHandler]:
+    """Decorator to register the handler of one or more datagram types"""
+    def decorator(handler: DatagramHandler) -> DatagramHandler:
+        for cls in datagram_classes:
+            if cls.COMMAND in DATAGRAM_HANDLERS:
+                existing = DATAGRAM_HANDLERS[cls.COMMAND]
+                raise ValueError(f"Command {cls.COMMAND} already handled by {existing.__name__}")
+            DATAGRAM_HANDLERS[cls.COMMAND] = handler
+        return handler
+    return decorator
+
+class _EVSEDatagramProtocol(asyncio.DatagramProtocol):
+    """asyncio protocol feeding received UDP packets to the communicator"""
+
+    def __init__(self, communicator: 'Communicator'):
+        self.communicator = communicator
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        """Called by the event loop only when a packet is available"""
+        self.communicator._schedule_message(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        _LOGGER.debug(f"UDP error received: {exc}")
+
+    def pause_writing(self) -> None:
+        """Called when the transport buffer goes over the high-water mark"""
+        self.communicator._writing_paused = True
+
+    def resume_writing(self) -> None:
+        """Called when the transport buffer drains below the low-water mark"""
+        self.communicator._writing_paused = False
+        self.communicator._flush_outbound()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if exc:
+            _LOGGER.debug(f"UDP endpoint closed with error: {exc}")
+
 class Communicator:
     """Main UDP communicator"""
     
     def __init__(self, port: int = 28376):
         self.port = port
         self.socket: Optional[socket.socket] = None
+        self.transport: Optional[asyncio.DatagramTransport] = None
         self.running = False
         self.evses: Dict[str, EVSE] = {}
-        self.callbacks: Dict[str, Callable] = {}
+        self.callbacks = CallbackRegistry()
         self._periodic_task: Optional[asyncio.Task] = None
+        # Periodic jobs: (serial, 'keepalive' | 'status' | 'relogin') -> deadline
+        self.scheduler = Scheduler()
+        self._scheduler_wakeup = asyncio.Event()
+        self._login_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LOGINS)
+        self._relogin_tasks: Dict[str, asyncio.Task] = {}
+        self._message_tasks: set = set()
+        # Mailboxes of each EVSE: serial -> EVSEActor (see protocol.actor)
+        self._actors: Dict[str, EVSEActor] = {}
+        # Packets, errors, logins, events, confirmations and latencies by
+        # serial and command (see get_metrics): the single source of the
+        # communicator counters. The mailboxes and callbacks keep their own
+        # stats, copied as gauges by get_metrics()
+        self.metrics = MetricsRegistry()
+        # Deadbands applied to state updates
+        self.deadbands: Dict[str, float] = dict(DEFAULT_DEADBANDS)
+        # Status polling interval of each meta state (see DEFAULT_POLL_INTERVALS)
+        self.poll_intervals: Dict[str, float] = dict(DEFAULT_POLL_INTERVALS)
+        # Requests waiting for a response: serial -> [(expected commands, predicate, future)]
+        self._pending: Dict[str, List[Tuple[frozenset, Optional[Callable[[Datagram], bool]], asyncio.Future]]] = {}
+        # Optional on-disk cache of the discovered EVSEs, restored by start()
+        self.discovery_cache: Optional[DiscoveryCache] = None
+        self._cache_flush_task: Optional[asyncio.Task] = None
+        # Callers of wait_for_evse(): serial -> futures
+        self._evse_waiters: Dict[str, List[asyncio.Future]] = {}
+        # Frames waiting for the transport to accept writes again, one queue
+        # per priority: (sequence, frame, address)
+        self._outbound: List[deque] = [deque() for _ in PRIORITY_NAMES]
+        self._outbound_size = 0
+        self._outbound_sequence = 0
+        # Frames sent in a row while less urgent ones were waiting
+        self._outbound_streak = 0
+        self._writing_paused = False
     
     async def start(self) -> int:
         """Start the communicator"""
@@ -400,17 +805,32 @@ class Communicator:
             except OSError:
                 _LOGGER.warning("Broadcast not supported")
             
+            # Hand the socket over to the event loop: packets are delivered
+            # to datagram_received as they arrive, without polling
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: _EVSEDatagramProtocol(self),
+                sock=self.socket,
+            )
+            
             self.running = True
             _LOGGER.info(f"Communicator started on port {self.port}")
             
+            # Known EVSEs can be reached by unicast without waiting for a broadcast
+            await self._restore_discovery_cache()
+            
             # Start asyncio tasks
-            asyncio.create_task(self._listen_loop())
+            for evse in self.evses.values():
+                self._schedule_jobs(evse)
             self._periodic_task = asyncio.create_task(self._periodic_checks())
             
             return self.port
             
         except Exception as e:
             _LOGGER.error(f"Erreur lors du démarrage: {e}")
+            if self.socket:
+                self.socket.close()
+                self.socket = None
             raise
     
     async def stop(self):
@@ -419,41 +839,246 @@ class Communicator:
         
         if self._periodic_task:
             self._periodic_task.cancel()
+        self._cancel_relogins()
         
-        if self.socket:
-            self.socket.close()
-            self.socket = None
+        self._close_transport()
+        
+        if self.discovery_cache:
+            await self.discovery_cache.async_flush()
         
         _LOGGER.info("Communicator stopped")
     
-    async def _listen_loop(self):
-        """UDP listen loop"""
-        while self.running and self.socket:
+    async def _restore_discovery_cache(self):
+        """Pre-populate evses from the discovery cache"""
+        if not self.discovery_cache:
+            return
+        restored = 0
+        for serial, entry in (await self.discovery_cache.async_load()).items():
+            if serial in self.evses:
+                continue
             try:
-                await asyncio.sleep(0.01)  # Avoid blocking
-                
-                try:
-                    # Check that the socket still exists
-                    if not self.socket:
-                        break
-                        
-                    data, addr = self.socket.recvfrom(1024)
-                    await self._handle_message(data, addr)
-                except socket.error:
-                    # No data available
-                    continue
-                    
-            except Exception as e:
-                if self.running and self.socket:  # Only log if we should still be running
-                    _LOGGER.error(f"Error in listen loop: {e}")
-                await asyncio.sleep(1)
+                self.evses[serial] = EVSE.from_cache_entry(self, entry)
+                restored += 1
+            except (KeyError, TypeError, ValueError) as e:
+                _LOGGER.warning(f"Invalid discovery cache entry for {serial}: {e}")
+        if restored:
+            _LOGGER.info(f"{restored} EVSE(s) restored from the discovery cache")
+    
+    def _evse_changed(self, evse: EVSE):
+        """Follow a change of the EVSE data (see EVSE.mark_changed)"""
+        # Record the EVSE in the discovery cache (written later, debounced)
+        if self.discovery_cache:
+            self.discovery_cache.update(evse.info.serial, evse.to_cache_entry())
+        # Switch the polling rate as soon as the meta state changes
+        if evse.get_meta_state() != evse.poll_mode:
+            self.scheduler.schedule((evse.info.serial, 'status'), self._update_poll_mode(evse))
+            self._scheduler_wakeup.set()
+    
+    def _close_transport(self):
+        """Close the datagram transport (and the socket it owns)"""
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+        elif self.socket:
+            self.socket.close()
+        self.socket = None
+        
+        for task in self._message_tasks:
+            task.cancel()
+        self._message_tasks.clear()
+        for actor in self._actors.values():
+            actor.stop()
+        for queue in self._outbound:
+            queue.clear()
+        self._outbound_size = 0
+        self._writing_paused = False
+    
+    def _schedule_message(self, data: bytes, addr: tuple):
+        """Schedule the handling of a received packet
+        
+        Packets are timestamped and queued in the inbound mailbox of the
+        EVSE whose serial is in their header, and handled in order by its
+        task. A full mailbox drops its oldest status push first.
         
-        _LOGGER.debug("UDP listen loop ended")
+        Mailboxes are only created for known EVSEs or valid frames, so
+        random traffic cannot create one per forged serial.
+        """
+        if not self.running:
+            return
+        if len(data) >= 13:
+            serial = data[5:13].hex()
+            actor = self._actors.get(serial)
+            if actor is None:
+                if serial not in self.evses and not is_valid_frame(data):
+                    _LOGGER.debug(f"Invalid packet from {addr[0]} dropped")
+                    return
+                actor = self._actor(serial)
+            if actor.post_inbound((data, addr, time.monotonic())):
+                self.metrics.inc('frames_queued', serial)
+            else:
+                _LOGGER.debug(f"Inbound mailbox of {serial} full, packet dropped")
+            return
+        task = asyncio.get_running_loop().create_task(self._handle_message(data, addr))
+        # Keep a reference until done so the task is not garbage collected
+        self._message_tasks.add(task)
+        task.add_done_callback(self._message_tasks.discard)
+    
+    def _actor(self, serial: str) -> EVSEActor:
+        """Mailboxes of an EVSE, created on first use"""
+        actor = self._actors.get(serial)
+        if actor is None:
+            actor = self._actors[serial] = EVSEActor(
+                serial, self._handle_inbound,
+                inbound_droppable=self._is_redundant, on_inbound_drop=self._inbound_dropped,
+                on_idle=self._actor_idle)
+        return actor
+    
+    @staticmethod
+    def _is_redundant(item: Tuple[bytes, tuple, float]) -> bool:
+        """Whether a queued packet is a status push (see REDUNDANT_COMMANDS)"""
+        data = item[0]
+        return len(data) >= 21 and int.from_bytes(data[19:21], 'big') in REDUNDANT_COMMANDS
+    
+    def _inbound_dropped(self, item: Tuple[bytes, tuple, float]):
+        data = item[0]
+        self.metrics.inc('frames_dropped', data[5:13].hex(), int.from_bytes(data[19:21], 'big'))
+    
+    async def _handle_inbound(self, item: Tuple[bytes, tuple, float]):
+        data, addr, received = item
+        self.metrics.observe('ingest_latency', time.monotonic() - received)
+        await self._handle_message(data, addr)
+        self.metrics.inc('frames_processed', data[5:13].hex())
+    
+    def _actor_idle(self, actor: EVSEActor):
+        """Forget the idle mailboxes of a serial that is not (or no longer) a known EVSE"""
+        if actor.serial not in self.evses and self._actors.get(actor.serial) is actor:
+            del self._actors[actor.serial]
+    
+    def forget_evse(self, serial: str):
+        """Forget an EVSE: its jobs, re-login, pending requests, mailboxes and cache entry"""
+        self.evses.pop(serial, None)
+        if self.discovery_cache:
+            self.discovery_cache.remove(serial)
+        for job in ('keepalive', 'status', 'relogin'):
+            self.scheduler.cancel((serial, job))
+        task = self._relogin_tasks.pop(serial, None)
+        if task is not None:
+            task.cancel()
+        for _, _, future in self._pending.pop(serial, ()):
+            future.cancel()
+        actor = self._actors.pop(serial, None)
+        if actor is not None:
+            actor.stop()
+    
+    def get_metrics(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Snapshot of the protocol metrics (see MetricsRegistry.snapshot), with current gauges"""
+        self.metrics.set('evses', len(self.evses))
+        self.metrics.set('sessions_active', sum(
+            1 for evse in self.evses.values() if evse.session == SessionState.ACTIVE))
+        self.metrics.set('send_queue_depth', self._outbound_size)
+        self.metrics.set('ingest_queue_depth', sum(len(actor.inbound) for actor in self._actors.values()))
+        # Stats kept by the mailboxes (serial, 'inbound' | 'commands') and the callbacks (name)
+        for stat in MAILBOX_STATS:
+            self.metrics.clear_gauge(f'mailbox_{stat}')
+        for serial, actor in self._actors.items():
+            for mailbox, stats in actor.stats().items():
+                for stat in MAILBOX_STATS:
+                    self.metrics.set(f'mailbox_{stat}', stats[stat], serial, mailbox)
+        for stat in CALLBACK_STATS:
+            self.metrics.clear_gauge(f'callback_{stat}')
+        for name, stats in self.callbacks.stats().items():
+            for stat in CALLBACK_STATS:
+                self.metrics.set(f'callback_{stat}', stats[stat], None, name)
+        return self.metrics.snapshot()
+    
+    @property
+    def frames_queued(self) -> int:
+        """Received packets queued in the inbound mailboxes"""
+        return self.metrics.total('frames_queued')
+    
+    @property
+    def frames_dropped(self) -> Dict[str, int]:
+        """Received packets dropped from full mailboxes: status pushes and other frames"""
+        dropped = {'status': 0, 'control': 0}
+        for command, count in self.metrics.by_command('frames_dropped').items():
+            dropped['status' if command in REDUNDANT_COMMANDS else 'control'] += count
+        return dropped
+    
+    @property
+    def frames_processed(self) -> int:
+        """Received packets taken from the inbound mailboxes and handled"""
+        return self.metrics.total('frames_processed')
+    
+    @property
+    def unhandled_commands(self) -> Dict[int, int]:
+        """Datagrams received without a registered handler: command -> count"""
+        return self.metrics.by_command('unhandled_commands')
+    
+    @property
+    def logins_performed(self) -> int:
+        """Full login sequences run"""
+        return self.metrics.total('logins')
+    
+    @property
+    def logins_avoided(self) -> int:
+        """Re-logins skipped because the session was still alive"""
+        return self.metrics.total('logins_avoided')
+    
+    @property
+    def events_emitted(self) -> Dict[str, int]:
+        """Events notified to the callbacks: event -> count"""
+        return self.metrics.by_command('events_emitted')
+    
+    @property
+    def events_suppressed(self) -> Dict[str, int]:
+        """State updates that changed nothing (no event): event -> count"""
+        return self.metrics.by_command('events_suppressed')
+    
+    @property
+    def field_changes(self) -> Dict[str, int]:
+        """Changes of each state field: field -> count"""
+        return self.metrics.by_command('field_changes')
+    
+    @property
+    def outbound_dropped(self) -> Dict[str, int]:
+        """Frames dropped from the full send queue, by priority"""
+        dropped = dict.fromkeys(PRIORITY_NAMES, 0)
+        dropped.update(self.metrics.by_command('outbound_dropped'))
+        return dropped
+    
+    @property
+    def ingest_latency(self) -> LatencyHistogram:
+        """Time spent by received packets in the inbound mailboxes"""
+        return self.metrics.histogram('ingest_latency') or LatencyHistogram(self.metrics.latency_bounds)
+    
+    def get_ingest_stats(self) -> Dict[str, Any]:
+        """Received packets queued, dropped and handled, and their queue latency"""
+        return {
+            'queued': self.frames_queued,
+            'dropped': self.frames_dropped,
+            'processed': self.frames_processed,
+            'depth': sum(len(actor.inbound) for actor in self._actors.values()),
+            'latency': self.ingest_latency.snapshot(),
+        }
+    
+    def inbound_depth(self, serial: str) -> int:
+        """Received packets of an EVSE waiting in its inbound mailbox (does not create one)"""
+        actor = self._actors.get(serial)
+        return len(actor.inbound) if actor else 0
+    
+    def get_actor_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Depth and processing time of the mailboxes of each EVSE"""
+        return {serial: actor.stats() for serial, actor in self._actors.items()}
     
     async def _handle_message(self, data: bytes, addr: tuple):
         """Handle a received message"""
         try:
-            datagrams = parse_datagrams(data)
+            # Errors are labelled with the claimed serial only when it is a
+            # known EVSE at this address (see parse_datagrams)
+            serial = data[5:13].hex()
+            evse = self.evses.get(serial)
+            source = serial if evse is not None and evse.info.ip == addr[0] else UNKNOWN_SERIAL
+            datagrams = parse_datagrams(data, self.metrics, source)
             
             for datagram in datagrams:
                 await self._process_datagram(datagram, addr)
@@ -475,47 +1100,43 @@ class Communicator:
             evse = EVSE(self, serial, ip, port)
             self.evses[serial] = evse
             _LOGGER.info(f"New EVSE discovered: {serial} @ {ip}")
+            self._schedule_jobs(evse)
             await self._notify_callbacks('evse_added', evse)
         else:
             # Update IP if changed
             if evse.update_ip(ip, port):
                 await self._notify_callbacks('evse_changed', evse)
-        # Update last_seen and store the response for authentication
+        # Update last_seen and wake up any request waiting for this response
         evse.last_seen = datetime.now()
-        evse._last_response = datagram  # Store for _wait_for_response
-        # Handle the specific datagram
-        if isinstance(datagram, Login):
-            await self._handle_login(evse, datagram)
-        elif isinstance(datagram, LoginResponse):
-            await self._handle_login_response(evse, datagram)
-        elif isinstance(datagram, SingleACStatus):
-            await self._handle_status(evse, datagram)
-        elif isinstance(datagram, SingleACChargingStatusPublicAuto):
-            await self._handle_charging_status(evse, datagram)
-        # elif isinstance(datagram, EVSERealTimeStatus):
-        #     await self._handle_realtime_status(evse, datagram)
-        # elif isinstance(datagram, EVSECurrentConfiguration):
-        #     await self._handle_current_configuration(evse, datagram)
-        elif isinstance(datagram, CurrentChargeRecord):
-            await self._handle_charge_record(evse, datagram)
-        elif isinstance(datagram, Heading):
-            await self._handle_heading(evse, datagram)
-        elif isinstance(datagram, SetAndGetOutputElectricityResponse):
-            await self._handle_output_electricity_response(evse, datagram)
-        elif isinstance(datagram, PasswordErrorResponse):
-            # PasswordErrorResponses are handled in the login() method via _wait_for_response
-            # Ignore those arriving here to avoid misleading error logs
-            _LOGGER.debug(f"PasswordErrorResponse received for {serial} (handled by auth logic)")
-        # elif isinstance(datagram, UnknownCommand341):
-        #     _LOGGER.debug(f"Commande 341 reçue de {serial}, données: {datagram.raw_data.hex()}")
-        #     # Pas de traitement spécial nécessaire pour l'instant
+        evse.restored = False
+        evse.last_frame = time.monotonic()
+        self._resolve_pending(serial, datagram)
+        # Dispatch to the handler registered for this command
+        command = datagram.get_command()
+        if command in REDUNDANT_COMMANDS:
+            evse.last_status_frame = evse.last_frame
+        if evse._logged_in and command not in UNAUTHENTICATED_COMMANDS:
+            evse.session_alive()
+        handler = DATAGRAM_HANDLERS.get(command)
+        if handler is None:
+            self.metrics.inc('unhandled_commands', serial, command)
+        else:
+            start = time.perf_counter()
+            await handler(self, evse, datagram)
+            self.metrics.observe('dispatch_time', time.perf_counter() - start, serial, command)
+        # The datagram is processed: wake up whoever waits for this EVSE
+        for future in self._evse_waiters.pop(serial, ()):
+            if not future.done():
+                future.set_result(evse)
     
+    @register_handler(LoginResponse)
     async def _handle_login_response(self, evse: EVSE, datagram: LoginResponse):
         """Handle a successful login response (0x0002)"""
         _LOGGER.info(f"LoginResponse received from {evse.info.serial}")
         # This response indicates the password was correct
         # The real login will be completed by LoginConfirm in the login() method
     
+    @register_handler(Login)
     async def _handle_login(self, evse: EVSE, datagram: Login):
         """Handle an EVSE discovery broadcast"""
         evse.info.brand = datagram.brand
@@ -537,34 +1158,35 @@ class Communicator:
         evse._logged_in = True
         await self._notify_callbacks('evse_logged_in', evse)
     
+    @register_handler(SingleACStatus)
     async def _handle_status(self, evse: EVSE, datagram: SingleACStatus):
         """Handle an AC status"""
         if not evse.state:
             evse.state = EVSEState()
         
         # Copy data from SingleACStatus to EVSEState
-        evse.state.current_power = datagram.current_power
-        evse.state.current_amount = datagram.total_kwh_counter  # Corriger le mapping
-        evse.state.l1_voltage = datagram.l1_voltage
-        evse.state.l1_electricity = datagram.l1_electricity
-        evse.state.l2_voltage = datagram.l2_voltage
-        evse.state.l2_electricity = datagram.l2_electricity
-        evse.state.l3_voltage = datagram.l3_voltage
-        evse.state.l3_electricity = datagram.l3_electricity
-        evse.state.inner_temp = datagram.inner_temp
-        evse.state.outer_temp = datagram.outer_temp
-        evse.state.current_state = datagram.current_state
-        evse.state.gun_state = datagram.gun_state
-        evse.state.output_state = datagram.output_state
-        evse.state.errors = datagram.errors
+        changes = evse.state.update({
+            'current_power': datagram.current_power,
+            'current_amount': datagram.total_kwh_counter,  # Corriger le mapping
+            'l1_voltage': datagram.l1_voltage,
+            'l1_electricity': datagram.l1_electricity,
+            'l2_voltage': datagram.l2_voltage,
+            'l2_electricity': datagram.l2_electricity,
+            'l3_voltage': datagram.l3_voltage,
+            'l3_electricity': datagram.l3_electricity,
+            'inner_temp': datagram.inner_temp,
+            'outer_temp': datagram.outer_temp,
+            'current_state': datagram.current_state,
+            'gun_state': datagram.gun_state,
+            'output_state': datagram.output_state,
+            'errors': datagram.errors,
+        }, self.deadbands)
         _LOGGER.debug(f"Status received for {evse.info.serial}: L1={datagram.l1_voltage}V, Temp={datagram.inner_temp}°C")
         # Respond to status
-        response = SingleACStatusResponse()
-        response.set_device_serial(evse.info.serial)
-        response.set_device_password(evse.password)
-        await evse.send_datagram(response)
-        await self._notify_callbacks('evse_state_changed', evse)
+        await evse.send_cached(SingleACStatusResponse)
+        await self._notify_changes('evse_state_changed', evse, changes)
     
+    @register_handler(SingleACChargingStatusPublicAuto)
     async def _handle_charging_status(self, evse: EVSE, datagram: SingleACChargingStatusPublicAuto):
         """Handle automatic AC charging status (command 0x0005)"""
         _LOGGER.debug(f"Charge status received for {evse.info.serial}")
@@ -572,26 +1194,25 @@ class Communicator:
         if not evse.current_charge:
             evse.current_charge = EVSECurrentCharge()
         # Copy charge status data
-        evse.current_charge.charge_id = datagram.charge_id
-        evse.current_charge.current_state = datagram.current_state
-        evse.current_charge.start_type = datagram.start_type
-        evse.current_charge.charge_type = datagram.charge_type
-        evse.current_charge.max_duration_minutes = datagram.max_duration_minutes
-        evse.current_charge.max_energy_kwh = datagram.max_energy_kwh
-        evse.current_charge.max_electricity = datagram.max_electricity
-        evse.current_charge.start_date = datagram.start_date
-        evse.current_charge.duration_seconds = datagram.duration_seconds
-        evse.current_charge.start_kwh_counter = datagram.start_kwh_counter
-        evse.current_charge.current_kwh_counter = datagram.current_kwh_counter
-        evse.current_charge.charge_kwh = datagram.charge_kwh
-        evse.current_charge.charge_price = datagram.charge_price
-        evse.current_charge.charge_fee = datagram.charge_fee
+        changes = evse.current_charge.update({
+            'charge_id': datagram.charge_id,
+            'current_state': datagram.current_state,
+            'start_type': datagram.start_type,
+            'charge_type': datagram.charge_type,
+            'max_duration_minutes': datagram.max_duration_minutes,
+            'max_energy_kwh': datagram.max_energy_kwh,
+            'max_electricity': datagram.max_electricity,
+            'start_date': datagram.start_date,
+            'duration_seconds': datagram.duration_seconds,
+            'start_kwh_counter': datagram.start_kwh_counter,
+            'current_kwh_counter': datagram.current_kwh_counter,
+            'charge_kwh': datagram.charge_kwh,
+            'charge_price': datagram.charge_price,
+            'charge_fee': datagram.charge_fee,
+        }, self.deadbands)
         # Send acknowledgment (as in TypeScript)
-        response = SingleACChargingStatusResponse()
-        response.set_device_serial(evse.info.serial)
-        response.set_device_password(evse.password)
-        await evse.send_datagram(response)
-        await self._notify_callbacks('evse_charge_status_changed', evse)
+        await evse.send_cached(SingleACChargingStatusResponse)
+        await self._notify_changes('evse_charge_status_changed', evse, changes)
     
     # MÉTHODES TEMPORAIREMENT DÉSACTIVÉES - À RÉIMPLÉMENTER
     
@@ -603,48 +1224,139 @@ class Communicator:
     #     """Traiter la configuration de courant (commande 0x010c) - DÉSACTIVÉ"""
     #     pass
     
+    @register_handler(CurrentChargeRecord)
     async def _handle_charge_record(self, evse: EVSE, datagram: CurrentChargeRecord):
         """Handle a charge record"""
         if not evse.current_charge:
             evse.current_charge = EVSECurrentCharge()
         
         # Map protocol attributes to internal structure
-        evse.current_charge.port = datagram.line_id  # line_id → port
-        # current_state does not exist in CurrentChargeRecord, keep existing value
-        evse.current_charge.charge_id = datagram.charge_id
-        evse.current_charge.start_type = datagram.start_type
-        evse.current_charge.charge_type = datagram.charge_type
-        evse.current_charge.reservation_date = datagram.reservation_data  # reservation_data → reservation_date
-        evse.current_charge.user_id = datagram.start_user_id  # start_user_id → user_id
-        # max_electricity does not exist in CurrentChargeRecord, keep existing value
-        evse.current_charge.start_date = datagram.start_date
-        evse.current_charge.duration_seconds = datagram.charged_time  # charged_time → duration_seconds
-        evse.current_charge.start_kwh_counter = datagram.charge_start_power  # charge_start_power → start_kwh_counter
-        evse.current_charge.current_kwh_counter = datagram.charge_stop_power  # charge_stop_power → current_kwh_counter
-        evse.current_charge.charge_kwh = datagram.charge_power  # charge_power → charge_kwh
-        evse.current_charge.charge_price = datagram.charge_price
-        evse.current_charge.fee_type = datagram.fee_type
-        evse.current_charge.charge_fee = datagram.charge_fee
-        evse._last_response = datagram  # Store for _wait_for_response
-        await self._notify_callbacks('evse_charge_changed', evse)
+        changes = evse.current_charge.update({
+            'port': datagram.line_id,  # line_id → port
+            # current_state does not exist in CurrentChargeRecord, keep existing value
+            'charge_id': datagram.charge_id,
+            'start_type': datagram.start_type,
+            'charge_type': datagram.charge_type,
+            'reservation_date': datagram.reservation_data,  # reservation_data → reservation_date
+            'user_id': datagram.start_user_id,  # start_user_id → user_id
+            # max_electricity does not exist in CurrentChargeRecord, keep existing value
+            'start_date': datagram.start_date,
+            'duration_seconds': datagram.charged_time,  # charged_time → duration_seconds
+            'start_kwh_counter': datagram.charge_start_power,  # charge_start_power → start_kwh_counter
+            'current_kwh_counter': datagram.charge_stop_power,  # charge_stop_power → current_kwh_counter
+            'charge_kwh': datagram.charge_power,  # charge_power → charge_kwh
+            'charge_price': datagram.charge_price,
+            'fee_type': datagram.fee_type,
+            'charge_fee': datagram.charge_fee,
+        }, self.deadbands)
+        await self._notify_changes('evse_charge_changed', evse, changes)
     
+    @register_handler(Heading)
     async def _handle_heading(self, evse: EVSE, datagram: Heading):
         """Handle a heading (keepalive)"""
         # Respond to maintain the session
-        response = HeadingResponse()
-        response.set_device_serial(evse.info.serial)
-        response.set_device_password(evse.password)
-        await evse.send_datagram(response)
+        await evse.send_cached(HeadingResponse)
     
+    @register_handler(SetAndGetOutputElectricityResponse)
     async def _handle_output_electricity_response(self, evse: EVSE, datagram: SetAndGetOutputElectricityResponse):
         """Handle a current configuration response"""
         _LOGGER.debug(f"Output current response received from {evse.info.serial}: {datagram.electricity}A")
-        # The response is automatically stored in evse._last_response for _wait_for_response
+        # The waiting set_max_electricity() request is resolved by _resolve_pending
         # Update local configuration if it's a SET confirmation
         if hasattr(datagram, 'action') and datagram.action == 1:  # SET action
             evse.config.max_electricity = datagram.electricity
             await self._notify_callbacks('evse_changed', evse)
     
+    async def wait_for_evse(self, serial: str, timeout: float) -> Optional[EVSE]:
+        """Wait until a datagram from serial has been processed
+        
+        Returns immediately if the EVSE is already known and online, or
+        restored from the discovery cache (it can be reached by unicast),
+        None if nothing was received from it within timeout seconds.
+        """
+        evse = self.evses.get(serial)
+        if evse is not None and (evse.is_online() or evse.restored):
+            return evse
+        
+        future = asyncio.get_running_loop().create_future()
+        self._evse_waiters.setdefault(serial, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._evse_waiters.get(serial)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._evse_waiters[serial]
+    
+    def expect_response(self, serial: str, commands: Iterable[int],
+                        predicate: Optional[Callable[[Datagram], bool]] = None) -> asyncio.Future:
+        """Register a waiter resolved by the next datagram from serial with one of the commands
+        
+        If a predicate is given, only datagrams for which it returns True resolve the waiter.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(serial, []).append((frozenset(commands), predicate, future))
+        return future
+    
+    def discard_response(self, serial: str, future: asyncio.Future):
+        """Remove a waiter registered with expect_response"""
+        waiters = self._pending.get(serial)
+        if not waiters:
+            return
+        waiters[:] = [w for w in waiters if w[2] is not future]
+        if not waiters:
+            del self._pending[serial]
+    
+    def _resolve_pending(self, serial: str, datagram: Datagram) -> bool:
+        """Resolve the oldest waiter expecting this datagram"""
+        waiters = self._pending.get(serial)
+        if not waiters:
+            return False
+        command = datagram.get_command()
+        for commands, predicate, future in waiters:
+            if command in commands and not future.done() and (predicate is None or predicate(datagram)):
+                future.set_result(datagram)
+                return True
+        return False
+    
+    def _record_confirmation(self, serial: str, command: int, elapsed: Optional[float], attempts: int):
+        """Record the time-to-confirm of a confirmed command (None: not confirmed)"""
+        self.metrics.inc('confirmed_commands', serial, command)
+        if attempts > 1:
+            self.metrics.inc('command_retransmissions', serial, command, attempts - 1)
+        if elapsed is None:
+            self.metrics.inc('command_failures', serial, command)
+            return
+        self.metrics.observe('confirm_time', elapsed, None, command)
+        _LOGGER.debug(f"{DATAGRAM_TYPES[command].__name__} confirmed by {serial} in {elapsed:.3f}s "
+                      f"({attempts} attempt(s))")
+    
+    def get_confirm_stats(self) -> Dict[str, Dict[str, float]]:
+        """Time-to-confirm of the confirmed commands: count, mean, max (in seconds), retransmissions, failures"""
+        retransmissions = self.metrics.by_command('command_retransmissions')
+        failures = self.metrics.by_command('command_failures')
+        stats = {}
+        for command in self.metrics.by_command('confirmed_commands'):
+            histogram = self.metrics.histogram('confirm_time', None, command)
+            stats[DATAGRAM_TYPES[command].__name__] = {
+                'count': histogram.count if histogram else 0,
+                'mean': histogram.total / histogram.count if histogram else 0.0,
+                'max': histogram.max if histogram else 0.0,
+                'retransmissions': retransmissions.get(command, 0),
+                'failures': failures.get(command, 0),
+            }
+        return stats
+    
+    @register_handler(PasswordErrorResponse)
+    async def _handle_password_error(self, evse: EVSE, datagram: PasswordErrorResponse):
+        """Handle a password error (0x0155)"""
+        # PasswordErrorResponses are handled in the login() method via the pending requests
+        # Nothing else to do here, avoid misleading error logs
+        _LOGGER.debug(f"PasswordErrorResponse received for {evse.info.serial} (handled by auth logic)")
+    
     async def send(self, datagram: Datagram, evse: EVSE) -> int:
         """Send a datagram"""
         if not self.running:
@@ -657,56 +1369,238 @@ class Communicator:
         if datagram.get_device_password() is None and evse.password:
             datagram.set_device_password(evse.password)
         
-        buffer = datagram.pack()
+    # Use the EVSE's cached envelope when the datagram carries its credentials
+        frames = evse.frames
+        if (datagram.key_type == frames.key_type
+                and frames.matches(datagram.get_device_serial(), datagram.get_device_password())):
+            buffer = frames.pack(datagram)
+        else:
+            buffer = datagram.pack()
+        self._send_buffer(buffer, (evse.info.ip, evse.info.port))
         
-    # Send via the socket
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None, 
-            self.socket.sendto, 
-            buffer, 
-            (evse.info.ip, evse.info.port)
-        )
+        return len(buffer)
+    
+    async def send_frame(self, buffer: bytes, evse: EVSE) -> int:
+        """Send an already packed frame"""
+        if not self.running:
+            raise RuntimeError("Communicateur non démarré")
         
+        self._send_buffer(buffer, (evse.info.ip, evse.info.port))
         return len(buffer)
     
+    def _send_buffer(self, buffer: bytes, addr: tuple):
+        """Send a packed frame without blocking the event loop"""
+        command = int.from_bytes(buffer[19:21], 'big')
+        priority = COMMAND_PRIORITIES.get(command, PRIORITY_CONTROL)
+        serial = buffer[5:13].hex()
+        self.metrics.inc('frames_sent', serial, command)
+        if priority == PRIORITY_ACK:
+            self.metrics.inc('acks_sent', serial)
+        if self._writing_paused or self._outbound_size:
+            # Backpressure: keep the frame until the transport drains
+            self._queue_outbound(priority, buffer, addr)
+            return
+        
+    # The transport sends right away, or buffers internally on EAGAIN
+        self.transport.sendto(buffer, addr)
+    
+    def _queue_outbound(self, priority: int, buffer: bytes, addr: tuple):
+        """Queue a frame, dropping the oldest least urgent one if the queue is full"""
+        if self._outbound_size >= OUTBOUND_QUEUE_SIZE:
+            lowest = max(index for index, queue in enumerate(self._outbound) if queue)
+            if lowest < priority:
+                # Everything queued is more urgent than this frame
+                self.metrics.inc('outbound_dropped', buffer[5:13].hex(), PRIORITY_NAMES[priority])
+                _LOGGER.warning(f"Outbound queue full, dropping {PRIORITY_NAMES[priority]} frame")
+                return
+            _, dropped, _ = self._outbound[lowest].popleft()
+            self._outbound_size -= 1
+            self.metrics.inc('outbound_dropped', dropped[5:13].hex(), PRIORITY_NAMES[lowest])
+            _LOGGER.warning(f"Outbound queue full, dropping oldest {PRIORITY_NAMES[lowest]} frame")
+        self._outbound_sequence += 1
+        self._outbound[priority].append((self._outbound_sequence, buffer, addr))
+        self._outbound_size += 1
+    
+    def _next_outbound_queue(self) -> deque:
+        """Most urgent non-empty queue, or the longest-waiting other one after STARVATION_LIMIT frames"""
+        waiting = [queue for queue in self._outbound if queue]
+        if len(waiting) == 1:
+            self._outbound_streak = 0
+            return waiting[0]
+        if self._outbound_streak >= STARVATION_LIMIT:
+            self._outbound_streak = 0
+            return min(waiting[1:], key=lambda queue: queue[0][0])
+        self._outbound_streak += 1
+        return waiting[0]
+    
+    def _flush_outbound(self):
+        """Send the frames queued while the transport was paused, most urgent first"""
+        while self._outbound_size and not self._writing_paused and self.transport:
+            _, buffer, addr = self._next_outbound_queue().popleft()
+            self._outbound_size -= 1
+            self.transport.sendto(buffer, addr)
+    
+    def get_send_queue_depth(self) -> int:
+        """Number of frames waiting to be handed to the transport"""
+        return self._outbound_size
+    
+    def get_send_queue_depths(self) -> Dict[str, int]:
+        """Number of frames waiting to be handed to the transport, per priority"""
+        return {name: len(queue) for name, queue in zip(PRIORITY_NAMES, self._outbound)}
+    
+    def _schedule_jobs(self, evse: EVSE):
+        """Start the periodic jobs of an EVSE, at a random point of their interval"""
+        serial = evse.info.serial
+        self.scheduler.schedule_spread((serial, 'keepalive'), KEEPALIVE_INTERVAL)
+        self.scheduler.schedule_spread((serial, 'status'), self._update_poll_mode(evse))
+        self._scheduler_wakeup.set()
+    
     async def _periodic_checks(self):
-        """Periodic checks"""
+        """Run the jobs of each EVSE as their deadlines come due"""
+        scheduler = self.scheduler
         while self.running:
+            for serial, job in scheduler.pop_due():
+                evse = self.evses.get(serial)
+                if evse is None:
+                    continue
+                try:
+                    await self._run_job(evse, job)
+                except Exception as e:
+                    _LOGGER.error(f"Error in periodic job {job} of {serial}: {e}")
+            
+            # Sleep until the next deadline, or until new jobs are scheduled
+            deadline = scheduler.next_deadline()
+            timeout = None if deadline is None else max(deadline - scheduler.clock(), 0)
+            self._scheduler_wakeup.clear()
             try:
-                await asyncio.sleep(5)
-                
-                for evse in self.evses.values():
-                    # Check if we need to reconnect
-                    if evse.is_logged_in() and evse.last_active_login:
-                        time_since_login = datetime.now() - evse.last_active_login
-                        if time_since_login.total_seconds() > 30:
-                            # Relaunch login
-                            if evse.password:
-                                await evse.login(evse.password)
-                    
-                    # Request status regularly
-                    if evse.is_logged_in():
-                        await evse.send_datagram(RequestChargeStatusRecord())
-                
-            except Exception as e:
-                _LOGGER.error(f"Error in periodic checks: {e}")
+                await asyncio.wait_for(self._scheduler_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
     
-    async def _notify_callbacks(self, event: str, evse: EVSE):
-        """Notify callbacks"""
-        for callback in self.callbacks.values():
-            try:
-                await callback(event, evse)
-            except Exception as e:
-                _LOGGER.error(f"Error in callback: {e}")
+    async def _run_job(self, evse: EVSE, job: str):
+        """Run one periodic job and schedule its next run"""
+        serial = evse.info.serial
+        if job == 'status':
+            # Request status regularly
+            if evse.is_logged_in():
+                await evse.send_cached(RequestChargeStatusRecord)
+            self.scheduler.schedule((serial, 'status'), self._update_poll_mode(evse))
+        elif job == 'keepalive':
+            self.scheduler.schedule((serial, 'keepalive'), await self._check_keepalive(evse))
+        elif job == 'relogin':
+            if evse.session == SessionState.STALE:
+                self._start_relogin(evse)
+            else:
+                # The probe was answered (or a login ran meanwhile)
+                self._login_avoided(evse)
+    
+    def get_poll_interval(self, evse: EVSE) -> float:
+        """Status polling interval of an EVSE in its current meta state"""
+        return self.poll_intervals.get(evse.get_meta_state(), FALLBACK_POLL_INTERVAL)
     
-    def add_callback(self, name: str, callback: Callable):
-        """Add a callback"""
-        self.callbacks[name] = callback
+    def _update_poll_mode(self, evse: EVSE) -> float:
+        """Record the polling mode of the EVSE and return its interval"""
+        evse.poll_mode = evse.get_meta_state()
+        evse.poll_interval = self.poll_intervals.get(evse.poll_mode, FALLBACK_POLL_INTERVAL)
+        return evse.poll_interval
+    
+    async def _check_keepalive(self, evse: EVSE) -> float:
+        """Mark a silent session stale, probe it and schedule its re-login
+        
+        Any authenticated frame received before the re-login is due brings
+        the session back to ACTIVE and the re-login is skipped. Returns the
+        delay until the next check: right after the moment the session
+        would become stale, so a live EVSE costs one check per LOGIN_TIMEOUT.
+        """
+        if not (evse.is_logged_in() and evse.last_authenticated and evse.password):
+            return KEEPALIVE_INTERVAL
+        idle = time.monotonic() - evse.last_authenticated
+        if idle <= LOGIN_TIMEOUT:
+            if evse.last_active_login and (datetime.now() - evse.last_active_login).total_seconds() > LOGIN_TIMEOUT:
+                # No heading answered lately, but the EVSE still talks to us
+                self._login_avoided(evse)
+            return LOGIN_TIMEOUT - idle + KEEPALIVE_INTERVAL / 5
+        key = (evse.info.serial, 'relogin')
+        if evse.session == SessionState.ACTIVE:
+            _LOGGER.debug(f"Session with {evse.info.serial} is stale, probing it")
+            evse.session = SessionState.STALE
+            await evse.send_cached(RequestChargeStatusRecord)
+        if key not in self.scheduler and evse.info.serial not in self._relogin_tasks:
+            self.scheduler.schedule_spread(key, RELOGIN_SPREAD, after=RELOGIN_SPREAD)
+        return LOGIN_TIMEOUT
+    
+    def _login_avoided(self, evse: EVSE):
+        """Count a skipped re-login, once per login it would have replaced
+        
+        The keepalive checks and the re-login job both skip the re-login of
+        a live session whose last heading is old: each login is counted once.
+        """
+        if evse.last_active_login is None or evse.login_avoided_for == evse.last_active_login:
+            return
+        evse.login_avoided_for = evse.last_active_login
+        self.metrics.inc('logins_avoided', evse.info.serial)
+    
+    def _start_relogin(self, evse: EVSE):
+        """Log in again in the background (at most MAX_CONCURRENT_LOGINS at once)"""
+        serial = evse.info.serial
+        if serial in self._relogin_tasks or not evse.password:
+            return
+        task = asyncio.create_task(self._relogin(evse))
+        self._relogin_tasks[serial] = task
+        task.add_done_callback(
+            lambda done: self._relogin_tasks.pop(serial) if self._relogin_tasks.get(serial) is done else None
+        )
+    
+    async def _relogin(self, evse: EVSE):
+        async with self._login_semaphore:
+            # Relaunch login
+            if evse.password:
+                self.metrics.inc('logins_retried', evse.info.serial)
+                await evse.login(evse.password)
+    
+    def _cancel_relogins(self):
+        for task in list(self._relogin_tasks.values()):
+            task.cancel()
+        self._relogin_tasks.clear()
+    
+    async def _notify_changes(self, event: str, evse: EVSE, changes: Dict[str, Any]):
+        """Notify callbacks only when a state update changed something"""
+        serial = evse.info.serial
+        if not changes:
+            self.metrics.inc('events_suppressed', serial, event)
+            return
+        for name in changes:
+            self.metrics.inc('field_changes', serial, name)
+        await self._notify_callbacks(event, evse, changes)
+    
+    async def _notify_callbacks(self, event: str, evse: EVSE, changes: Optional[Dict[str, Any]] = None):
+        """Notify callbacks
+        
+        changes holds the fields changed by a state update (None when the
+        event is not about a state update, e.g. evse_added). Every event
+        reports a change of the EVSE, so its version is bumped first.
+        """
+        evse.mark_changed()
+        self.metrics.inc('events_emitted', evse.info.serial, event)
+        await self.callbacks.notify(event, evse.info.serial, event, evse, changes)
+    
+    def add_callback(self, name: str, callback: Callable, *,
+                     events: Optional[Iterable[str]] = None, serial: Optional[str] = None):
+        """Add a callback, called as callback(event, evse, changes)
+        
+        With events, only events of these types are delivered; with serial,
+        only the events of that EVSE. Callbacks run concurrently, each one
+        for at most callbacks.timeout seconds.
+        """
+        self.callbacks.add(name, callback, events=events, serial=serial)
     
     def remove_callback(self, name: str):
         """Remove a callback"""
-        self.callbacks.pop(name, None)
+        self.callbacks.remove(name)
+    
+    def get_callback_stats(self) -> Dict[str, Dict[str, float]]:
+        """Calls, errors, timeouts and latency of each callback"""
+        return self.callbacks.stats()
     
     def get_evse(self, serial: str) -> Optional[EVSE]:
         """Get an EVSE by its serial number"""
@@ -723,18 +1617,24 @@ class Communicator:
     # Stop the listen loop
         self.running = False
         
-    # Close the socket
-        if self.socket:
-            try:
-                self.socket.close()
-            except Exception as e:
-                _LOGGER.debug(f"Error while closing socket: {e}")
-            finally:
-                self.socket = None
+        if self._periodic_task:
+            self._periodic_task.cancel()
+        self._cancel_relogins()
         
-    # Cancel the listen task if it exists
-        if hasattr(self, '_listen_task') and self._listen_task and not self._listen_task.done():
-            self._listen_task.cancel()
+    # Close the transport and its socket
+        try:
+            self._close_transport()
+        except Exception as e:
+            _LOGGER.debug(f"Error while closing socket: {e}")
+        
+        # Write pending cache updates in the executor when called from the loop
+        if self.discovery_cache:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.discovery_cache.flush()
+            else:
+                self._cache_flush_task = loop.create_task(self.discovery_cache.async_flush())
         
     _LOGGER.debug("UDP communicator closed")
 
@@ -6,8 +6,19 @@ from abc import ABC, abstractmethod
 from typing import Optional, Dict, Type, List
 import logging
 
+from .metrics import MetricsRegistry
+
 _LOGGER = logging.getLogger(__name__)
 
+# Precompiled envelope fields
+_UINT16 = struct.Struct('>H')
+_HEADER = struct.Struct('>HH')  # magic header, total length
+_PREFIX = struct.Struct('>HHB')  # magic header, total length, key type
+_TRAILER = struct.Struct('>HH')  # checksum, tail
+
+class ChecksumError(ValueError):
+    """The checksum of a datagram does not match its content"""
+
 class Datagram(ABC):
     """Base class for all EVSE datagrams"""
     
@@ -80,55 +91,61 @@ class Datagram(ABC):
         
         return bytes(buffer)
     
-    def unpack(self, buffer: bytes) -> int:
-        """Unpack a datagram from a buffer"""
-        payload_length = self._validate_datagram(buffer)
+    def unpack(self, buffer: bytes, offset: int = 0) -> int:
+        """Unpack a datagram starting at offset in a buffer
         
-        command = struct.unpack('>H', buffer[19:21])[0]
+        The buffer is only read through a memoryview: the payload handed to
+        unpack_payload is a view, bytes/str are only created for stored fields.
+        """
+        view = memoryview(buffer)
+        payload_length = self._validate_datagram(view, offset)
+        
+        command = _UINT16.unpack_from(view, offset + 19)[0]
         if command != self.get_command():
             raise ValueError(f"Unexpected command {command} for type {self.__class__.__name__}")
         
-        self.key_type = buffer[4]
-        self.device_serial = buffer[5:13].hex()
+        self.key_type = view[offset + 4]
+        self.device_serial = view[offset + 5:offset + 13].hex()
         
     # Password (may be null)
-        password_bytes = buffer[13:19]
-        if all(b == 0 for b in password_bytes):
+        password_bytes = bytes(view[offset + 13:offset + 19])
+        if not any(password_bytes):
             self.device_password = None
         else:
             self.device_password = password_bytes.decode('ascii', errors='ignore').rstrip('\x00')
         
-    # Extract and unpack the payload
-        payload = buffer[21:21 + payload_length]
-        self.unpack_payload(payload)
+    # Unpack the payload in place
+        payload_start = offset + 21
+        self.unpack_payload(view[payload_start:payload_start + payload_length])
         
         return payload_length + 25
     
-    def _validate_datagram(self, buffer: bytes) -> int:
-        """Validate the datagram and return the payload length"""
-        if len(buffer) < 25:
+    def _validate_datagram(self, buffer: memoryview, offset: int = 0) -> int:
+        """Validate the datagram starting at offset and return the payload length"""
+        if len(buffer) - offset < 25:
             raise ValueError("Datagram too short")
         
-        header = struct.unpack('>H', buffer[0:2])[0]
+        header, length = _HEADER.unpack_from(buffer, offset)
         if header != self.PACKET_HEADER:
             raise ValueError("Missing magic header")
         
-        length = struct.unpack('>H', buffer[2:4])[0]
-        if length > len(buffer):
+        if length > len(buffer) - offset:
             raise ValueError("Invalid length")
         
-        # Verify checksum
-        computed_checksum = sum(buffer[:length-4]) % 0xFFFF
-        checksum = struct.unpack('>H', buffer[length-4:length-2])[0]
+        # Verify checksum (CPython sums a transient bytes object faster than
+        # it iterates a memoryview, so this is the only copy of the frame)
+        end = offset + length
+        computed_checksum = sum(buffer[offset:end - 4].tobytes()) % 0xFFFF
+        checksum = _UINT16.unpack_from(buffer, end - 4)[0]
         if computed_checksum != checksum:
-            raise ValueError("Invalid checksum")
+            raise ChecksumError("Invalid checksum")
         
         return length - 25
     
     def read_string(self, buffer: bytes, offset: int, length: int) -> str:
         """Read a string from the buffer"""
         end = offset + length
-        string_bytes = buffer[offset:end]
+        string_bytes = bytes(buffer[offset:end])
     # Remove trailing null bytes
         null_pos = string_bytes.find(b'\x00')
         if null_pos != -1:
@@ -137,7 +154,7 @@ class Datagram(ABC):
     
     def read_temperature(self, buffer: bytes, offset: int) -> float:
         """Read a temperature from the buffer"""
-        temp_raw = struct.unpack('>H', buffer[offset:offset+2])[0]
+        temp_raw = _UINT16.unpack_from(buffer, offset)[0]
         return (temp_raw - 100) / 10.0
     
     def set_device_serial(self, serial: str) -> 'Datagram':
@@ -162,6 +179,67 @@ class Datagram(ABC):
         return f"{self.__class__.__name__}(command={self.get_command()})"
 
 
+class FrameCache:
+    """Precomputed envelope for the frames sent to one EVSE
+    
+    Serial and password do not change during a session, so their bytes and
+    their share of the checksum are computed once. Any payload can then be
+    framed by only summing the length, command and payload bytes, and
+    datagrams with a constant payload are kept fully packed.
+    """
+    
+    def __init__(self, serial: Optional[str], password: Optional[str], key_type: int = 0x00):
+        self.serial = serial
+        self.password = password
+        self.key_type = key_type
+        
+    # Serial (8 bytes) and password (6 bytes) as placed at offset 5
+        ident = bytearray(14)
+        if serial:
+            serial_bytes = bytes.fromhex(serial)[:8]
+            ident[0:len(serial_bytes)] = serial_bytes
+        if password is not None:
+            password_bytes = password.encode('ascii')[:6]
+            ident[8:8+len(password_bytes)] = password_bytes
+        self._ident = bytes(ident)
+        
+    # Checksum share of the constant bytes (magic header, key type, serial, password)
+        header = Datagram.PACKET_HEADER
+        self._partial_checksum = (header >> 8) + (header & 0xFF) + key_type + sum(self._ident)
+        self._packed: Dict[int, bytes] = {}
+    
+    def matches(self, serial: Optional[str], password: Optional[str]) -> bool:
+        """Check whether the cache was built for this serial and password"""
+        return self.serial == serial and self.password == password
+    
+    def frame(self, command: int, payload: bytes) -> bytes:
+        """Build the complete frame of a payload (same bytes as Datagram.pack)"""
+        size = 25 + len(payload)
+        buffer = bytearray(size)
+        _PREFIX.pack_into(buffer, 0, Datagram.PACKET_HEADER, size, self.key_type)
+        buffer[5:19] = self._ident
+        _UINT16.pack_into(buffer, 19, command)
+        buffer[21:21+len(payload)] = payload
+        checksum = (self._partial_checksum + (size >> 8) + (size & 0xFF)
+                    + (command >> 8) + (command & 0xFF) + sum(payload)) % 0xFFFF
+        _TRAILER.pack_into(buffer, size - 4, checksum, Datagram.PACKET_TAIL)
+        return bytes(buffer)
+    
+    def pack(self, datagram: Datagram) -> bytes:
+        """Frame a datagram with the cached envelope"""
+        command = datagram.get_command()
+        if not command:
+            raise ValueError(f"Missing command for type {datagram.__class__.__name__}")
+        return self.frame(command, datagram.pack_payload())
+    
+    def packed(self, datagram_cls: Type[Datagram]) -> bytes:
+        """Get the pre-packed frame of a datagram with a constant payload (acks, polls)"""
+        frame = self._packed.get(datagram_cls.COMMAND)
+        if frame is None:
+            frame = self._packed[datagram_cls.COMMAND] = self.pack(datagram_cls())
+        return frame
+
+
 class UnknownCommandBase(Datagram):
     """Base class for unknown commands"""
     COMMAND = 0x0000  # Sera remplacé dynamiquement
@@ -175,8 +253,18 @@ class UnknownCommandBase(Datagram):
         return self.raw_data
 
     def unpack_payload(self, buffer: bytes) -> None:
-        # Keep raw data for debugging
-        self.raw_data = buffer
+        # Keep raw data for debugging (copied, the buffer is a view)
+        self.raw_data = bytes(buffer)
+
+
+def is_valid_frame(buffer: bytes) -> bool:
+    """Whether buffer starts with a complete datagram (header, length and checksum)"""
+    if len(buffer) < 25:
+        return False
+    header, length = _HEADER.unpack_from(buffer, 0)
+    if header != Datagram.PACKET_HEADER or not 25 <= length <= len(buffer):
+        return False
+    return sum(buffer[:length - 4]) % 0xFFFF == _UINT16.unpack_from(buffer, length - 4)[0]
 
 
 # Registry of datagram types
@@ -190,35 +278,57 @@ def register_datagram(cls: Type[Datagram]) -> Type[Datagram]:
     DATAGRAM_TYPES[cls.COMMAND] = cls
     return cls
 
-def parse_datagrams(buffer: bytes) -> List[Datagram]:
-    """Parse multiple datagrams from a buffer"""
+# Serial label of the errors of frames from an unknown source
+UNKNOWN_SERIAL = 'unknown'
+
+def parse_datagrams(buffer: bytes, metrics: Optional[MetricsRegistry] = None,
+                    source: str = UNKNOWN_SERIAL) -> List[Datagram]:
+    """Parse multiple datagrams from a buffer
+    
+    With metrics, counts the frames received (by serial and command) and
+    the unknown commands, checksum failures and other parse errors (by
+    command, labelled with source: the serial inside an invalid frame is
+    not trusted, so the caller passes the EVSE known to have sent it, or
+    UNKNOWN_SERIAL).
+    """
     datagrams = []
     offset = 0
+    # Every datagram of the packet is parsed in place, without slicing copies
+    view = memoryview(buffer)
 
-    while len(buffer) - offset >= 25:
+    while len(view) - offset >= 25:
         # Check header
-        header = struct.unpack('>H', buffer[offset:offset+2])[0]
+        header = _UINT16.unpack_from(view, offset)[0]
         if header != Datagram.PACKET_HEADER:
             _LOGGER.warning(f"Missing magic header: {header:04x}")
+            if metrics is not None:
+                metrics.inc('parse_errors', source)
             break
 
         # Get command
-        command = struct.unpack('>H', buffer[offset+19:offset+21])[0]
+        command = _UINT16.unpack_from(view, offset + 19)[0]
         datagram_class = DATAGRAM_TYPES.get(command)
 
         if not datagram_class:
             _LOGGER.warning(f"Unknown command received: {command} (0x{command:04x}) - Possibly a new EVSE command not yet implemented")
             # Create a generic class for unknown commands
             datagram_class = type(f'UnknownCommand{command}', (UnknownCommandBase,), {'COMMAND': command})
+            if metrics is not None:
+                metrics.inc('unknown_commands', source, command)
 
         # Create and unpack the datagram
         try:
             datagram = datagram_class()
-            length = datagram.unpack(buffer[offset:])
+            length = datagram.unpack(view, offset)
             datagrams.append(datagram)
             offset += length
         except Exception as e:
             _LOGGER.error(f"Error while parsing datagram {command}: {e}")
+            if metrics is not None:
+                name = 'checksum_errors' if isinstance(e, ChecksumError) else 'parse_errors'
+                metrics.inc(name, source, command)
             break
+        if metrics is not None:
+            metrics.inc('frames_received', datagram.device_serial, command)
 
     return datagrams
\ No newline at end of file
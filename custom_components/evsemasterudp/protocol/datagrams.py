@@ -4,26 +4,54 @@ Implementations of EVSE EmProto datagrams - Corrected version based on original
 import struct
 from typing import Optional, List
 from .datagram import Datagram, register_datagram
+from .layout import Field, Layout
 
 ###############################################################################
 # UTILITIES (from TypeScript)
 ###############################################################################
 
+def decode_temperature(temp_raw: int) -> float:
+    """Convert a raw temperature using the TypeScript formula"""
+    if temp_raw == 0xffff:
+        return -1.0
+    return round((temp_raw - 20000) * 0.01, 2)
+
+def encode_temperature(temperature: float) -> int:
+    """Convert a temperature back to its raw value"""
+    if temperature == -1.0:
+        return 0xffff
+    return int(round(temperature * 100)) + 20000
+
+def decode_error_bits(error_bits: int) -> list:
+    """Convert the 32-bit error bitfield to the list of set bits"""
+    errors = []
+    # Only walk the set bits (most frames carry no error at all)
+    while error_bits:
+        lowest = error_bits & -error_bits
+        errors.append(lowest.bit_length() - 1)
+        error_bits ^= lowest
+    return errors
+
+def encode_error_bits(errors: list) -> int:
+    """Convert a list of error bits back to the 32-bit bitfield"""
+    error_bits = 0
+    for bit in errors or []:
+        error_bits |= 1 << bit
+    return error_bits
+
 def read_temperature(buffer: bytes, offset: int) -> float:
     """Read temperature using the TypeScript formula"""
     if len(buffer) < offset + 2:
         return -1.0
     
-    temp_raw = struct.unpack('>H', buffer[offset:offset+2])[0]
-    if temp_raw == 0xffff:
-        return -1.0
-    return round((temp_raw - 20000) * 0.01, 2)
+    temp_raw = struct.unpack_from('>H', buffer, offset)[0]
+    return decode_temperature(temp_raw)
 
 def read_string(buffer: bytes, offset: int, length: int) -> str:
     """Read string using TypeScript logic"""
     if len(buffer) < offset + length:
         return ""
-    return buffer[offset:offset+length].decode('ascii', errors='ignore').rstrip('\x00')
+    return bytes(buffer[offset:offset+length]).decode('ascii', errors='ignore').rstrip('\x00')
 
 ###############################################################################
 # MAIN COMMANDS (sorted by importance)
@@ -34,6 +62,15 @@ class Login(Datagram):
     """0x0001 - EVSE discovery broadcast (EVSE → App)"""
     COMMAND = 0x0001
     
+    LAYOUT = Layout(
+        Field('type', 0, 'B'),
+        Field('brand', 1, '16s'),
+        Field('model', 17, '16s'),
+        Field('hardware_version', 33, '16s'),
+        Field('max_power', 49, 'I'),
+        Field('max_electricity', 53, 'B'),
+    )
+    
     def __init__(self):
         super().__init__()
         self.type = 0
@@ -51,19 +88,15 @@ class Login(Datagram):
         self.support_new = False  # Support for new functions
     
     def pack_payload(self) -> bytes:
-        return b''  # App does not send this message
+        # App does not send this message (only used to simulate an EVSE)
+        return self.LAYOUT.pack(self)
 
     def unpack_payload(self, buffer: bytes) -> None:
         """Parse according to SingleACStatus.ts"""
         if len(buffer) < 54:
             return
             
-        self.type = buffer[0]
-        self.brand = read_string(buffer, 1, 16)
-        self.model = read_string(buffer, 17, 16) 
-        self.hardware_version = read_string(buffer, 33, 16)
-        self.max_power = struct.unpack('>I', buffer[49:53])[0]
-        self.max_electricity = buffer[53]
+        self.LAYOUT.decode(buffer, self)
         
         if len(buffer) > 54:
             self.hot_line = read_string(buffer, 54, 16)
@@ -87,6 +120,29 @@ class SingleACStatus(Datagram):
     """0x0004 - Real-time AC status (EVSE → App) - MAIN COMMAND FOR VOLTAGE/TEMPERATURE"""
     COMMAND = 0x0004
     
+    # Field order according to SingleACStatus.ts
+    LAYOUT = Layout(
+        Field('line_id', 0, 'B'),
+        Field('l1_voltage', 1, 'H', scale=0.1),
+        Field('l1_electricity', 3, 'H', scale=0.01),
+        Field('current_power', 5, 'I'),
+        Field('total_kwh_counter', 9, 'I', scale=0.01),
+        Field('inner_temp', 13, 'H', decode=decode_temperature, encode=encode_temperature),
+        Field('outer_temp', 15, 'H', decode=decode_temperature, encode=encode_temperature),
+        Field('emergency_btn_state', 17, 'B'),
+        Field('gun_state', 18, 'B'),
+        Field('output_state', 19, 'B'),
+        Field('current_state', 20, 'B'),
+        Field('errors', 21, 'I', decode=decode_error_bits, encode=encode_error_bits),
+    )
+    # Optional three-phase tail
+    THREE_PHASE_LAYOUT = Layout(
+        Field('l2_voltage', 25, 'H', scale=0.1),
+        Field('l2_electricity', 27, 'H', scale=0.01),
+        Field('l3_voltage', 29, 'H', scale=0.1),
+        Field('l3_electricity', 31, 'H', scale=0.01),
+    )
+    
     def __init__(self):
         super().__init__()
         # Fields according to SingleACStatus.ts (exact order)
@@ -109,39 +165,22 @@ class SingleACStatus(Datagram):
         self.l3_electricity: float = 0.0
     
     def pack_payload(self) -> bytes:
-        return b''  # App does not send this message
+        # App does not send this message (only used to simulate an EVSE)
+        buffer = bytearray(self.THREE_PHASE_LAYOUT.end)
+        self.LAYOUT.pack_into(buffer, self)
+        self.THREE_PHASE_LAYOUT.pack_into(buffer, self)
+        return bytes(buffer)
 
     def unpack_payload(self, buffer: bytes) -> None:
-        """Parse according to SingleACStatus.ts - EXACT COPY"""
+        """Parse according to SingleACStatus.ts"""
         if len(buffer) < 25:
             raise ValueError("Buffer too short for SingleACStatus")
 
-        # Exact order from TypeScript
-        self.line_id = buffer[0]
-        self.l1_voltage = struct.unpack('>H', buffer[1:3])[0] * 0.1
-        self.l1_electricity = struct.unpack('>H', buffer[3:5])[0] * 0.01
-        self.current_power = struct.unpack('>I', buffer[5:9])[0]
-        self.total_kwh_counter = struct.unpack('>I', buffer[9:13])[0] * 0.01
-        self.inner_temp = read_temperature(buffer, 13)
-        self.outer_temp = read_temperature(buffer, 15)
-        self.emergency_btn_state = buffer[17]
-        self.gun_state = buffer[18]
-        self.output_state = buffer[19]
-        self.current_state = buffer[20]
-        
-        # Errors (32-bit bitfield)
-        error_bits = struct.unpack('>I', buffer[21:25])[0]
-        self.errors = []
-        for i in range(32):
-            if error_bits & (1 << i):
-                self.errors.append(i)
+        self.LAYOUT.decode(buffer, self)
         
         # Optional three-phase (if buffer long enough)
         if len(buffer) >= 33:
-            self.l2_voltage = struct.unpack('>H', buffer[25:27])[0] * 0.1
-            self.l2_electricity = struct.unpack('>H', buffer[27:29])[0] * 0.01
-            self.l3_voltage = struct.unpack('>H', buffer[29:31])[0] * 0.1  
-            self.l3_electricity = struct.unpack('>H', buffer[31:33])[0] * 0.01
+            self.THREE_PHASE_LAYOUT.decode(buffer, self)
 
 @register_datagram
 class SingleACStatusResponse(Datagram):
@@ -238,18 +277,22 @@ class SetAndGetChargeFeeResponse(Datagram):
     """0x0104 (260) - Charge fee response (EVSE → App)"""
     COMMAND = 260
     
+    LAYOUT = Layout(
+        Field('action', 0, 'B'),
+        Field('electricity', 1, 'B'),
+    )
+    
     def __init__(self):
         super().__init__()
         self.action: int = 0
         self.electricity: int = 6
     
     def pack_payload(self) -> bytes:
-        return b''
+        return self.LAYOUT.pack(self)
     
     def unpack_payload(self, buffer: bytes) -> None:
-        if len(buffer) >= 2:
-            self.action = buffer[0]
-            self.electricity = buffer[1]
+        if len(buffer) >= self.LAYOUT.end:
+            self.LAYOUT.decode(buffer, self)
 
 @register_datagram
 class GetVersion(Datagram):
@@ -267,6 +310,13 @@ class GetVersionResponse(Datagram):
     """0x0106 (262) - Version response (EVSE → App)"""
     COMMAND = 262
     
+    LAYOUT = Layout(
+        Field('hardware_version', 0, '16s'),
+        Field('software_version', 16, '16s'),
+        Field('feature', 32, 'I'),
+        Field('support_new', 36, 'B'),
+    )
+    
     def __init__(self):
         super().__init__()
         self.hardware_version: str = ""
@@ -275,14 +325,13 @@ class GetVersionResponse(Datagram):
         self.support_new: int = 0
     
     def pack_payload(self) -> bytes:
-        return b''
+        return self.LAYOUT.pack(self)
     
     def unpack_payload(self, buffer: bytes) -> None:
         if len(buffer) >= 37:
-            self.hardware_version = read_string(buffer, 0, 16)
+            self.LAYOUT.decode(buffer, self)
+            # The software version is read over 32 bytes as in the original parser
             self.software_version = read_string(buffer, 16, 32)
-            self.feature = struct.unpack('>I', buffer[32:36])[0]
-            self.support_new = buffer[36]
 
 # ============================================================================
 # COMMANDES DE CHARGE  
@@ -293,6 +342,21 @@ class ChargeStart(Datagram):
     """0x8007 (32775) - Start charging (App → EVSE)"""
     COMMAND = 32775
     
+    # 47-byte buffer according to TypeScript
+    LAYOUT = Layout(
+        Field('line_id', 0, 'B'),
+        Field('user_id', 1, '16s'),
+        Field('charge_id', 17, '16s'),
+        Field('is_reservation', 33, 'B'),
+        Field('reservation_date', 34, 'I'),
+        Field('start_type', 38, 'B'),
+        Field('charge_type', 39, 'B'),
+        Field('max_duration_minutes', 40, 'H'),
+        Field('max_energy_kwh', 42, 'H'),
+        Field('param3', 44, 'H'),
+        Field('max_electricity', 46, 'B'),
+    )
+    
     def __init__(self):
         super().__init__()
         self.line_id = 1
@@ -308,9 +372,6 @@ class ChargeStart(Datagram):
         self.single_phase = False
     
     def pack_payload(self) -> bytes:
-        # 47-byte buffer according to TypeScript
-        buffer = bytearray(47)
-
         # Safety values
         if not (6 <= self.max_electricity <= 32):
             raise ValueError("maxElectricity must be 6-32A")
@@ -325,37 +386,8 @@ class ChargeStart(Datagram):
             import time
             self.reservation_date = int(time.time())
 
-        # Fill the buffer
-        buffer[0] = self.line_id
-
-        # userId (16 bytes)
-        user_bytes = self.user_id.encode('ascii')[:16]
-        buffer[1:1+len(user_bytes)] = user_bytes
-
-        # chargeId (16 bytes)
-        charge_bytes = self.charge_id.encode('ascii')[:16]
-        buffer[17:17+len(charge_bytes)] = charge_bytes
-
-        # isReservation (0 = immediate)
-        buffer[33] = 0
-
-        # reservationDate (4 bytes, big endian)
-        import struct
-        buffer[34:38] = struct.pack('>I', self.reservation_date)
-
-        # startType, chargeType
-        buffer[38] = self.start_type
-        buffer[39] = self.charge_type
-
-        # params (big endian)
-        buffer[40:42] = struct.pack('>H', self.max_duration_minutes)
-        buffer[42:44] = struct.pack('>H', self.max_energy_kwh)
-        buffer[44:46] = struct.pack('>H', self.param3)
-
-        # maxElectricity
-        buffer[46] = self.max_electricity
-
-        return bytes(buffer)
+        # isReservation is always 0 (immediate)
+        return self.LAYOUT.pack(self, is_reservation=0)
     
     def unpack_payload(self, buffer: bytes) -> None:
         pass  # App → EVSE only
@@ -419,6 +451,39 @@ class CurrentChargeRecord(Datagram):
     """0x0009 - Current charge record (EVSE → App)"""
     COMMAND = 9
     
+    LAYOUT = Layout(
+        Field('line_id', 0, 'B'),
+        Field('start_user_id', 1, '16s'),
+        Field('end_user_id', 17, '16s'),
+        Field('charge_id', 33, '16s'),
+        Field('has_reservation', 49, 'B'),
+        Field('start_type', 50, 'B'),
+        Field('charge_type', 51, 'B'),
+        Field('charge_param1', 52, 'H'),
+        Field('charge_param2', 54, 'H', scale=0.001),
+        Field('charge_param3', 56, 'H', scale=0.01),
+        Field('stop_reason', 58, 'B'),
+        Field('has_stop_charge', 59, 'B'),
+        Field('reservation_data', 60, 'I'),
+        Field('start_date', 64, 'I'),
+        Field('stop_date', 68, 'I'),
+        Field('charged_time', 72, 'I'),
+        Field('charge_start_power', 76, 'I', scale=0.01),
+        Field('charge_stop_power', 80, 'I', scale=0.01),
+        Field('charge_power', 84, 'I', scale=0.01),
+        Field('charge_price', 88, 'I', scale=0.01),
+        Field('fee_type', 92, 'B'),
+        Field('charge_fee', 93, 'H', scale=0.01),
+        Field('log_kw_length', 95, 'H'),
+    )
+    # Optional logs depending on the length (minimum length, layout)
+    LOG_LAYOUTS = (
+        (156, Layout(Field('log_kw', 96, 'H', count=60))),
+        (252, Layout(Field('log_charge_data_kwh', 156, 'H', count=48))),
+        (348, Layout(Field('log_charge_data_charge_fee', 252, 'H', count=48))),
+        (446, Layout(Field('log_charge_data_service_fee', 348, 'H', count=48))),
+    )
+    
     def __init__(self):
         super().__init__()
         self.line_id: int = 1
@@ -450,56 +515,24 @@ class CurrentChargeRecord(Datagram):
         self.log_charge_data_service_fee: list = []
     
     def pack_payload(self) -> bytes:
-        return b''
+        # App does not send this message (only used to simulate an EVSE)
+        return self.LAYOUT.pack(self)
     
     def unpack_payload(self, buffer: bytes) -> None:
         if len(buffer) < 97:
             return
             
-        self.line_id = buffer[0]
-        self.start_user_id = read_string(buffer, 1, 16)
-        self.end_user_id = read_string(buffer, 17, 16)
-        self.charge_id = read_string(buffer, 33, 16)
-        self.has_reservation = buffer[49]
-        self.start_type = buffer[50]
-        self.charge_type = buffer[51]
-        self.charge_param1 = struct.unpack('>H', buffer[52:54])[0]
-        self.charge_param2 = struct.unpack('>H', buffer[54:56])[0] * 0.001
-        self.charge_param3 = struct.unpack('>H', buffer[56:58])[0] * 0.01
-        self.stop_reason = buffer[58]
-        self.has_stop_charge = buffer[59]
-        self.reservation_data = struct.unpack('>I', buffer[60:64])[0]
-        self.start_date = struct.unpack('>I', buffer[64:68])[0]
-        self.stop_date = struct.unpack('>I', buffer[68:72])[0]
-        self.charged_time = struct.unpack('>I', buffer[72:76])[0]
-        self.charge_start_power = struct.unpack('>I', buffer[76:80])[0] * 0.01
-        self.charge_stop_power = struct.unpack('>I', buffer[80:84])[0] * 0.01
-        self.charge_power = struct.unpack('>I', buffer[84:88])[0] * 0.01
-        self.charge_price = struct.unpack('>I', buffer[88:92])[0] * 0.01
-        self.fee_type = buffer[92]
-        self.charge_fee = struct.unpack('>H', buffer[93:95])[0] * 0.01
-        self.log_kw_length = struct.unpack('>H', buffer[95:97])[0]
+        self.LAYOUT.decode(buffer, self)
         
         # Logs optionnels selon la longueur
-        if len(buffer) >= 156:
-            self.log_kw = []
-            for i in range(60):
-                self.log_kw.append(struct.unpack('>H', buffer[96 + i*2:98 + i*2])[0])
-                
-        if len(buffer) >= 252:
-            self.log_charge_data_kwh = []
-            for i in range(0, 96, 2):
-                self.log_charge_data_kwh.append(struct.unpack('>H', buffer[156 + i:158 + i])[0])
-                
-        if len(buffer) >= 348:
-            self.log_charge_data_charge_fee = []
-            for i in range(0, 96, 2):
-                self.log_charge_data_charge_fee.append(struct.unpack('>H', buffer[252 + i:254 + i])[0])
-                
-        if len(buffer) >= 446:
-            self.log_charge_data_service_fee = []
-            for i in range(0, 96, 2):
-                self.log_charge_data_service_fee.append(struct.unpack('>H', buffer[348 + i:350 + i])[0])
+        for min_length, layout in self.LOG_LAYOUTS:
+            if len(buffer) >= layout.end:
+                layout.decode(buffer, self)
+            elif len(buffer) >= min_length:
+                # Truncated log (log_kw from 156 bytes): keep the complete entries
+                field = layout.fields[0]
+                count = min(field.count, (len(buffer) - field.offset) // (field.size // field.count))
+                setattr(self, field.name, list(struct.unpack_from(f'>{count}{field.fmt}', buffer, field.offset)))
 
 @register_datagram
 class RequestChargeStatusRecord(Datagram):
@@ -532,6 +565,29 @@ class SingleACChargingStatusPublicAuto(Datagram):
     """0x0005 (5) - Automatic AC charging status (EVSE → App)"""
     COMMAND = 5
     
+    LAYOUT = Layout(
+        Field('port', 0, 'B'),
+        Field('current_state', 1, 'B'),
+        Field('charge_id', 2, '16s'),
+        Field('start_type', 18, 'B'),
+        Field('charge_type', 19, 'B'),
+        # 65535 = undefined
+        Field('max_duration_minutes', 20, 'H', sentinel=65535),
+        Field('max_energy_kwh', 22, 'H', scale=0.01, sentinel=65535),
+        Field('charge_param3', 24, 'H', scale=0.01, sentinel=65535),
+        Field('reservation_date', 26, 'I'),
+        Field('user_id', 30, '16s'),
+        Field('max_electricity', 46, 'B'),
+        Field('start_date', 47, 'I'),
+        Field('duration_seconds', 51, 'I'),
+        Field('start_kwh_counter', 55, 'I', scale=0.01),
+        Field('current_kwh_counter', 59, 'I', scale=0.01),
+        Field('charge_kwh', 63, 'I', scale=0.01),
+        Field('charge_price', 67, 'I', scale=0.01),
+        Field('fee_type', 71, 'B'),
+        Field('charge_fee', 72, 'H', scale=0.01),
+    )
+    
     def __init__(self):
         super().__init__()
         self.port = 0
@@ -555,47 +611,18 @@ class SingleACChargingStatusPublicAuto(Datagram):
         self.charge_fee = 0.0
     
     def pack_payload(self) -> bytes:
-        return b''  # App does not generate this message
+        # App does not generate this message (only used to simulate an EVSE)
+        return self.LAYOUT.pack(self)
     
     def unpack_payload(self, buffer: bytes) -> None:
         if len(buffer) < 74:
             return
             
-        self.port = struct.unpack('B', buffer[0:1])[0]
+        self.LAYOUT.decode(buffer, self)
         
     # Charging state (with variable position handling according to TypeScript)
-        if len(buffer) <= 74 or buffer[74] not in [18, 19]:
-            self.current_state = struct.unpack('B', buffer[1:2])[0]
-        else:
-            self.current_state = struct.unpack('B', buffer[74:75])[0]
-            
-        self.charge_id = read_string(buffer, 2, 16)
-        self.start_type = struct.unpack('B', buffer[18:19])[0]
-        self.charge_type = struct.unpack('B', buffer[19:20])[0]
-        
-    # Max duration (65535 = undefined)
-        max_duration_raw = struct.unpack('>H', buffer[20:22])[0]
-        self.max_duration_minutes = None if max_duration_raw == 65535 else max_duration_raw
-        
-    # Max energy (65535 = undefined)
-        max_energy_raw = struct.unpack('>H', buffer[22:24])[0]
-        self.max_energy_kwh = None if max_energy_raw == 65535 else max_energy_raw * 0.01
-        
-    # Parameter 3 (65535 = undefined)
-        param3_raw = struct.unpack('>H', buffer[24:26])[0]
-        self.charge_param3 = None if param3_raw == 65535 else param3_raw * 0.01
-        
-        self.reservation_date = struct.unpack('>I', buffer[26:30])[0]
-        self.user_id = read_string(buffer, 30, 16)
-        self.max_electricity = struct.unpack('B', buffer[46:47])[0]
-        self.start_date = struct.unpack('>I', buffer[47:51])[0]
-        self.duration_seconds = struct.unpack('>I', buffer[51:55])[0]
-        self.start_kwh_counter = struct.unpack('>I', buffer[55:59])[0] * 0.01
-        self.current_kwh_counter = struct.unpack('>I', buffer[59:63])[0] * 0.01
-        self.charge_kwh = struct.unpack('>I', buffer[63:67])[0] * 0.01
-        self.charge_price = struct.unpack('>I', buffer[67:71])[0] * 0.01
-        self.fee_type = struct.unpack('B', buffer[71:72])[0]
-        self.charge_fee = struct.unpack('>H', buffer[72:74])[0] * 0.01
+        if len(buffer) > 74 and buffer[74] in (18, 19):
+            self.current_state = buffer[74]
 
 @register_datagram
 class SingleACChargingStatusResponse(Datagram):
@@ -639,41 +666,46 @@ class SetAndGetOutputElectricity(Datagram):
     """0x8107 (33031) - Set/Get output current (App → EVSE)"""
     COMMAND = 33031
     
+    LAYOUT = Layout(
+        Field('action', 0, 'B'),
+        Field('electricity', 1, 'B'),
+    )
+    
     def __init__(self):
         super().__init__()
         self.action = 0  # 0=GET, 1=SET
         self.electricity = 6  # Amperes (6-32A)
     
     def pack_payload(self) -> bytes:
-        buffer = bytearray([self.action, 0x00])
         if self.action == 1:  # SET
             if not (6 <= self.electricity <= 32):
                 raise ValueError("Current must be 6-32A")
-            buffer[1] = self.electricity
-        return bytes(buffer)
+            return self.LAYOUT.pack(self)
+        return self.LAYOUT.pack(self, electricity=0)
     
     def unpack_payload(self, buffer: bytes) -> None:
-        if len(buffer) >= 2:
-            self.action = buffer[0]
-            self.electricity = buffer[1]
+        if len(buffer) >= self.LAYOUT.end:
+            self.LAYOUT.decode(buffer, self)
 
 @register_datagram
 class SetAndGetOutputElectricityResponse(Datagram):
     """0x0107 (263) - Output current response (EVSE → App)"""
     COMMAND = 263
     
+    LAYOUT = SetAndGetOutputElectricity.LAYOUT
+    
     def __init__(self):
         super().__init__()
         self.action = 0  # 0=GET, 1=SET
         self.electricity = 16  # Amperes (6-32A)
     
     def pack_payload(self) -> bytes:
-        return b''  # App does not generate this message
+        # App does not generate this message (only used to simulate an EVSE)
+        return self.LAYOUT.pack(self)
     
     def unpack_payload(self, buffer: bytes) -> None:
-        if len(buffer) >= 2:
-            self.action = buffer[0]
-            self.electricity = buffer[1]
+        if len(buffer) >= self.LAYOUT.end:
+            self.LAYOUT.decode(buffer, self)
 
 @register_datagram
 class SetAndGetSystemTime(Datagram):
@@ -694,45 +726,56 @@ class SetAndGetSystemTimeResponse(Datagram):
     """0x0101 (257) - System time response (EVSE → App)"""
     COMMAND = 257
     
+    LAYOUT = Layout(Field('timestamp', 0, 'I'))
+    
     def __init__(self):
         super().__init__()
         self.timestamp = 0
     
     def pack_payload(self) -> bytes:
-        return b''  # App does not generate this message
+        # App does not generate this message (only used to simulate an EVSE)
+        return self.LAYOUT.pack(self)
     
     def unpack_payload(self, buffer: bytes) -> None:
-        if len(buffer) >= 4:
-            self.timestamp = struct.unpack('>I', buffer[0:4])[0]
+        if len(buffer) >= self.LAYOUT.end:
+            self.LAYOUT.decode(buffer, self)
 
 @register_datagram
 class SetAndGetOffLineCharge(Datagram):
     """0x810d (33037) - Set/Get offline charge (App → EVSE)"""
     COMMAND = 33037
     
+    LAYOUT = Layout(
+        Field('offline_enabled', 0, 'B',
+              decode=lambda raw: raw == 1, encode=lambda value: 1 if value else 0),
+    )
+    
     def __init__(self):
         super().__init__()
         self.offline_enabled: bool = False
     
     def pack_payload(self) -> bytes:
-        return struct.pack('B', 1 if self.offline_enabled else 0)
+        return self.LAYOUT.pack(self)
     
     def unpack_payload(self, buffer: bytes) -> None:
-        if len(buffer) >= 1:
-            self.offline_enabled = struct.unpack('B', buffer[0:1])[0] == 1
+        if len(buffer) >= self.LAYOUT.end:
+            self.LAYOUT.decode(buffer, self)
 
 @register_datagram
 class SetAndGetOffLineChargeResponse(Datagram):
     """0x010c (268) - Offline charge response (EVSE → App)"""
     COMMAND = 268
     
+    LAYOUT = SetAndGetOffLineCharge.LAYOUT
+    
     def __init__(self):
         super().__init__()
         self.offline_enabled = False
     
     def pack_payload(self) -> bytes:
-        return b''  # App does not generate this message
+        # App does not generate this message (only used to simulate an EVSE)
+        return self.LAYOUT.pack(self)
     
     def unpack_payload(self, buffer: bytes) -> None:
-        if len(buffer) >= 1:
-            self.offline_enabled = struct.unpack('B', buffer[0:1])[0] == 1
\ No newline at end of file
+        if len(buffer) >= self.LAYOUT.end:
+            self.LAYOUT.decode(buffer, self)
\ No newline at end of file
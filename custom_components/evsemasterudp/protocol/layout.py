@@ -0,0 +1,134 @@
+"""
+Declarative payload layouts for EmProto datagrams
+
+A Layout lists the fixed-position fields of a payload once. It is compiled
+into a single struct.Struct so the whole fixed part is decoded with one
+unpack_from call, and the same description is used to pack the payload.
+"""
+import struct
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def decode_string(raw: bytes) -> str:
+    """Decode a fixed-size ASCII field (same rules as read_string)"""
+    return raw.decode('ascii', errors='ignore').rstrip('\x00')
+
+
+def encode_string(value: str) -> bytes:
+    """Encode a fixed-size ASCII field (struct pads with null bytes)"""
+    return (value or "").encode('ascii', errors='ignore')
+
+
+class Field:
+    """A field at a fixed offset of a payload
+
+    fmt is a struct format code ('B', 'H', 'I', '16s'...), always big endian.
+    The raw value is multiplied by scale when set, sentinel maps to None,
+    count > 1 reads an array of values, and decode/encode replace the
+    default conversions for special encodings (temperatures, bitfields...).
+    """
+
+    def __init__(self, name: str, offset: int, fmt: str, scale: Optional[float] = None,
+                 sentinel: Optional[int] = None, count: int = 1,
+                 decode: Optional[Callable[[Any], Any]] = None,
+                 encode: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.offset = offset
+        self.fmt = fmt
+        self.scale = scale
+        self.sentinel = sentinel
+        self.count = count
+        if fmt.endswith('s'):
+            decode = decode or decode_string
+            encode = encode or encode_string
+        self.decode = decode
+        self.encode = encode
+        self.code = f"{count}{fmt}" if count > 1 else fmt
+        self.size = struct.calcsize('>' + self.code)
+
+    def converter(self) -> Optional[Callable[[Any], Any]]:
+        """Build the raw -> attribute conversion (None when the raw value is kept)"""
+        if self.count > 1:
+            return list
+        if self.decode is not None:
+            return self.decode
+        scale, sentinel = self.scale, self.sentinel
+        if scale is not None and sentinel is not None:
+            return lambda raw: None if raw == sentinel else raw * scale
+        if scale is not None:
+            return lambda raw: raw * scale
+        if sentinel is not None:
+            return lambda raw: None if raw == sentinel else raw
+        return None
+
+    def to_raw(self, value: Any) -> Any:
+        """Convert an attribute value back to its raw wire value"""
+        if self.count > 1:
+            values = list(value or [])[:self.count]
+            return values + [0] * (self.count - len(values))
+        if self.encode is not None:
+            return self.encode(value)
+        if value is None:
+            return self.sentinel if self.sentinel is not None else 0
+        if self.scale is not None:
+            return int(round(value / self.scale))
+        return int(value)
+
+
+class Layout:
+    """Precompiled layout of consecutive fixed-position fields"""
+
+    def __init__(self, *fields: Field):
+        self.fields = sorted(fields, key=lambda f: f.offset)
+        self.start = self.fields[0].offset
+
+        # Build one big-endian format, padding the gaps between fields
+        codes: List[str] = ['>']
+        position = self.start
+        index = 0
+        self._decoders: List[Tuple[str, Any, Optional[Callable[[Any], Any]]]] = []
+        for field in self.fields:
+            if field.offset < position:
+                raise ValueError(f"Field {field.name} overlaps the previous field")
+            if field.offset > position:
+                codes.append(f"{field.offset - position}x")
+            codes.append(field.code)
+            position = field.offset + field.size
+            key = slice(index, index + field.count) if field.count > 1 else index
+            self._decoders.append((field.name, key, field.converter()))
+            index += field.count
+
+        self.struct = struct.Struct(''.join(codes))
+        self.end = position
+
+    def unpack_from(self, buffer, offset: int = 0) -> Dict[str, Any]:
+        """Decode the fields into a dictionary"""
+        values = self.struct.unpack_from(buffer, offset + self.start)
+        return {
+            name: convert(values[key]) if convert else values[key]
+            for name, key, convert in self._decoders
+        }
+
+    def decode(self, buffer, target: Any, offset: int = 0) -> None:
+        """Decode the fields straight into the attributes of target"""
+        values = self.struct.unpack_from(buffer, offset + self.start)
+        for name, key, convert in self._decoders:
+            setattr(target, name, convert(values[key]) if convert else values[key])
+
+    def pack_into(self, buffer: bytearray, source: Any, offset: int = 0, **overrides: Any) -> None:
+        """Encode the attributes of source (or overrides) into buffer"""
+        raw: List[Any] = []
+        for field in self.fields:
+            value = overrides[field.name] if field.name in overrides else getattr(source, field.name)
+            value = field.to_raw(value)
+            if field.count > 1:
+                raw.extend(value)
+            else:
+                raw.append(value)
+        self.struct.pack_into(buffer, offset + self.start, *raw)
+
+    def pack(self, source: Any, **overrides: Any) -> bytes:
+        """Encode the attributes of source into a payload of self.end bytes"""
+        buffer = bytearray(self.end)
+        self.pack_into(buffer, source, **overrides)
+        return bytes(buffer)
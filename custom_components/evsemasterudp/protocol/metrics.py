@@ -0,0 +1,155 @@
+"""
+Lightweight metrics for the protocol layer
+"""
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+# Upper bounds of the latency buckets (in seconds), the last bucket is open
+DEFAULT_LATENCY_BOUNDS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0)
+
+
+class LatencyHistogram:
+    """Count of durations per bucket, with count, mean and max"""
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record one duration"""
+        self.buckets[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of the durations"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary and buckets ('<=bound' -> count, '>last' for the open bucket)"""
+        buckets = {f"<={bound:g}": count for bound, count in zip(self.bounds, self.buckets)}
+        buckets[f">{self.bounds[-1]:g}"] = self.buckets[-1]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'buckets': buckets,
+        }
+
+
+# Labels of a metric: (name, serial, command), None when not labelled. The
+# command label may also be another name (event, field, priority, mailbox)
+Label = Union[int, str]
+MetricKey = Tuple[str, Optional[str], Optional[Label]]
+
+
+class MetricsRegistry:
+    """Counters, gauges and latency histograms, labelled by serial and command
+
+    Only updated from the event loop, so plain dictionaries are enough
+    (no locks). Counters are also summed by name, by serial and by command
+    as they are updated, so the totals are read without scanning them.
+    """
+
+    def __init__(self, latency_bounds: Sequence[float] = DEFAULT_LATENCY_BOUNDS):
+        self.latency_bounds = tuple(latency_bounds)
+        self.counters: Dict[MetricKey, int] = {}
+        self.gauges: Dict[MetricKey, float] = {}
+        self.histograms: Dict[MetricKey, LatencyHistogram] = {}
+        # Running sums of the counters: name -> total, serial -> name -> total,
+        # name -> command -> total
+        self._totals: Dict[str, int] = {}
+        self._serial_totals: Dict[Optional[str], Dict[str, int]] = {}
+        self._command_totals: Dict[str, Dict[Optional[Label], int]] = {}
+
+    def inc(self, name: str, serial: Optional[str] = None, command: Optional[Label] = None, value: int = 1) -> None:
+        """Add value to a counter"""
+        key = (name, serial, command)
+        self.counters[key] = self.counters.get(key, 0) + value
+        self._totals[name] = self._totals.get(name, 0) + value
+        totals = self._serial_totals.get(serial)
+        if totals is None:
+            totals = self._serial_totals[serial] = {}
+        totals[name] = totals.get(name, 0) + value
+        totals = self._command_totals.get(name)
+        if totals is None:
+            totals = self._command_totals[name] = {}
+        totals[command] = totals.get(command, 0) + value
+
+    def set(self, name: str, value: float, serial: Optional[str] = None, command: Optional[Label] = None) -> None:
+        """Set a gauge"""
+        self.gauges[(name, serial, command)] = value
+
+    def observe(self, name: str, seconds: float, serial: Optional[str] = None, command: Optional[Label] = None) -> None:
+        """Record a duration in a histogram"""
+        key = (name, serial, command)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram(self.latency_bounds)
+        histogram.observe(seconds)
+
+    def counter(self, name: str, serial: Optional[str] = None, command: Optional[Label] = None) -> int:
+        """Value of one counter"""
+        return self.counters.get((name, serial, command), 0)
+
+    def gauge(self, name: str, serial: Optional[str] = None, command: Optional[Label] = None) -> Optional[float]:
+        """Value of one gauge, None if never set"""
+        return self.gauges.get((name, serial, command))
+
+    def histogram(self, name: str, serial: Optional[str] = None,
+                  command: Optional[Label] = None) -> Optional[LatencyHistogram]:
+        """One histogram, None if nothing was observed"""
+        return self.histograms.get((name, serial, command))
+
+    def totals(self, serial: Optional[str]) -> Dict[str, int]:
+        """Every counter of one EVSE, summed over the commands"""
+        return dict(self._serial_totals.get(serial, {}))
+
+    def total(self, name: str, serial: Optional[str] = None) -> int:
+        """Sum of a counter over all its labels (of one EVSE if serial is given)"""
+        if serial is None:
+            return self._totals.get(name, 0)
+        return self._serial_totals.get(serial, {}).get(name, 0)
+
+    def by_command(self, name: str) -> Dict[Optional[Label], int]:
+        """Sum of a counter per command (or other label), over all serials"""
+        return dict(self._command_totals.get(name, {}))
+
+    def clear_gauge(self, name: str) -> None:
+        """Remove every label of a gauge (scans the gauges)"""
+        for key in [key for key in self.gauges if key[0] == name]:
+            del self.gauges[key]
+
+    def clear(self) -> None:
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+        self._totals.clear()
+        self._serial_totals.clear()
+        self._command_totals.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Every metric as plain data: kind -> name -> [{'serial', 'command', 'value' | histogram fields}]"""
+        snapshot: Dict[str, Dict[str, List[Dict[str, Any]]]] = {'counters': {}, 'gauges': {}, 'histograms': {}}
+        for kind, metrics in (('counters', self.counters), ('gauges', self.gauges)):
+            for (name, serial, command), value in metrics.items():
+                snapshot[kind].setdefault(name, []).append({'serial': serial, 'command': command, 'value': value})
+        for (name, serial, command), histogram in self.histograms.items():
+            snapshot['histograms'].setdefault(name, []).append(
+                {'serial': serial, 'command': command, **histogram.snapshot()})
+        return snapshot
@@ -0,0 +1,82 @@
+"""
+Deadline scheduler for the periodic per-EVSE jobs
+
+A min-heap of (deadline, key): each key (e.g. (serial, 'status')) has at
+most one live deadline, rescheduling it simply pushes a new entry and the
+outdated ones are skipped when they reach the top. Delays get a random
+jitter so that EVSEs discovered at the same time do not stay in step.
+"""
+import heapq
+import itertools
+import random
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+# Relative jitter applied to every delay (0.1: +/- 10 %)
+DEFAULT_JITTER = 0.1
+
+
+class Scheduler:
+    """Per-key deadlines, popped in order once due"""
+
+    def __init__(self, jitter: float = DEFAULT_JITTER, clock: Callable[[], float] = time.monotonic,
+                 rng: Optional[random.Random] = None):
+        self.jitter = jitter
+        self.clock = clock
+        self._rng = rng or random.Random()
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        # Live deadline of each key: key -> (deadline, sequence)
+        self._deadlines: Dict[Hashable, Tuple[float, int]] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: Hashable, delay: float, jitter: bool = True) -> float:
+        """Run key after delay seconds (replaces its previous deadline)"""
+        if jitter and self.jitter:
+            delay *= 1 + self._rng.uniform(-self.jitter, self.jitter)
+        deadline = self.clock() + max(delay, 0)
+        sequence = next(self._sequence)
+        self._deadlines[key] = (deadline, sequence)
+        heapq.heappush(self._heap, (deadline, sequence, key))
+        return deadline
+
+    def schedule_spread(self, key: Hashable, interval: float, after: float = 0) -> float:
+        """Run key at a random point of [after, after + interval) (e.g. first run of a periodic job)"""
+        return self.schedule(key, after + self._rng.uniform(0, interval), jitter=False)
+
+    def cancel(self, key: Hashable) -> None:
+        """Forget the deadline of key, if any"""
+        self._deadlines.pop(key, None)
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        """Deadline of key, None if it is not scheduled"""
+        entry = self._deadlines.get(key)
+        return entry[0] if entry else None
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest live deadline, None if nothing is scheduled"""
+        heap = self._heap
+        while heap:
+            deadline, sequence, key = heap[0]
+            if self._deadlines.get(key) == (deadline, sequence):
+                return deadline
+            heapq.heappop(heap)
+        return None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Hashable]:
+        """Remove and return the keys whose deadline has passed, earliest first"""
+        if now is None:
+            now = self.clock()
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, sequence, key = heapq.heappop(heap)
+            if self._deadlines.get(key) == (deadline, sequence):
+                del self._deadlines[key]
+                due.append(key)
+        return due
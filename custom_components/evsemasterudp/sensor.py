@@ -1,6 +1,10 @@
 """Sensors for the EVSE EmProto integration"""
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Any, Dict
+
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
@@ -8,17 +12,23 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
     UnitOfPower,
     UnitOfEnergy,
     UnitOfTemperature,
+    UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import DOMAIN
+from .entity import EVSEEntity
+
+# Polling interval of the diagnostic sensors (the other sensors are pushed)
+SCAN_INTERVAL = timedelta(seconds=5)
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -43,28 +53,20 @@ async def async_setup_entry(
         EVSETemperatureSensor(coordinator, serial, base_name, "inner"),
         EVSETemperatureSensor(coordinator, serial, base_name, "outer"),
         EVSEChargeStatusSensor(coordinator, serial, base_name, client),
+        # Protocol health (disabled by default)
+        EVSEPacketRateSensor(coordinator, serial, base_name, client, "frames_received", "Packets In"),
+        EVSEPacketRateSensor(coordinator, serial, base_name, client, "frames_sent", "Packets Out"),
+        EVSEParseErrorRateSensor(coordinator, serial, base_name, client),
+        EVSECommandRTTSensor(coordinator, serial, base_name, client),
+        EVSELoginCountSensor(coordinator, serial, base_name, client),
+        EVSEStatusAgeSensor(coordinator, serial, base_name, client),
+        EVSEIngestQueueSensor(coordinator, serial, base_name, client),
     ]
     
     async_add_entities(entities)
 
-class EVSEBaseSensor(CoordinatorEntity, SensorEntity):
+class EVSEBaseSensor(EVSEEntity, SensorEntity):
     """Base sensor for EVSE"""
-    
-    def __init__(self, coordinator, serial: str, base_name: str):
-        super().__init__(coordinator)
-        self.serial = serial
-        self.base_name = base_name
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, serial)},
-            "name": base_name,
-            "manufacturer": "Oniric75",
-            "model": "EVSE Master UDP",
-        }
-    
-    @property
-    def evse_data(self):
-        """Get EVSE data"""
-        return self.coordinator.data.get(self.serial, {})
 
 class EVSEChargeStatusSensor(EVSEBaseSensor):
     """Simple binary (charging / idle)."""
@@ -129,8 +131,10 @@ class EVSEStateSensor(EVSEBaseSensor):
         return {
             "online": data.get("online", False),
             "logged_in": data.get("logged_in", False),
+            "session": data.get("session"),
             "ip": data.get("ip"),
             "last_seen": data.get("last_seen"),
+            "poll_interval_s": data.get("poll_interval"),
         }
 
 class EVSEPowerSensor(EVSEBaseSensor):
@@ -222,4 +226,127 @@ class EVSETemperatureSensor(EVSEBaseSensor):
     def native_value(self) -> float | None:
         """Return the temperature"""
         data = self.evse_data
-        return data.get(f"temperature_{self.temp_type}", 0)
\ No newline at end of file
+        return data.get(f"temperature_{self.temp_type}", 0)
+
+class EVSEDiagnosticSensor(EVSEBaseSensor, ABC):
+    """Protocol health of the EVSE, polled every SCAN_INTERVAL (disabled by default)"""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator, serial: str, base_name: str, client, key: str, name: str):
+        super().__init__(coordinator, serial, base_name)
+        self.client = client
+        self._attr_name = f"{base_name} {name}"
+        self._attr_unique_id = f"{serial}_{key}"
+        self._attr_icon = "mdi:lan-connect"
+
+    @property
+    def should_poll(self) -> bool:
+        """CoordinatorEntity does not poll"""
+        return True
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Polled, not written on coordinator updates"""
+
+    async def async_update(self) -> None:
+        """Read the protocol stats of the EVSE (no coordinator refresh)"""
+        stats = self.client.get_protocol_stats(self.serial)
+        self._attr_native_value = self._value(stats) if stats else None
+
+    @abstractmethod
+    def _value(self, stats: Dict[str, Any]):
+        """Sensor value from the protocol stats of the EVSE"""
+
+class EVSERateSensor(EVSEDiagnosticSensor):
+    """Diagnostic sensor computed from the change of counters between two polls"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._previous: Dict[str, Any] | None = None
+
+    def _value(self, stats: Dict[str, Any]):
+        previous, self._previous = self._previous, stats
+        if previous is None or stats["time"] <= previous["time"]:
+            return None
+        return self._rate(stats, previous)
+
+    @abstractmethod
+    def _rate(self, stats: Dict[str, Any], previous: Dict[str, Any]):
+        """Sensor value from two readings of the protocol stats"""
+
+class EVSEPacketRateSensor(EVSERateSensor):
+    """Packets received from / sent to the EVSE per second"""
+
+    def __init__(self, coordinator, serial: str, base_name: str, client, counter: str, name: str):
+        super().__init__(coordinator, serial, base_name, client, f"{counter}_rate", name)
+        self._counter = counter
+        self._attr_native_unit_of_measurement = "packets/s"
+        self._attr_icon = "mdi:download-network" if counter == "frames_received" else "mdi:upload-network"
+
+    def _rate(self, stats, previous):
+        packets = stats[self._counter] - previous[self._counter]
+        return round(packets / (stats["time"] - previous["time"]), 2)
+
+class EVSEParseErrorRateSensor(EVSERateSensor):
+    """Share of the packets received since the last poll that could not be parsed"""
+
+    def __init__(self, coordinator, serial: str, base_name: str, client):
+        super().__init__(coordinator, serial, base_name, client, "parse_error_rate", "Parse Errors")
+        self._attr_native_unit_of_measurement = PERCENTAGE
+        self._attr_icon = "mdi:alert-network"
+
+    def _rate(self, stats, previous):
+        errors = stats["parse_errors"] - previous["parse_errors"]
+        total = errors + stats["frames_received"] - previous["frames_received"]
+        return round(100 * errors / total, 1) if total else 0.0
+
+class EVSECommandRTTSensor(EVSEDiagnosticSensor):
+    """Round-trip time of the last request answered by the EVSE"""
+
+    def __init__(self, coordinator, serial: str, base_name: str, client):
+        super().__init__(coordinator, serial, base_name, client, "command_rtt", "Command RTT")
+        self._attr_device_class = SensorDeviceClass.DURATION
+        self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+        self._attr_icon = "mdi:timer-outline"
+
+    def _value(self, stats):
+        rtt = stats["last_rtt"]
+        return round(rtt * 1000, 1) if rtt is not None else None
+
+class EVSELoginCountSensor(EVSEDiagnosticSensor):
+    """Login sequences run with the EVSE (retries included)"""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, coordinator, serial: str, base_name: str, client):
+        super().__init__(coordinator, serial, base_name, client, "login_count", "Logins")
+        self._attr_icon = "mdi:login"
+
+    def _value(self, stats):
+        return stats["logins"]
+
+class EVSEStatusAgeSensor(EVSEDiagnosticSensor):
+    """Time since the last status frame of the EVSE"""
+
+    def __init__(self, coordinator, serial: str, base_name: str, client):
+        super().__init__(coordinator, serial, base_name, client, "status_age", "Last Status")
+        self._attr_device_class = SensorDeviceClass.DURATION
+        self._attr_native_unit_of_measurement = UnitOfTime.SECONDS
+        self._attr_icon = "mdi:timer-sand"
+
+    def _value(self, stats):
+        age = stats["status_age"]
+        return int(age) if age is not None else None
+
+class EVSEIngestQueueSensor(EVSEDiagnosticSensor):
+    """Packets of the EVSE waiting to be handled"""
+
+    def __init__(self, coordinator, serial: str, base_name: str, client):
+        super().__init__(coordinator, serial, base_name, client, "ingest_queue_depth", "Ingest Queue")
+        self._attr_icon = "mdi:tray-full"
+
+    def _value(self, stats):
+        return stats["ingest_queue_depth"]
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du décodage des datagrammes
+Compare le coût par trame de l'ancien décodage champ par champ
+(slices + struct.unpack) avec les layouts précompilés (un seul unpack_from)
+"""
+
+import os
+import random
+import struct
+import sys
+import timeit
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.datagram import FrameCache, parse_datagrams
+from protocol.datagrams import (
+    SingleACStatus, SingleACChargingStatusPublicAuto, CurrentChargeRecord, Heading,
+    SingleACStatusResponse, HeadingResponse, SingleACChargingStatusResponse,
+    RequestChargeStatusRecord, SetAndGetOutputElectricity,
+    read_string, read_temperature,
+)
+
+###############################################################################
+# ANCIEN DÉCODAGE (copie de la version champ par champ, pour comparaison)
+###############################################################################
+
+def legacy_single_ac_status(self, buffer):
+    self.line_id = buffer[0]
+    self.l1_voltage = struct.unpack('>H', buffer[1:3])[0] * 0.1
+    self.l1_electricity = struct.unpack('>H', buffer[3:5])[0] * 0.01
+    self.current_power = struct.unpack('>I', buffer[5:9])[0]
+    self.total_kwh_counter = struct.unpack('>I', buffer[9:13])[0] * 0.01
+    self.inner_temp = read_temperature(buffer, 13)
+    self.outer_temp = read_temperature(buffer, 15)
+    self.emergency_btn_state = buffer[17]
+    self.gun_state = buffer[18]
+    self.output_state = buffer[19]
+    self.current_state = buffer[20]
+    error_bits = struct.unpack('>I', buffer[21:25])[0]
+    self.errors = []
+    for i in range(32):
+        if error_bits & (1 << i):
+            self.errors.append(i)
+    if len(buffer) >= 33:
+        self.l2_voltage = struct.unpack('>H', buffer[25:27])[0] * 0.1
+        self.l2_electricity = struct.unpack('>H', buffer[27:29])[0] * 0.01
+        self.l3_voltage = struct.unpack('>H', buffer[29:31])[0] * 0.1
+        self.l3_electricity = struct.unpack('>H', buffer[31:33])[0] * 0.01
+
+def legacy_charging_status(self, buffer):
+    self.port = struct.unpack('B', buffer[0:1])[0]
+    if len(buffer) <= 74 or buffer[74] not in [18, 19]:
+        self.current_state = struct.unpack('B', buffer[1:2])[0]
+    else:
+        self.current_state = struct.unpack('B', buffer[74:75])[0]
+    self.charge_id = read_string(buffer, 2, 16)
+    self.start_type = struct.unpack('B', buffer[18:19])[0]
+    self.charge_type = struct.unpack('B', buffer[19:20])[0]
+    max_duration_raw = struct.unpack('>H', buffer[20:22])[0]
+    self.max_duration_minutes = None if max_duration_raw == 65535 else max_duration_raw
+    max_energy_raw = struct.unpack('>H', buffer[22:24])[0]
+    self.max_energy_kwh = None if max_energy_raw == 65535 else max_energy_raw * 0.01
+    param3_raw = struct.unpack('>H', buffer[24:26])[0]
+    self.charge_param3 = None if param3_raw == 65535 else param3_raw * 0.01
+    self.reservation_date = struct.unpack('>I', buffer[26:30])[0]
+    self.user_id = read_string(buffer, 30, 16)
+    self.max_electricity = struct.unpack('B', buffer[46:47])[0]
+    self.start_date = struct.unpack('>I', buffer[47:51])[0]
+    self.duration_seconds = struct.unpack('>I', buffer[51:55])[0]
+    self.start_kwh_counter = struct.unpack('>I', buffer[55:59])[0] * 0.01
+    self.current_kwh_counter = struct.unpack('>I', buffer[59:63])[0] * 0.01
+    self.charge_kwh = struct.unpack('>I', buffer[63:67])[0] * 0.01
+    self.charge_price = struct.unpack('>I', buffer[67:71])[0] * 0.01
+    self.fee_type = struct.unpack('B', buffer[71:72])[0]
+    self.charge_fee = struct.unpack('>H', buffer[72:74])[0] * 0.01
+
+def legacy_charge_record(self, buffer):
+    self.line_id = buffer[0]
+    self.start_user_id = read_string(buffer, 1, 16)
+    self.end_user_id = read_string(buffer, 17, 16)
+    self.charge_id = read_string(buffer, 33, 16)
+    self.has_reservation = buffer[49]
+    self.start_type = buffer[50]
+    self.charge_type = buffer[51]
+    self.charge_param1 = struct.unpack('>H', buffer[52:54])[0]
+    self.charge_param2 = struct.unpack('>H', buffer[54:56])[0] * 0.001
+    self.charge_param3 = struct.unpack('>H', buffer[56:58])[0] * 0.01
+    self.stop_reason = buffer[58]
+    self.has_stop_charge = buffer[59]
+    self.reservation_data = struct.unpack('>I', buffer[60:64])[0]
+    self.start_date = struct.unpack('>I', buffer[64:68])[0]
+    self.stop_date = struct.unpack('>I', buffer[68:72])[0]
+    self.charged_time = struct.unpack('>I', buffer[72:76])[0]
+    self.charge_start_power = struct.unpack('>I', buffer[76:80])[0] * 0.01
+    self.charge_stop_power = struct.unpack('>I', buffer[80:84])[0] * 0.01
+    self.charge_power = struct.unpack('>I', buffer[84:88])[0] * 0.01
+    self.charge_price = struct.unpack('>I', buffer[88:92])[0] * 0.01
+    self.fee_type = buffer[92]
+    self.charge_fee = struct.unpack('>H', buffer[93:95])[0] * 0.01
+    self.log_kw_length = struct.unpack('>H', buffer[95:97])[0]
+    if len(buffer) >= 156:
+        self.log_kw = []
+        for i in range(60):
+            self.log_kw.append(struct.unpack('>H', buffer[96 + i*2:98 + i*2])[0])
+    if len(buffer) >= 252:
+        self.log_charge_data_kwh = []
+        for i in range(0, 96, 2):
+            self.log_charge_data_kwh.append(struct.unpack('>H', buffer[156 + i:158 + i])[0])
+    if len(buffer) >= 348:
+        self.log_charge_data_charge_fee = []
+        for i in range(0, 96, 2):
+            self.log_charge_data_charge_fee.append(struct.unpack('>H', buffer[252 + i:254 + i])[0])
+    if len(buffer) >= 446:
+        self.log_charge_data_service_fee = []
+        for i in range(0, 96, 2):
+            self.log_charge_data_service_fee.append(struct.unpack('>H', buffer[348 + i:350 + i])[0])
+
+###############################################################################
+# TRAMES DE TEST
+###############################################################################
+
+def random_payload(length, seed):
+    """Payload aléatoire avec des chaînes ASCII aux bons endroits"""
+    rng = random.Random(seed)
+    payload = bytearray(rng.getrandbits(8) for _ in range(length))
+    return payload
+
+def status_payload(seed):
+    payload = random_payload(33, seed)
+    struct.pack_into('>HH', payload, 13, 20000 + seed * 17 % 6000, 0xffff if seed % 7 == 0 else 21234)
+    # Les erreurs sont rares en fonctionnement normal
+    if seed % 5:
+        struct.pack_into('>I', payload, 21, 0)
+    return bytes(payload)
+
+def charging_status_payload(seed):
+    payload = random_payload(75, seed)
+    payload[2:18] = b'1712345678000000'
+    payload[30:46] = b'emmgr\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+    if seed % 3 == 0:
+        struct.pack_into('>H', payload, 20, 65535)
+    payload[74] = 18 if seed % 2 else 3
+    return bytes(payload)
+
+def charge_record_payload(seed):
+    payload = random_payload(446, seed)
+    for offset in (1, 17, 33):
+        payload[offset:offset + 16] = b'emmgr\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+    return bytes(payload)
+
+CASES = [
+    ("SingleACStatus", SingleACStatus, legacy_single_ac_status, status_payload),
+    ("SingleACChargingStatusPublicAuto", SingleACChargingStatusPublicAuto, legacy_charging_status, charging_status_payload),
+    ("CurrentChargeRecord", CurrentChargeRecord, legacy_charge_record, charge_record_payload),
+]
+
+def check_same_result(cls, legacy, make_payload, count=200):
+    """Vérifie que les deux décodages donnent exactement les mêmes attributs"""
+    for seed in range(count):
+        payload = make_payload(seed)
+        old, new = cls(), cls()
+        legacy(old, payload)
+        new.unpack_payload(payload)
+        assert vars(old) == vars(new), f"{cls.__name__}: différence pour seed={seed}"
+
+def test_layouts_match_legacy_decoding():
+    """Les layouts décodent exactement comme l'ancien code"""
+    for _, cls, legacy, make_payload in CASES:
+        check_same_result(cls, legacy, make_payload)
+
+def test_layouts_round_trip():
+    """pack_payload produit une trame que unpack_payload relit à l'identique"""
+    for _, cls, _, make_payload in CASES:
+        first = cls()
+        first.unpack_payload(make_payload(1))
+        second = cls()
+        second.unpack_payload(first.pack_payload())
+        for field in first.LAYOUT.fields:
+            assert getattr(first, field.name) == getattr(second, field.name), field.name
+
+def build_frame(cls, payload=b''):
+    """Trame complète (enveloppe + payload) telle qu'envoyée par l'EVSE"""
+    datagram = cls()
+    datagram.set_device_serial("1368844619649410")
+    datagram.pack_payload = lambda: payload
+    return datagram.pack()
+
+def test_parse_multi_datagram_packet():
+    """Un paquet UDP contenant plusieurs datagrammes est parsé sur place"""
+    payloads = [status_payload(2), charging_status_payload(2), b'', charge_record_payload(2)]
+    classes = [SingleACStatus, SingleACChargingStatusPublicAuto, Heading, CurrentChargeRecord]
+    packet = b''.join(build_frame(cls, payload) for cls, payload in zip(classes, payloads))
+    datagrams = parse_datagrams(packet)
+    assert [type(d) for d in datagrams] == classes
+    for datagram, payload in zip(datagrams, payloads):
+        expected = type(datagram)()
+        expected.unpack_payload(payload)
+        expected.device_serial = "1368844619649410"
+        expected.device_password = None
+        assert vars(datagram) == vars(expected)
+        # Aucun champ ne doit garder une vue sur le paquet
+        assert not any(isinstance(value, memoryview) for value in vars(datagram).values())
+
+CONSTANT_PAYLOADS = (SingleACStatusResponse, HeadingResponse, SingleACChargingStatusResponse,
+                     RequestChargeStatusRecord)
+
+def test_frame_cache_matches_pack():
+    """Le cache d'enveloppe produit exactement les mêmes octets que Datagram.pack"""
+    for password in (None, "123456", "12"):
+        cache = FrameCache("1368844619649410", password)
+        for cls in (SingleACStatusResponse, HeadingResponse, SingleACChargingStatusResponse,
+                    RequestChargeStatusRecord, SetAndGetOutputElectricity, SingleACStatus):
+            datagram = cls()
+            datagram.set_device_serial("1368844619649410")
+            datagram.set_device_password(password)
+            assert cache.pack(datagram) == datagram.pack(), cls.__name__
+            if cls in CONSTANT_PAYLOADS:
+                assert cache.packed(cls) == datagram.pack(), cls.__name__
+    assert FrameCache("1368844619649410", "123456").matches("1368844619649410", "123456")
+    assert not FrameCache("1368844619649410", "123456").matches("1368844619649410", "654321")
+
+def bench_acks(number=20000):
+    """Coût d'encodage d'un acquittement SingleACStatusResponse (µs)"""
+    cache = FrameCache("1368844619649410", "123456")
+    def pack_each_time():
+        response = SingleACStatusResponse()
+        response.set_device_serial("1368844619649410")
+        response.set_device_password("123456")
+        return response.pack()
+    before = min(timeit.repeat(pack_each_time, number=number, repeat=5)) / number * 1e6
+    framed = min(timeit.repeat(lambda: cache.pack(SingleACStatusResponse()), number=number, repeat=5)) / number * 1e6
+    cached = min(timeit.repeat(lambda: cache.packed(SingleACStatusResponse), number=number, repeat=5)) / number * 1e6
+    print(f"{'Ack Datagram.pack':36} {before:8.2f}µs")
+    print(f"{'Ack FrameCache.pack':36} {framed:8.2f}µs")
+    print(f"{'Ack FrameCache.packed':36} {cached:8.2f}µs")
+
+def bench(number=20000):
+    """Mesure le coût de décodage par trame (µs)"""
+    print(f"{'Datagramme':36} {'avant':>10} {'après':>10} {'gain':>7}")
+    for name, cls, legacy, make_payload in CASES:
+        payload = make_payload(1)
+        target = cls()
+        before = min(timeit.repeat(lambda: legacy(target, payload), number=number, repeat=5))
+        after = min(timeit.repeat(lambda: target.unpack_payload(payload), number=number, repeat=5))
+        before_us = before / number * 1e6
+        after_us = after / number * 1e6
+        print(f"{name:36} {before_us:8.2f}µs {after_us:8.2f}µs {before / after:6.1f}x")
+
+if __name__ == "__main__":
+    print("🧪 Vérification des layouts...")
+    test_layouts_match_legacy_decoding()
+    test_layouts_round_trip()
+    test_parse_multi_datagram_packet()
+    test_frame_cache_matches_pack()
+    print("   ✅ Décodage identique à l'ancien code\n")
+    print("⏱️ Coût de décodage par trame:")
+    bench()
+    print("\n⏱️ Coût d'encodage des acquittements:")
+    bench_acks()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark des écritures d'état Home Assistant
+20 EVSE simulés, chacun avec les entités de l'intégration (8 capteurs,
+2 boutons, 2 nombres), alimentés par des trames de statut.
+
+Avant: un seul coordinateur pour tous les EVSE, chaque mise à jour
+réécrit l'état de toutes les entités.
+Après: un coordinateur par EVSE, chaque entité n'écrit que si sa propre
+valeur a changé.
+
+Nécessite Home Assistant (pip install homeassistant)
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Ajouter la racine du projet pour importer l'intégration complète
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+sys.path.insert(0, project_root)
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from custom_components.evsemasterudp import EVSEDataUpdateCoordinator
+from custom_components.evsemasterudp.evse_client import EVSEClient
+from custom_components.evsemasterudp.protocol.communicator import Communicator
+from custom_components.evsemasterudp.protocol.datagrams import SingleACStatus
+from custom_components.evsemasterudp.button import EVSEStartChargeButton, EVSEStopChargeButton
+from custom_components.evsemasterudp.number import EVSECurrentControl, EVSEFastChangeProtection
+from custom_components.evsemasterudp.sensor import (
+    EVSEChargeStatusSensor, EVSECurrentSensor, EVSEEnergySensor, EVSEPowerSensor,
+    EVSEStateSensor, EVSETemperatureSensor, EVSEVoltageSensor,
+)
+
+from helpers import NullTransport, make_communicator
+
+# Entités ajoutées sans plateforme: avertissement sans intérêt ici
+logging.getLogger('homeassistant.helpers.entity').setLevel(logging.ERROR)
+
+EVSE_COUNT = 20
+ROUNDS = 50
+
+def make_entities(coordinator, client, serial):
+    base_name = f"EVSE {serial[-2:]}"
+    return [
+        EVSEStateSensor(coordinator, serial, base_name),
+        EVSEPowerSensor(coordinator, serial, base_name),
+        EVSECurrentSensor(coordinator, serial, base_name),
+        EVSEVoltageSensor(coordinator, serial, base_name),
+        EVSEEnergySensor(coordinator, serial, base_name),
+        EVSETemperatureSensor(coordinator, serial, base_name, "inner"),
+        EVSETemperatureSensor(coordinator, serial, base_name, "outer"),
+        EVSEChargeStatusSensor(coordinator, serial, base_name, client),
+        EVSEStartChargeButton(coordinator, client, serial, base_name),
+        EVSEStopChargeButton(coordinator, client, serial, base_name),
+        EVSECurrentControl(coordinator, client, serial, base_name),
+        EVSEFastChangeProtection(coordinator, client, serial, base_name),
+    ]
+
+def status_frames(rounds, seed=1):
+    """Trames de statut d'EVSE en charge: bruit de mesure, puissance qui varie"""
+    rng = random.Random(seed)
+    for round_index in range(rounds):
+        for index in range(EVSE_COUNT):
+            datagram = SingleACStatus()
+            datagram.set_device_serial(f"{index:016x}")
+            datagram.l1_voltage = round(230 + rng.uniform(-0.6, 0.6), 1)
+            datagram.l1_electricity = round(16 + rng.uniform(-0.03, 0.03), 2)
+            datagram.current_power = 3680 + (round_index // 3) * 20
+            datagram.inner_temp = 35.0
+            datagram.outer_temp = 20.0
+            datagram.gun_state = 2
+            datagram.output_state = 1
+            yield datagram, (f"192.168.1.{100 + index}", 28376)
+
+async def run(selective):
+    hass = HomeAssistant(tempfile.mkdtemp())
+    client = EVSEClient()
+    client.communicator = communicator = make_communicator(Communicator, NullTransport())
+    communicator.add_callback('evse_client', client._handle_evse_event)
+
+    coordinators = {}
+    entities = []
+    for index in range(EVSE_COUNT):
+        serial = f"{index:016x}"
+        coordinator = EVSEDataUpdateCoordinator(hass, client, serial, push_debounce=0)
+        coordinator.data = {}
+        coordinators[serial] = coordinator
+        for number, entity in enumerate(make_entities(coordinator, client, serial)):
+            entity.hass = hass
+            entity.entity_id = f"{type(entity).__name__.lower()}.evse_{index}_{number}"
+            await entity.async_added_to_hass()
+            entity.async_write_ha_state()
+            entities.append(entity)
+
+    if selective:
+        # Après: chaque coordinateur ne reçoit que les événements de son EVSE
+        for serial, coordinator in coordinators.items():
+            client.add_callback(f"coordinator_{serial}", coordinator.async_handle_evse_event, serial=serial)
+    else:
+        # Avant: un coordinateur unique, toutes les entités réécrites à chaque mise à jour
+        async def refresh_all(serial, data, changes):
+            for coordinator in coordinators.values():
+                coordinator.data = client.get_evse(coordinator.serial) or {}
+            for entity in entities:
+                CoordinatorEntity._handle_coordinator_update(entity)
+        client.add_callback("coordinator", refresh_all)
+
+    # Écritures dans la machine d'état, et changements d'état effectifs
+    writes = changed = 0
+    write_ha_state = Entity.async_write_ha_state
+    def counting_write_ha_state(entity):
+        nonlocal writes
+        writes += 1
+        write_ha_state(entity)
+    def count_changed(event):
+        nonlocal changed
+        changed += 1
+    hass.bus.async_listen(EVENT_STATE_CHANGED, count_changed)
+
+    frames = list(status_frames(ROUNDS))
+    Entity.async_write_ha_state = counting_write_ha_state
+    try:
+        start = time.process_time()
+        for datagram, addr in frames:
+            await communicator._process_datagram(datagram, addr)
+            # Laisser passer le minuteur des debouncers
+            await asyncio.sleep(0)
+        elapsed = time.process_time() - start
+    finally:
+        Entity.async_write_ha_state = write_ha_state
+    await hass.async_block_till_done()
+
+    power = hass.states.get("evsepowersensor.evse_3_1").state
+    for coordinator in coordinators.values():
+        coordinator.async_shutdown_push()
+    await hass.async_stop(force=True)
+    return len(frames), writes, changed, elapsed, power
+
+def test_selective_writes():
+    """Moins d'écritures, et le même état final"""
+    _, before_writes, before_changed, _, before_power = asyncio.run(run(selective=False))
+    _, after_writes, after_changed, _, after_power = asyncio.run(run(selective=True))
+    assert after_writes < before_writes
+    # Les écritures supprimées ne changeaient rien
+    assert after_changed == before_changed
+    assert before_power == after_power == str(3680 + ((ROUNDS - 1) // 3) * 20)
+
+if __name__ == "__main__":
+    entity_count = len(make_entities(None, None, "0" * 16))
+    print(f"⏱️ {EVSE_COUNT} EVSE × {entity_count} entités, {ROUNDS} trames de statut par EVSE")
+    print(f"{'':8} {'écritures':>10} {'changements':>12} {'par trame':>10} {'CPU/trame':>10} {'écritures/s':>12}")
+    for name, selective in (("avant", False), ("après", True)):
+        frames, writes, changed, elapsed, _ = asyncio.run(run(selective))
+        per_frame = writes / frames
+        # Débit d'écritures pour une trame de statut par seconde et par EVSE
+        print(f"{name:8} {writes:10d} {changed:12d} {per_frame:10.1f} {elapsed / frames * 1e3:8.2f}ms {per_frame * EVSE_COUNT:12.1f}")
@@ -0,0 +1,76 @@
+"""
+Outils partagés par les tests
+"""
+
+import asyncio
+
+
+class NullTransport:
+    """Transport qui ignore les trames envoyées"""
+
+    def sendto(self, data, addr):
+        pass
+
+
+class RecordingTransport:
+    """Transport qui garde les trames envoyées"""
+
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append(data)
+
+    def commands(self):
+        """Commandes des trames envoyées, dans l'ordre"""
+        return [int.from_bytes(frame[19:21], 'big') for frame in self.sent]
+
+
+def make_communicator(communicator_cls, transport=None):
+    """Communicator démarré sur un transport factice, sans socket
+
+    communicator_cls est la classe importée par le test: protocol.communicator
+    et custom_components.evsemasterudp.protocol.communicator sont deux modules
+    distincts. transport est le transport (RecordingTransport par défaut),
+    ou la classe / fonction qui le construit à partir du communicator
+    (transports qui répondent).
+    """
+    communicator = communicator_cls(port=0)
+    if transport is None:
+        transport = RecordingTransport()
+    elif isinstance(transport, type) or not hasattr(transport, 'sendto'):
+        transport = transport(communicator)
+    communicator.transport = transport
+    communicator.running = True
+    return communicator
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Boucle dont l'horloge saute au prochain timer quand rien n'est prêt
+
+    Les délais réels du protocole (secondes de retransmission) s'écoulent
+    instantanément; les tests ne doivent pas dépendre du réseau.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._offset = 0.0
+
+    def time(self):
+        return super().time() + self._offset
+
+    def _run_once(self):
+        if not self._ready and self._scheduled:
+            delay = self._scheduled[0].when() - self.time()
+            if delay > 0:
+                self._offset += delay
+        super()._run_once()
+
+
+def run_virtual(coroutine):
+    """asyncio.run() sur une boucle à temps virtuel"""
+    loop = VirtualTimeLoop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test des acteurs par EVSE
+Les commandes d'un même EVSE passent une par une, les paquets reçus
+sont traités dans l'ordre par la boîte de réception de leur EVSE, et un
+EVSE inondé ne retarde pas les autres
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.actor import INBOUND_QUEUE_SIZE
+from protocol.communicator import Communicator, EVSE
+from protocol.datagrams import ChargeStop, SingleACStatus
+
+from helpers import make_communicator
+
+FLOODED = "00000000000000aa"
+QUIET = "00000000000000bb"
+
+def make_fleet():
+    communicator = make_communicator(Communicator)
+    for index, serial in enumerate((FLOODED, QUIET)):
+        evse = EVSE(communicator, serial, f"192.168.1.{100 + index}", 28376)
+        evse.password = "123456"
+        evse._logged_in = True
+        communicator.evses[serial] = evse
+    return communicator
+
+async def serialized_commands():
+    communicator = make_fleet()
+    spans = []
+
+    async def command(serial, name):
+        start = time.monotonic()
+        await asyncio.sleep(0.05)
+        spans.append((serial, name, start, time.monotonic()))
+        return name
+
+    results = await asyncio.gather(
+        communicator.evses[FLOODED].actor.call(command, FLOODED, 'a'),
+        communicator.evses[FLOODED].actor.call(command, FLOODED, 'b'),
+        communicator.evses[QUIET].actor.call(command, QUIET, 'c'),
+    )
+    # Un appelant qui abandonne libère la boîte pour la commande suivante
+    actor = communicator.evses[QUIET].actor
+    try:
+        await asyncio.wait_for(actor.call(asyncio.sleep, 10), 0.05)
+    except asyncio.TimeoutError:
+        pass
+    start = time.monotonic()
+    await actor.call(command, QUIET, 'd')
+    after_timeout = time.monotonic() - start
+    return results, spans, after_timeout
+
+def test_commands_serialized():
+    """Les commandes d'un EVSE ne se chevauchent pas, celles d'EVSE différents oui"""
+    results, spans, after_timeout = asyncio.run(serialized_commands())
+    assert results == ['a', 'b', 'c']
+    a, b, c = sorted(span for span in spans if span[1] in 'abc')
+    assert b[2] >= a[3]
+    assert c[2] < a[3]
+    assert after_timeout < 0.5
+
+async def stop_bypasses_mailbox():
+    communicator = make_fleet()
+    evse = communicator.evses[FLOODED]
+    # Commande lente en cours (ex: attente d'une confirmation)
+    busy = asyncio.ensure_future(evse.actor.call(asyncio.sleep, 1))
+    await asyncio.sleep(0)
+    start = time.monotonic()
+    stopped = await evse.charge_stop(confirm=False)
+    elapsed = time.monotonic() - start
+    busy.cancel()
+    return stopped, elapsed, communicator.transport.commands()
+
+def test_stop_bypasses_mailbox():
+    """L'arrêt n'attend pas la commande en cours"""
+    stopped, elapsed, sent = asyncio.run(stop_bypasses_mailbox())
+    assert stopped and elapsed < 0.1
+    assert sent == [ChargeStop.COMMAND]
+
+def status_packet(serial):
+    datagram = SingleACStatus()
+    datagram.set_device_serial(serial)
+    datagram.l1_voltage = 230.0
+    return datagram.pack()
+
+async def flood():
+    communicator = make_fleet()
+    addr = ('192.168.1.100', 28376)
+    for _ in range(200):
+        communicator._schedule_message(status_packet(FLOODED), addr)
+    communicator._schedule_message(status_packet(QUIET), ('192.168.1.101', 28376))
+    start = time.monotonic()
+    while communicator.get_actor_stats()[QUIET]['inbound']['processed'] == 0:
+        await asyncio.sleep(0)
+    quiet_latency = time.monotonic() - start
+    flooded_before_quiet = communicator.get_actor_stats()[FLOODED]['inbound']['processed']
+    while communicator.get_actor_stats()[FLOODED]['inbound']['depth']:
+        await asyncio.sleep(0)
+    return communicator.get_actor_stats(), quiet_latency, flooded_before_quiet
+
+def test_inbound_mailboxes():
+    """La boîte d'un EVSE inondé déborde sans retarder les autres"""
+    stats, quiet_latency, flooded_before_quiet = asyncio.run(flood())
+    flooded = stats[FLOODED]['inbound']
+    assert flooded['max_depth'] == INBOUND_QUEUE_SIZE
+    assert flooded['dropped'] == 200 - INBOUND_QUEUE_SIZE
+    assert flooded['processed'] == INBOUND_QUEUE_SIZE
+    assert stats[QUIET]['inbound']['processed'] == 1
+    # Traité en alternance avec l'EVSE inondé, pas après ses 64 paquets
+    assert flooded_before_quiet <= 2
+
+async def random_traffic():
+    communicator = make_fleet()
+    tasks_before = len(asyncio.all_tasks())
+    addr = ('192.168.1.66', 28376)
+    for _ in range(500):
+        communicator._schedule_message(os.urandom(40), addr)
+    # Trame valide d'un EVSE inconnu: il devient connu, sa boîte reste
+    communicator._schedule_message(status_packet("00000000000000cc"), addr)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    serials = set(communicator._actors)
+    tasks_after = len(asyncio.all_tasks())
+    communicator.forget_evse("00000000000000cc")
+    return serials, tasks_before, tasks_after, communicator
+
+def test_random_traffic():
+    """Des paquets invalides ne créent ni boîte ni tâche, les boîtes inactives s'arrêtent"""
+    serials, tasks_before, tasks_after, communicator = asyncio.run(random_traffic())
+    assert serials == {"00000000000000cc"}
+    assert tasks_after == tasks_before
+    assert "00000000000000cc" not in communicator._actors
+    assert "00000000000000cc" not in communicator.evses
+
+if __name__ == "__main__":
+    print("🧪 Test des acteurs par EVSE...")
+    test_commands_serialized()
+    test_stop_bypasses_mailbox()
+    test_inbound_mailboxes()
+    test_random_traffic()
+    stats, quiet_latency, _ = asyncio.run(flood())
+    flooded = stats[FLOODED]['inbound']
+    print(f"   EVSE inondé: {flooded['processed']} traités, {flooded['dropped']} abandonnés, "
+          f"{flooded['mean_time'] * 1e6:.0f}µs par paquet; autre EVSE servi en {quiet_latency * 1e3:.2f}ms")
+    print("   ✅ Boîtes aux lettres par EVSE")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test de l'interrogation adaptative
+Le statut est demandé souvent pendant une charge, moins souvent quand le
+pistolet est branché, rarement au repos, et le rythme change dès que
+l'état du pistolet ou de la sortie change
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, DEFAULT_POLL_INTERVALS
+from protocol.datagrams import Login, SingleACStatus
+
+from helpers import make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+def status(gun_state, output_state):
+    datagram = SingleACStatus()
+    datagram.set_device_serial(SERIAL)
+    datagram.l1_voltage = 230.0
+    datagram.gun_state = gun_state
+    datagram.output_state = output_state
+    return datagram
+
+async def run_session(poll_intervals=None):
+    communicator = make_communicator(Communicator)
+    if poll_intervals:
+        communicator.poll_intervals.update(poll_intervals)
+    login = Login()
+    login.set_device_serial(SERIAL)
+    await communicator._process_datagram(login, ADDR)
+    # Le broadcast de l'EVSE le marque connecté
+    evse = communicator.evses[SERIAL]
+    modes = [(evse.poll_mode, evse.poll_interval)]
+
+    for gun_state, output_state in ((1, 0), (2, 0), (2, 1), (2, 1), (2, 0), (1, 0)):
+        await communicator._process_datagram(status(gun_state, output_state), ADDR)
+        deadline = communicator.scheduler.deadline((SERIAL, 'status'))
+        remaining = deadline - communicator.scheduler.clock()
+        modes.append((evse.poll_mode, evse.poll_interval, remaining))
+    return modes, communicator
+
+def test_mode_follows_state():
+    """Chaque changement d'état replanifie l'interrogation avec le nouvel intervalle"""
+    modes, communicator = asyncio.run(run_session())
+    assert modes[0] == ('IDLE', DEFAULT_POLL_INTERVALS['IDLE'])
+    states = [mode[:2] for mode in modes[1:]]
+    assert states == [
+        ('IDLE', 60.0), ('PLUGGED_IN', 15.0), ('CHARGING', 5.0),
+        ('CHARGING', 5.0), ('PLUGGED_IN', 15.0), ('IDLE', 60.0),
+    ]
+    # Passage en charge: prochaine interrogation dans ~5 s, pas dans 60 s
+    mode, interval, remaining = modes[3]
+    assert remaining <= interval * 1.1
+    # L'intervalle courant est exposé dans les données du client
+    assert communicator.get_poll_interval(communicator.evses[SERIAL]) == 60.0
+
+def test_configurable_intervals():
+    """Les intervalles par état sont modifiables"""
+    modes, _ = asyncio.run(run_session({'CHARGING': 2.0}))
+    assert ('CHARGING', 2.0) in [mode[:2] for mode in modes]
+
+if __name__ == "__main__":
+    print("🧪 Test de l'interrogation adaptative...")
+    test_mode_follows_state()
+    test_configurable_intervals()
+    # Trafic d'interrogation d'une flotte de 100 EVSE au repos, par heure
+    before = 100 * 3600 / 5
+    after = 100 * 3600 / DEFAULT_POLL_INTERVALS['IDLE']
+    print(f"   100 EVSE au repos: {before:.0f} -> {after:.0f} requêtes de statut par heure")
+    print("   ✅ Rythme d'interrogation adapté à l'état")
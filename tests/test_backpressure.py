@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test de la contre-pression du transport
+Entre pause_writing et resume_writing, les trames attendent dans la file
+d'envoi sans bloquer la boucle; elles partent dans l'ordre à la reprise,
+même si le transport se remet en pause au milieu
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, EVSE, _EVSEDatagramProtocol
+from protocol.datagrams import SingleACStatusResponse
+
+from helpers import make_communicator
+
+EVSE_COUNT = 10
+# Trames acceptées par le transport avant d'atteindre son seuil haut
+CAPACITY = 3
+
+class SaturatingTransport:
+    """Transport qui se met en pause après CAPACITY trames, comme un buffer plein"""
+    def __init__(self, communicator):
+        self.protocol = _EVSEDatagramProtocol(communicator)
+        self.sent = []
+        self.room = CAPACITY
+
+    def sendto(self, data, addr):
+        assert self.room > 0, "trame envoyée à un transport en pause"
+        self.sent.append(data[5:13].hex())
+        self.room -= 1
+        if not self.room:
+            self.protocol.pause_writing()
+
+    def close(self):
+        pass
+
+    def drain(self):
+        self.room = CAPACITY
+        self.protocol.resume_writing()
+
+async def saturate():
+    communicator = make_communicator(Communicator, SaturatingTransport)
+    transport = communicator.transport
+    evses = []
+    for index in range(EVSE_COUNT):
+        evse = EVSE(communicator, f"{index:016x}", f"192.168.1.{100 + index}", 28376)
+        communicator.evses[evse.info.serial] = evse
+        evses.append(evse)
+    for evse in evses:
+        await evse.send_cached(SingleACStatusResponse)
+    # Seuil haut atteint: le reste attend, sans bloquer l'envoi
+    stages = [(len(transport.sent), communicator.get_send_queue_depth())]
+    # Chaque reprise vide la file jusqu'à la pause suivante
+    while communicator.get_send_queue_depth():
+        transport.drain()
+        stages.append((len(transport.sent), communicator.get_send_queue_depth()))
+    # File vide et transport disponible: envoi direct
+    transport.drain()
+    await evses[0].send_cached(SingleACStatusResponse)
+    direct = (len(transport.sent), communicator.get_send_queue_depth())
+    # Pause puis arrêt: la file est abandonnée
+    transport.protocol.pause_writing()
+    await evses[1].send_cached(SingleACStatusResponse)
+    queued_before_close = communicator.get_send_queue_depth()
+    communicator._close_transport()
+    closed = (communicator.get_send_queue_depth(), communicator._writing_paused)
+    return transport.sent, stages, direct, queued_before_close, closed
+
+def test_backpressure():
+    """Trames gardées pendant la pause, envoyées dans l'ordre, file vidée à l'arrêt"""
+    sent, stages, direct, queued_before_close, closed = asyncio.run(saturate())
+    assert stages == [(3, 7), (6, 4), (9, 1), (10, 0)]
+    assert sent[:EVSE_COUNT] == [f"{index:016x}" for index in range(EVSE_COUNT)]
+    assert direct == (EVSE_COUNT + 1, 0)
+    assert queued_before_close == 1
+    assert closed == (0, False)
+
+if __name__ == "__main__":
+    print("🧪 Test de la contre-pression du transport...")
+    test_backpressure()
+    print("   ✅ Trames gardées en pause et envoyées dans l'ordre")
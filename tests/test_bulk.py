@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test du décodage en masse des trames capturées
+Vérifie que le décodeur par colonnes (NumPy ou pur Python) donne
+exactement les mêmes valeurs que parse_datagrams trame par trame
+"""
+
+import logging
+import math
+import os
+import random
+import struct
+import sys
+import time
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.bulk import HAS_NUMPY, decode_frames
+from protocol.datagram import FrameCache, parse_datagrams
+from protocol.datagrams import (
+    SingleACStatus, SingleACChargingStatusPublicAuto, Heading, encode_error_bits,
+)
+
+# Les trames corrompues de la capture sont journalisées par parse_datagrams
+logging.getLogger('protocol').setLevel(logging.CRITICAL)
+
+SERIALS = ["1368844619649410", "1368844619649411", "00000000000000ff"]
+
+def status_payload(rng, three_phase=True):
+    payload = bytearray(rng.getrandbits(8) for _ in range(33 if three_phase else 25))
+    struct.pack_into('>HH', payload, 13, rng.randrange(65536), 0xffff if rng.random() < 0.2 else rng.randrange(65536))
+    return bytes(payload)
+
+def charging_status_payload(rng):
+    payload = bytearray(rng.getrandbits(8) for _ in range(rng.choice((74, 75))))
+    payload[2:18] = b'1712345678000000'
+    payload[30:46] = b'emmgr\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\x00'
+    if rng.random() < 0.3:
+        struct.pack_into('>HHH', payload, 20, 65535, 65535, 65535)
+    if len(payload) > 74:
+        payload[74] = rng.choice((18, 19, 3))
+    return bytes(payload)
+
+def capture(count=300, seed=1):
+    """Capture simulée: statuts, états de charge, heartbeats et trames corrompues"""
+    rng = random.Random(seed)
+    caches = [FrameCache(serial, None) for serial in SERIALS]
+    frames = []
+    for _ in range(count):
+        cache = rng.choice(caches)
+        kind = rng.random()
+        if kind < 0.4:
+            frames.append(cache.frame(SingleACStatus.COMMAND, status_payload(rng, rng.random() < 0.7)))
+        elif kind < 0.8:
+            frames.append(cache.frame(SingleACChargingStatusPublicAuto.COMMAND, charging_status_payload(rng)))
+        elif kind < 0.9:
+            frames.append(cache.frame(Heading.COMMAND, b''))
+        else:
+            # Checksum invalide ou trame tronquée
+            frame = bytearray(cache.frame(SingleACStatus.COMMAND, status_payload(rng)))
+            if rng.random() < 0.5:
+                frame[30] ^= 0xff
+            else:
+                del frame[40:]
+            frames.append(bytes(frame))
+    return frames
+
+def expected_columns(frames, cls):
+    """Colonnes attendues, construites à partir des objets Datagram"""
+    rows = []
+    for index, frame in enumerate(frames):
+        datagrams = parse_datagrams(frame)
+        if datagrams and type(datagrams[0]) is cls:
+            rows.append((index, datagrams[0]))
+    return rows
+
+def same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+def check_against_objects(columns, rows, cls):
+    assert columns['frame'] == [index for index, _ in rows]
+    for position, (_, datagram) in enumerate(rows):
+        assert columns['serial'][position] == datagram.device_serial
+        for name, value in vars(datagram).items():
+            if name not in columns:
+                continue
+            if name == 'errors':
+                value = encode_error_bits(value)
+            elif value is None:
+                value = math.nan
+            assert same(columns[name][position], value), f"{cls.__name__}.{name}: {columns[name][position]!r} != {value!r}"
+
+def test_python_decoder_matches_parse_datagrams():
+    """Le décodeur pur Python donne les mêmes valeurs que les objets"""
+    frames = capture()
+    for cls in (SingleACStatus, SingleACChargingStatusPublicAuto):
+        columns = decode_frames(frames, cls, use_numpy=False)
+        check_against_objects(columns, expected_columns(frames, cls), cls)
+
+def test_numpy_decoder_matches_python():
+    """Les deux décodeurs produisent des colonnes identiques"""
+    if not HAS_NUMPY:
+        print("  ⚠️ NumPy non installé, comparaison ignorée")
+        return
+    frames = capture()
+    for cls in (SingleACStatus, SingleACChargingStatusPublicAuto):
+        expected = decode_frames(frames, cls, use_numpy=False)
+        result = decode_frames(frames, cls, use_numpy=True)
+        assert list(result.dtype.names) == list(expected)
+        for name, column in expected.items():
+            values = result[name].tolist()
+            assert len(values) == len(column)
+            for a, b in zip(values, column):
+                assert same(float(a) if isinstance(b, float) else a, b), f"{cls.__name__}.{name}: {a!r} != {b!r}"
+
+def test_empty_capture():
+    """Une capture vide donne des colonnes vides"""
+    columns = decode_frames([], SingleACStatus, use_numpy=False)
+    assert columns['frame'] == [] and columns['l1_voltage'] == []
+
+def bench(count=20000):
+    """Débit de décodage d'une capture (trames/s)"""
+    frames = capture(count)
+    start = time.perf_counter()
+    for frame in frames:
+        parse_datagrams(frame)
+    per_frame = time.perf_counter() - start
+    print(f"{'parse_datagrams':24} {count / per_frame:12,.0f} trames/s")
+    modes = [False, True] if HAS_NUMPY else [False]
+    for use_numpy in modes:
+        start = time.perf_counter()
+        for cls in (SingleACStatus, SingleACChargingStatusPublicAuto):
+            decode_frames(frames, cls, use_numpy=use_numpy)
+        elapsed = time.perf_counter() - start
+        name = "decode_frames (NumPy)" if use_numpy else "decode_frames (Python)"
+        print(f"{name:24} {count / elapsed:12,.0f} trames/s")
+
+if __name__ == "__main__":
+    print("🧪 Vérification du décodage en masse...")
+    test_python_decoder_matches_parse_datagrams()
+    test_numpy_decoder_matches_python()
+    test_empty_capture()
+    print("   ✅ Colonnes identiques au décodage trame par trame\n")
+    print("⏱️ Débit de décodage:")
+    bench()
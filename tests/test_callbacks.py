@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test des callbacks d'événements
+Les callbacks d'un événement s'exécutent en parallèle, un callback bloqué
+est interrompu après le délai, et un abonnement peut se limiter à des
+types d'événements et à un EVSE
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.callbacks import CallbackRegistry
+from protocol.communicator import Communicator, EVSE
+
+FIRST = "00000000000000aa"
+SECOND = "00000000000000bb"
+
+async def fan_out():
+    registry = CallbackRegistry(timeout=0.1)
+    received = []
+
+    async def slow(event):
+        await asyncio.sleep(0.05)
+        received.append(('slow', event))
+
+    async def hung(event):
+        await asyncio.sleep(10)
+
+    async def failing(event):
+        raise ValueError("boom")
+
+    async def own_timeout(event):
+        # Délai interne au callback, pas celui du registre
+        async with asyncio.timeout(0.01):
+            await asyncio.sleep(1)
+
+    registry.add('slow 1', slow)
+    registry.add('slow 2', slow)
+    registry.add('hung', hung)
+    registry.add('failing', failing)
+    registry.add('own timeout', own_timeout)
+    start = time.monotonic()
+    await registry.notify('evse_state_changed', FIRST, 'evse_state_changed')
+    return registry.stats(), received, time.monotonic() - start
+
+def test_concurrent_with_timeout():
+    """Durée du plus lent (borné par le délai), pas la somme des callbacks"""
+    stats, received, elapsed = asyncio.run(fan_out())
+    assert received == [('slow', 'evse_state_changed')] * 2
+    assert 0.1 <= elapsed < 0.2
+    assert stats['hung']['timeouts'] == 1
+    assert stats['failing']['errors'] == 1
+    assert stats['own timeout']['errors'] == 1 and stats['own timeout']['timeouts'] == 0
+    assert stats['slow 1']['calls'] == 1 and 0.05 <= stats['slow 1']['mean_time'] < 0.1
+
+async def filtered():
+    communicator = Communicator(port=0)
+    evses = {serial: EVSE(communicator, serial, "192.168.1.50", 28376) for serial in (FIRST, SECOND)}
+    received = []
+
+    async def record(name, event, evse):
+        received.append((name, event, evse.info.serial))
+
+    communicator.add_callback('all', lambda event, evse, changes: record('all', event, evse))
+    communicator.add_callback('charge of first', lambda event, evse, changes: record('charge', event, evse),
+                              events=['evse_charge_status_changed'], serial=FIRST)
+    for serial in (FIRST, SECOND):
+        for event in ('evse_state_changed', 'evse_charge_status_changed'):
+            await communicator._notify_callbacks(event, evses[serial], {})
+    return received, communicator.get_callback_stats()
+
+def test_filters():
+    """Un abonné à un type d'événement d'un EVSE ne reçoit que ceux-là"""
+    received, stats = asyncio.run(filtered())
+    assert [entry for entry in received if entry[0] == 'charge'] == [
+        ('charge', 'evse_charge_status_changed', FIRST)]
+    assert len([entry for entry in received if entry[0] == 'all']) == 4
+    assert stats['charge of first']['calls'] == 1
+
+if __name__ == "__main__":
+    print("🧪 Test des callbacks d'événements...")
+    test_concurrent_with_timeout()
+    test_filters()
+    print("   ✅ Callbacks parallèles, bornés et filtrés")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test du décodage des enregistrements de charge
+Les logs optionnels sont lus selon la longueur du payload; un log kW
+tronqué (à partir de 156 octets) garde les entrées complètes présentes
+"""
+
+import os
+import struct
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.datagrams import CurrentChargeRecord
+
+def record_payload(length):
+    """Payload dont chaque entrée du log kW vaut son index"""
+    payload = bytearray(length)
+    for index in range(min(60, (length - 96) // 2)):
+        struct.pack_into('>H', payload, 96 + index * 2, index)
+    return bytes(payload)
+
+def decode(length):
+    record = CurrentChargeRecord()
+    record.unpack_payload(record_payload(length))
+    return record
+
+def test_short_records():
+    """Log kW absent sous 156 octets, tronqué jusqu'à 216 octets"""
+    assert decode(155).log_kw == []
+    assert decode(156).log_kw == list(range(30))
+    assert decode(157).log_kw == list(range(30))
+    assert decode(215).log_kw == list(range(59))
+    assert decode(215).log_charge_data_kwh == []
+
+def test_complete_records():
+    """Log kW complet à partir de 216 octets, logs suivants selon la longueur"""
+    record = decode(252)
+    assert record.log_kw == list(range(60))
+    assert len(record.log_charge_data_kwh) == 48
+    assert record.log_charge_data_charge_fee == []
+    assert len(decode(446).log_charge_data_service_fee) == 48
+
+if __name__ == "__main__":
+    print("🧪 Test du décodage des enregistrements de charge...")
+    test_short_records()
+    test_complete_records()
+    print("   ✅ Logs tronqués décodés sans erreur")
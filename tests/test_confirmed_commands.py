@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test des commandes de charge confirmées
+ChargeStart / ChargeStop sont réémis à l'identique (même charge_id) tant
+qu'ils ne sont pas confirmés, par la réponse de l'EVSE ou par un statut
+montrant le changement de sortie (un statut déjà à la cible ne confirme rien)
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+import protocol.communicator as communicator_module
+from protocol.communicator import Communicator, EVSE, CONFIRM_ATTEMPTS
+from protocol.datagrams import ChargeStart, ChargeStartResponse, ChargeStop, SingleACStatus
+
+from helpers import make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+class LossyTransport:
+    """Transport qui perd les premières commandes, puis fait répondre l'EVSE"""
+    def __init__(self, communicator, lost, reply):
+        self.communicator = communicator
+        self.lost = lost
+        self.reply = reply
+        self.sent = []
+        self.commands = 0
+
+    def sendto(self, data, addr):
+        self.sent.append(data)
+        # Les acquittements de statut ne sont pas des commandes
+        if int.from_bytes(data[19:21], 'big') not in (ChargeStart.COMMAND, ChargeStop.COMMAND):
+            return
+        self.commands += 1
+        if self.commands <= self.lost or self.reply is None:
+            return
+        response = self.reply()
+        response.set_device_serial(SERIAL)
+        asyncio.get_running_loop().call_soon(lambda: asyncio.ensure_future(
+            self.communicator._process_datagram(response, ADDR)))
+
+def output_status(output_state):
+    datagram = SingleACStatus()
+    datagram.output_state = output_state
+    datagram.gun_state = 2
+    return datagram
+
+def stopped_status():
+    return output_status(0)
+
+async def run_command(command, lost, reply, output_state=None):
+    communicator = make_communicator(Communicator, lambda communicator: LossyTransport(communicator, lost, reply))
+    evse = EVSE(communicator, SERIAL, *ADDR)
+    evse.password = "123456"
+    evse._logged_in = True
+    communicator.evses[SERIAL] = evse
+    if output_state is not None:
+        # Dernier statut reçu avant la commande
+        status = output_status(output_state)
+        status.set_device_serial(SERIAL)
+        await communicator._process_datagram(status, ADDR)
+        communicator.transport.sent.clear()
+    # Délais courts pour le test
+    confirm_timeout = communicator_module.CONFIRM_TIMEOUT
+    communicator_module.CONFIRM_TIMEOUT = 0.02
+    try:
+        if command == 'start':
+            result = await evse.charge_start(16)
+        else:
+            result = await evse.charge_stop()
+    finally:
+        communicator_module.CONFIRM_TIMEOUT = confirm_timeout
+    return result, communicator
+
+def test_start_retransmitted():
+    """Deux trames perdues: la troisième, identique, est confirmée"""
+    result, communicator = asyncio.run(run_command('start', 2, ChargeStartResponse))
+    sent = communicator.transport.sent
+    assert result is True
+    assert len(sent) == 3 and len(set(sent)) == 1
+    assert int.from_bytes(sent[0][19:21], 'big') == ChargeStart.COMMAND
+    stats = communicator.get_confirm_stats()['ChargeStart']
+    assert stats['count'] == 1 and stats['retransmissions'] == 2 and stats['failures'] == 0
+    # 0.02 + 0.04 s d'attente avant la troisième trame
+    assert 0.06 <= stats['mean'] < 0.5
+
+def test_stop_confirmed_by_status():
+    """Un statut avec la sortie coupée confirme l'arrêt, sans ChargeStopResponse"""
+    result, communicator = asyncio.run(run_command('stop', 0, stopped_status, output_state=1))
+    assert result is True
+    # Une seule trame d'arrêt (la suivante est l'acquittement du statut)
+    commands = [int.from_bytes(frame[19:21], 'big') for frame in communicator.transport.sent]
+    assert commands.count(ChargeStop.COMMAND) == 1
+    assert communicator.get_confirm_stats()['ChargeStop']['count'] == 1
+
+def stop_frames(communicator):
+    return [frame for frame in communicator.transport.sent
+            if int.from_bytes(frame[19:21], 'big') == ChargeStop.COMMAND]
+
+def test_status_without_transition():
+    """Un statut déjà à la cible (sortie déjà coupée, ou état inconnu) ne confirme rien"""
+    for output_state in (0, None):
+        result, communicator = asyncio.run(run_command('stop', 0, stopped_status, output_state))
+        assert result is False
+        assert len(stop_frames(communicator)) == CONFIRM_ATTEMPTS
+
+def test_transition_after_send():
+    """Sortie encore active au premier statut, coupée au suivant: confirmé"""
+    statuses = iter([output_status(1), output_status(0)])
+    result, communicator = asyncio.run(run_command('stop', 0, lambda: next(statuses)))
+    assert result is True
+    assert len(stop_frames(communicator)) == 2
+
+def test_not_confirmed():
+    """Sans confirmation, échec après CONFIRM_ATTEMPTS envois"""
+    result, communicator = asyncio.run(run_command('start', 0, None))
+    assert result is False
+    assert len(communicator.transport.sent) == CONFIRM_ATTEMPTS
+    assert communicator.get_confirm_stats()['ChargeStart']['failures'] == 1
+    assert not communicator._pending
+
+if __name__ == "__main__":
+    print("🧪 Test des commandes de charge confirmées...")
+    test_start_retransmitted()
+    test_stop_confirmed_by_status()
+    test_status_without_transition()
+    test_transition_after_send()
+    test_not_confirmed()
+    print("   ✅ Commandes réémises jusqu'à confirmation")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test des mises à jour poussées au coordinateur
+Un changement d'état reçu par le client est publié aussitôt aux entités,
+puis au plus une fois par PUSH_DEBOUNCE; les trames des autres EVSE ne
+réveillent pas le coordinateur
+
+Nécessite Home Assistant (pip install homeassistant)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Ajouter la racine du projet pour importer l'intégration complète
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+sys.path.insert(0, project_root)
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.evsemasterudp import EVSEDataUpdateCoordinator, PUSH_DEBOUNCE
+from custom_components.evsemasterudp.evse_client import EVSEClient
+from custom_components.evsemasterudp.protocol.communicator import Communicator, EVSE
+from custom_components.evsemasterudp.protocol.datagrams import SingleACStatus
+
+from helpers import NullTransport, make_communicator
+
+SERIAL = "1368844619649410"
+OTHER = "1368844619649411"
+ADDR = ('192.168.1.50', 28376)
+
+def status_packet(serial, power):
+    datagram = SingleACStatus()
+    datagram.set_device_serial(serial)
+    datagram.current_power = power
+    return datagram.pack()
+
+async def push_updates():
+    hass = HomeAssistant(tempfile.mkdtemp())
+    client = EVSEClient()
+    client.communicator = communicator = make_communicator(Communicator, NullTransport())
+    communicator.add_callback('evse_client', client._handle_evse_event)
+    # EVSE déjà découverts: seules les trames de statut les changent
+    for serial in (SERIAL, OTHER):
+        communicator.evses[serial] = EVSE(communicator, serial, *ADDR)
+
+    coordinator = EVSEDataUpdateCoordinator(hass, client, SERIAL)
+    coordinator.data = {}
+    pushes = []
+    unsubscribe = coordinator.async_add_listener(
+        lambda: pushes.append((time.monotonic(), coordinator.data['current_power'])))
+    client.add_callback('coordinator', coordinator.async_handle_evse_event, serial=SERIAL)
+
+    async def receive(serial, power):
+        await communicator._handle_message(status_packet(serial, power), ADDR)
+        await asyncio.sleep(0.01)
+
+    try:
+        # Premier changement: publié aussitôt
+        await receive(SERIAL, 1000)
+        first = list(pushes)
+        immediate_latency = coordinator.push_latency["last"]
+        # Changements suivants dans la fenêtre: regroupés en une publication
+        await receive(SERIAL, 2000)
+        await receive(SERIAL, 3000)
+        # Trames d'un autre EVSE: ignorées par ce coordinateur
+        for power in (1000, 2000, 3000):
+            await receive(OTHER, power)
+        during = list(pushes)
+        await asyncio.sleep(PUSH_DEBOUNCE + 0.1)
+    finally:
+        unsubscribe()
+        coordinator.async_shutdown_push()
+        await hass.async_stop(force=True)
+    return first, during, pushes, coordinator, immediate_latency
+
+def test_push_debounced_per_serial():
+    """Publication immédiate, puis regroupée, seulement pour l'EVSE suivi"""
+    first, during, pushes, coordinator, immediate_latency = asyncio.run(push_updates())
+    assert [power for _, power in first] == [1000]
+    assert during == first
+    assert [power for _, power in pushes] == [1000, 3000]
+    assert pushes[1][0] - pushes[0][0] >= PUSH_DEBOUNCE
+    # Latence depuis l'arrivée de la plus ancienne trame non publiée
+    assert coordinator.push_latency["count"] == 2
+    assert immediate_latency < 0.05
+    assert coordinator.push_latency["max"] <= PUSH_DEBOUNCE + 0.1
+    assert coordinator.average_push_latency > 0
+
+if __name__ == "__main__":
+    print("🧪 Test des mises à jour poussées au coordinateur...")
+    test_push_debounced_per_serial()
+    _, _, _, coordinator, immediate_latency = asyncio.run(push_updates())
+    latency = coordinator.push_latency
+    print(f"   Première publication: {immediate_latency * 1000:.2f} ms après la trame")
+    print(f"   Publication regroupée: {latency['last'] * 1000:.1f} ms après la plus ancienne trame, "
+          f"moyenne {coordinator.average_push_latency * 1000:.1f} ms ({latency['count']} publications)")
+    print("   ✅ Mises à jour poussées et regroupées")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test de la réception par DatagramProtocol
+Les paquets UDP arrivent par datagram_received sur un vrai socket local,
+plusieurs trames d'un même paquet sont toutes traitées, et les paquets
+invalides ou reçus après l'arrêt sont ignorés
+"""
+
+import asyncio
+import os
+import socket
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, _EVSEDatagramProtocol
+from protocol.datagrams import Login, SingleACStatus
+
+SERIAL = "1368844619649410"
+OTHER = "1368844619649411"
+
+def frame(datagram, serial=SERIAL):
+    datagram.set_device_serial(serial)
+    return datagram.pack()
+
+def status(power, serial=SERIAL):
+    datagram = SingleACStatus()
+    datagram.current_power = power
+    return frame(datagram, serial)
+
+async def receive_over_udp():
+    communicator = Communicator(port=0)
+    await communicator.start()
+    port = communicator.socket.getsockname()[1]
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.bind(('127.0.0.1', 0))
+    try:
+        # Paquets invalides: ignorés, aucun EVSE créé
+        sender.sendto(b'\x00' * 40, ('127.0.0.1', port))
+        sender.sendto(b'garbage', ('127.0.0.1', port))
+        # Broadcast de l'EVSE, puis deux statuts dans un seul paquet
+        sender.sendto(frame(Login()), ('127.0.0.1', port))
+        evse = await communicator.wait_for_evse(SERIAL, 2)
+        sender.sendto(status(1000) + status(2000), ('127.0.0.1', port))
+        for _ in range(100):
+            if evse.state is not None and evse.state.current_power == 2000:
+                break
+            await asyncio.sleep(0.01)
+        received = (evse, sender.getsockname(), evse.state.current_power, set(communicator.evses))
+    finally:
+        await communicator.stop()
+        sender.close()
+    # Après l'arrêt, le protocole ne transmet plus rien
+    _EVSEDatagramProtocol(communicator).datagram_received(frame(Login(), OTHER), ('192.168.1.51', 28376))
+    await asyncio.sleep(0.01)
+    return received, set(communicator.evses)
+
+def test_receive_path():
+    """Trames reçues par le socket, traitées dans l'ordre, paquets invalides ignorés"""
+    (evse, sender_addr, power, serials), after_stop = asyncio.run(receive_over_udp())
+    assert evse is not None
+    assert (evse.info.ip, evse.info.port) == sender_addr
+    assert power == 2000
+    assert serials == {SERIAL}
+    assert after_stop == {SERIAL}
+
+if __name__ == "__main__":
+    print("🧪 Test de la réception par DatagramProtocol...")
+    test_receive_path()
+    print("   ✅ Trames UDP reçues sans attente active")
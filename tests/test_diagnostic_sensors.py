@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test des capteurs de diagnostic
+Débits de paquets et taux d'erreurs calculés entre deux relevés des
+compteurs du protocole, temps aller-retour, connexions, âge du dernier
+statut et profondeur de la file de réception
+
+Nécessite Home Assistant (pip install homeassistant)
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter la racine du projet pour importer l'intégration complète
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+sys.path.insert(0, project_root)
+
+from homeassistant.const import EntityCategory
+
+from custom_components.evsemasterudp.evse_client import EVSEClient, PROTOCOL_STATS_MAX_AGE
+from custom_components.evsemasterudp.protocol.communicator import Communicator, EVSE
+from custom_components.evsemasterudp.protocol.datagrams import SingleACStatus
+from custom_components.evsemasterudp.sensor import (
+    EVSECommandRTTSensor, EVSEIngestQueueSensor, EVSELoginCountSensor,
+    EVSEDiagnosticSensor, EVSEPacketRateSensor, EVSEParseErrorRateSensor, EVSERateSensor,
+    EVSEStatusAgeSensor,
+)
+
+from helpers import NullTransport, make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+class Coordinator:
+    """Coordinateur minimal (les capteurs de diagnostic ne le lisent pas)"""
+    data = {}
+    last_update_success = True
+
+def status_packet():
+    datagram = SingleACStatus()
+    datagram.set_device_serial(SERIAL)
+    return datagram.pack()
+
+async def poll_twice():
+    client = EVSEClient()
+    client.communicator = communicator = make_communicator(Communicator, NullTransport())
+    evse = EVSE(communicator, SERIAL, *ADDR)
+    evse.password = "123456"
+    evse._logged_in = True
+    communicator.evses[SERIAL] = evse
+    coordinator = Coordinator()
+    sensors = {
+        'in': EVSEPacketRateSensor(coordinator, SERIAL, "EVSE", client, "frames_received", "Packets In"),
+        'out': EVSEPacketRateSensor(coordinator, SERIAL, "EVSE", client, "frames_sent", "Packets Out"),
+        'errors': EVSEParseErrorRateSensor(coordinator, SERIAL, "EVSE", client),
+        'rtt': EVSECommandRTTSensor(coordinator, SERIAL, "EVSE", client),
+        'logins': EVSELoginCountSensor(coordinator, SERIAL, "EVSE", client),
+        'status_age': EVSEStatusAgeSensor(coordinator, SERIAL, "EVSE", client),
+        'queue': EVSEIngestQueueSensor(coordinator, SERIAL, "EVSE", client),
+    }
+    for sensor in sensors.values():
+        await sensor.async_update()
+    first = {name: sensor.native_value for name, sensor in sensors.items()}
+    # Lire les compteurs ne crée pas d'acteur pour l'EVSE
+    assert SERIAL not in communicator._actors
+    # Paquet en attente dans la boîte aux lettres (avant que sa tâche ne tourne)
+    communicator._schedule_message(status_packet(), ADDR)
+    queued = communicator.inbound_depth(SERIAL)
+    await asyncio.sleep(0.01)
+    assert (queued, communicator.inbound_depth(SERIAL)) == (1, 0)
+    # 9 statuts valides (et 9 acquittements), 1 statut corrompu
+    for _ in range(8):
+        await communicator._handle_message(status_packet(), ADDR)
+    corrupted = bytearray(status_packet())
+    corrupted[25] ^= 0xFF
+    await communicator._handle_message(bytes(corrupted), ADDR)
+    evse._record_rtt(SingleACStatus.COMMAND, 0.0123)
+    communicator.metrics.inc('logins', SERIAL, value=2)
+    # Relevé suivant: le premier date d'une seconde
+    client._protocol_stats[SERIAL]['time'] -= PROTOCOL_STATS_MAX_AGE
+    for sensor in sensors.values():
+        await sensor.async_update()
+    second = {name: sensor.native_value for name, sensor in sensors.items()}
+    return sensors, first, second
+
+def test_diagnostic_sensors():
+    """Valeurs issues des compteurs du protocole, débits par différence"""
+    sensors, first, second = asyncio.run(poll_twice())
+    assert first['in'] is None and first['errors'] is None
+    assert first['rtt'] is None and first['status_age'] is None
+    assert first['logins'] == 0 and first['queue'] == 0
+    assert 8 < second['in'] <= 9 and 8 < second['out'] <= 9
+    assert second['errors'] == 10.0
+    assert second['rtt'] == 12.3
+    assert second['logins'] == 2
+    assert second['status_age'] == 0
+    for sensor in sensors.values():
+        assert sensor.entity_category == EntityCategory.DIAGNOSTIC
+        assert sensor.entity_registry_enabled_default is False
+        assert sensor.should_poll
+
+def test_abstract_bases():
+    """Les classes de base ne s'instancient pas sans valeur calculée"""
+    for base in (EVSEDiagnosticSensor, EVSERateSensor):
+        try:
+            base(Coordinator(), SERIAL, "EVSE", EVSEClient(), "base", "Base")
+        except TypeError:
+            continue
+        raise AssertionError(f"{base.__name__} instantiated")
+
+if __name__ == "__main__":
+    print("🧪 Test des capteurs de diagnostic...")
+    test_diagnostic_sensors()
+    test_abstract_bases()
+    _, _, second = asyncio.run(poll_twice())
+    print(f"   {second}")
+    print("   ✅ Capteurs de santé du protocole")
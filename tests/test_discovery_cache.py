@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test du cache de découverte
+Les EVSE connus sont enregistrés sur disque et restaurés au démarrage,
+wait_for_evse() les rend sans attendre leur broadcast
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.cache import DiscoveryCache, LAST_SEEN_REFRESH
+from protocol.communicator import Communicator
+from protocol.datagrams import Login
+
+from helpers import make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+def broadcast():
+    datagram = Login()
+    datagram.set_device_serial(SERIAL)
+    datagram.brand = "Morec"
+    datagram.model = "EVSE-7KW"
+    datagram.max_electricity = 32
+    return datagram
+
+def test_round_trip_and_expiry():
+    """Les entrées trop anciennes sont abandonnées au chargement"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'discovery.json')
+    cache = DiscoveryCache(path, ttl=3600)
+    cache.update("recent", {'ip': '192.168.1.10', 'last_seen': time.time()})
+    cache.update("old", {'ip': '192.168.1.11', 'last_seen': time.time() - 7200})
+    # Hors boucle asyncio, l'écriture est immédiate et atomique
+    assert os.listdir(directory) == ['discovery.json']
+
+    loaded = DiscoveryCache(path, ttl=3600).load()
+    assert list(loaded) == ["recent"]
+    assert loaded["recent"]['ip'] == '192.168.1.10'
+
+def test_last_seen_throttled():
+    """Un last_seen plus récent seul ne provoque pas d'écriture"""
+    path = os.path.join(tempfile.mkdtemp(), 'discovery.json')
+    cache = DiscoveryCache(path)
+    now = time.time()
+    cache.update(SERIAL, {'ip': '192.168.1.10', 'last_seen': now})
+    cache.update(SERIAL, {'ip': '192.168.1.10', 'last_seen': now + 60})
+    with open(path) as cache_file:
+        assert json.load(cache_file)['evses'][SERIAL]['last_seen'] == now
+    cache.update(SERIAL, {'ip': '192.168.1.10', 'last_seen': now + LAST_SEEN_REFRESH})
+    cache.update(SERIAL, {'ip': '192.168.1.12', 'last_seen': now + LAST_SEEN_REFRESH})
+    with open(path) as cache_file:
+        assert json.load(cache_file)['evses'][SERIAL]['ip'] == '192.168.1.12'
+
+async def discover_then_restart(path):
+    # Premier démarrage: l'EVSE est découvert par son broadcast
+    communicator = make_communicator(Communicator)
+    communicator.discovery_cache = DiscoveryCache(path, save_delay=0.01)
+    await communicator._process_datagram(broadcast(), ADDR)
+    communicator.evses[SERIAL].config.max_electricity = 20
+    communicator.evses[SERIAL].mark_changed()
+    communicator.running = False
+    await communicator.discovery_cache.async_flush()
+
+    # Redémarrage: l'EVSE est restauré sans attendre de broadcast
+    restarted = Communicator(port=0)
+    restarted.discovery_cache = DiscoveryCache(path)
+    await restarted.start()
+    try:
+        start = time.monotonic()
+        evse = await restarted.wait_for_evse(SERIAL, 5)
+        elapsed = time.monotonic() - start
+    finally:
+        await restarted.stop()
+    return evse, elapsed
+
+def test_warm_restart():
+    """Un EVSE déjà vu est disponible dès le démarrage"""
+    path = os.path.join(tempfile.mkdtemp(), 'discovery.json')
+    evse, elapsed = asyncio.run(discover_then_restart(path))
+    assert evse is not None and evse.restored
+    assert elapsed < 0.01
+    assert (evse.info.ip, evse.info.port) == ADDR
+    assert evse.info.brand == "Morec"
+    assert evse.info.model == "EVSE-7KW"
+    assert evse.info.max_electricity == 32
+    assert evse.config.max_electricity == 20
+
+class ThreadRecordingCache(DiscoveryCache):
+    """Cache qui note le thread de ses lectures et écritures"""
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def _read(self):
+        self.threads.append(threading.current_thread())
+        return super()._read()
+
+    def save(self, data=None):
+        self.threads.append(threading.current_thread())
+        super().save(data)
+
+async def load_then_close(path):
+    communicator = Communicator(port=0)
+    communicator.discovery_cache = cache = ThreadRecordingCache(path)
+    await communicator.start()
+    await communicator._process_datagram(broadcast(), ADDR)
+    communicator.close()
+    await communicator._cache_flush_task
+    return cache.threads
+
+def test_io_off_event_loop():
+    """Lecture au démarrage et écriture à la fermeture hors de la boucle"""
+    path = os.path.join(tempfile.mkdtemp(), 'discovery.json')
+    threads = asyncio.run(load_then_close(path))
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+    assert SERIAL in DiscoveryCache(path).load()
+
+if __name__ == "__main__":
+    print("🧪 Test du cache de découverte...")
+    test_round_trip_and_expiry()
+    test_last_seen_throttled()
+    test_warm_restart()
+    test_io_off_event_loop()
+    print("   ✅ EVSE restaurés au démarrage")
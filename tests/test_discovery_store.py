@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test du cache de découverte de l'intégration
+Les EVSE sont gardés dans le stockage de Home Assistant
+(.storage/evsemasterudp.discovery) et restaurés au chargement
+
+Nécessite Home Assistant (pip install homeassistant)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Ajouter la racine du projet pour importer l'intégration complète
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+sys.path.insert(0, project_root)
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.evsemasterudp import StoreDiscoveryCache
+from custom_components.evsemasterudp.protocol.communicator import Communicator
+from custom_components.evsemasterudp.protocol.datagrams import Login
+
+from helpers import make_communicator
+
+SERIAL = "1368844619649410"
+OTHER = "1368844619649411"
+
+async def save_then_load(config_dir):
+    hass = HomeAssistant(config_dir)
+    try:
+        cache = StoreDiscoveryCache(hass)
+        assert await cache.async_load() == {}
+        cache.update("recent", {'ip': '192.168.1.10', 'last_seen': time.time()})
+        cache.update("old", {'ip': '192.168.1.11', 'last_seen': time.time() - cache.ttl - 60})
+        await cache.async_flush()
+        loaded = await StoreDiscoveryCache(hass).async_load()
+    finally:
+        await hass.async_stop(force=True)
+    return loaded
+
+def test_store_round_trip():
+    """Écriture par le Store, entrées expirées abandonnées au chargement"""
+    config_dir = tempfile.mkdtemp()
+    loaded = asyncio.run(save_then_load(config_dir))
+    assert list(loaded) == ["recent"]
+    with open(os.path.join(config_dir, '.storage', 'evsemasterudp.discovery')) as store_file:
+        stored = json.load(store_file)
+    assert stored['key'] == 'evsemasterudp.discovery'
+    # Le chargement a abandonné l'entrée expirée, écrit à l'arrêt
+    assert list(stored['data']['evses']) == ["recent"]
+
+async def forget_then_reload(config_dir):
+    hass = HomeAssistant(config_dir)
+    try:
+        communicator = make_communicator(Communicator)
+        communicator.discovery_cache = StoreDiscoveryCache(hass, ttl=3600)
+        for index, serial in enumerate((SERIAL, OTHER)):
+            login = Login()
+            login.set_device_serial(serial)
+            await communicator._process_datagram(login, (f"192.168.1.{50 + index}", 28376))
+        await communicator.discovery_cache.async_flush()
+        communicator.forget_evse(SERIAL)
+        await communicator.discovery_cache.async_flush()
+        loaded = await StoreDiscoveryCache(hass, ttl=3600).async_load()
+        # TTL du constructeur: une entrée de deux heures a expiré
+        short = StoreDiscoveryCache(hass, ttl=3600)
+        await short.async_load()
+        short.update("stale", {'ip': '192.168.1.12', 'last_seen': time.time() - 7200})
+        await short.async_flush()
+        expired = await StoreDiscoveryCache(hass, ttl=3600).async_load()
+        kept = await StoreDiscoveryCache(hass, ttl=3 * 3600).async_load()
+    finally:
+        await hass.async_stop(force=True)
+    return loaded, expired, kept
+
+def test_forget_and_ttl():
+    """Un EVSE oublié n'est plus restauré, la durée de vie vient du constructeur"""
+    loaded, expired, kept = asyncio.run(forget_then_reload(tempfile.mkdtemp()))
+    assert list(loaded) == [OTHER]
+    assert "stale" not in expired
+    assert "stale" in kept
+
+if __name__ == "__main__":
+    print("🧪 Test du cache de découverte de l'intégration...")
+    test_store_round_trip()
+    test_forget_and_ttl()
+    print("   ✅ EVSE gardés dans le stockage de Home Assistant")
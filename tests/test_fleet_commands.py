@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Test des commandes de flotte
+Le courant de 15 EVSE est réglé en parallèle (concurrence limitée, délai
+par EVSE), et les arrêts partent avant les réglages de courant
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Ajouter la racine du projet pour importer le client
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+sys.path.insert(0, project_root)
+
+from custom_components.evsemasterudp.evse_client import EVSEClient, FLEET_TIMEOUT
+from custom_components.evsemasterudp.protocol.communicator import CONFIRM_ATTEMPTS, Communicator, EVSE
+from custom_components.evsemasterudp.protocol.datagrams import ChargeStop, ChargeStopResponse
+
+from helpers import make_communicator, run_virtual
+
+EVSE_COUNT = 15
+CONFIRM_DELAY = 0.1
+# Cet EVSE ne confirme jamais
+SILENT = f"{0:016x}"
+
+class StopConfirmingTransport:
+    """Transport qui note l'ordre des commandes envoyées, et confirme les arrêts"""
+    def __init__(self, communicator, log):
+        self.communicator = communicator
+        self.log = log
+
+    def sendto(self, data, addr):
+        if int.from_bytes(data[19:21], 'big') == ChargeStop.COMMAND:
+            self.log.append('stop')
+            response = ChargeStopResponse()
+            response.set_device_serial(data[5:13].hex())
+            asyncio.get_running_loop().call_later(CONFIRM_DELAY, lambda: asyncio.ensure_future(
+                self.communicator._process_datagram(response, addr)))
+
+def make_client():
+    log = []
+    client = EVSEClient()
+    client.communicator = communicator = make_communicator(
+        Communicator, lambda communicator: StopConfirmingTransport(communicator, log))
+
+    def make_set(evse):
+        async def set_max_electricity(amps):
+            log.append('set')
+            await asyncio.sleep(60 if evse.info.serial == SILENT else CONFIRM_DELAY)
+            evse.config.max_electricity = amps
+            return True
+        return set_max_electricity
+
+    for index in range(EVSE_COUNT):
+        serial = f"{index:016x}"
+        evse = EVSE(communicator, serial, f"192.168.1.{100 + index}", 28376)
+        evse.password = "123456"
+        evse._logged_in = True
+        # Confirmation simulée de SetAndGetOutputElectricity
+        evse.set_max_electricity = make_set(evse)
+        communicator.evses[serial] = evse
+    return client, log
+
+async def load_shedding(stop_delay=0.0):
+    client, log = make_client()
+    if stop_delay:
+        # Une attente avant l'envoi de l'arrêt ne doit pas laisser passer les réglages
+        for evse in client.communicator.evses.values():
+            def delayed(charge_stop):
+                async def charge_stop_later(*args, **kwargs):
+                    await asyncio.sleep(stop_delay)
+                    return await charge_stop(*args, **kwargs)
+                return charge_stop_later
+            evse.charge_stop = delayed(evse.charge_stop)
+    targets = {serial: 10 for serial in client.communicator.evses}
+    stops = [f"{index:016x}" for index in range(10, EVSE_COUNT)]
+    start = time.monotonic()
+    currents, stopped = await asyncio.gather(
+        client.set_max_current_many(targets, concurrency=8, timeout=0.5),
+        client.stop_many(stops + ["ffffffffffffffff"]),
+    )
+    return currents, stopped, log, time.monotonic() - start
+
+def test_load_shedding():
+    """Résultat par EVSE, réglages en parallèle, arrêts en premier"""
+    currents, stopped, log, elapsed = asyncio.run(load_shedding())
+    check_load_shedding(currents, stopped, log)
+    # 2 vagues de 8 au lieu de 15 attentes successives (+ le délai de l'EVSE muet)
+    assert elapsed < EVSE_COUNT * CONFIRM_DELAY
+
+def test_stops_first_after_await():
+    """Les arrêts restent en tête même si leur envoi attend d'abord"""
+    currents, stopped, log, _ = asyncio.run(load_shedding(stop_delay=0.01))
+    check_load_shedding(currents, stopped, log)
+
+def check_load_shedding(currents, stopped, log):
+    assert currents.pop(SILENT) is False
+    assert set(currents.values()) == {True} and len(currents) == EVSE_COUNT - 1
+    assert stopped.pop("ffffffffffffffff") is False
+    assert set(stopped.values()) == {True} and len(stopped) == 5
+    # Tous les arrêts sont partis avant le premier réglage de courant
+    assert log[:5] == ['stop'] * 5 and log.count('set') == EVSE_COUNT
+
+class LateConfirmTransport:
+    """Transport qui ne confirme que le dernier envoi de chaque ChargeStop"""
+    def __init__(self, communicator):
+        self.communicator = communicator
+        self.sends = {}
+
+    def sendto(self, data, addr):
+        if int.from_bytes(data[19:21], 'big') != ChargeStop.COMMAND:
+            return
+        serial = data[5:13].hex()
+        self.sends[serial] = self.sends.get(serial, 0) + 1
+        if self.sends[serial] == CONFIRM_ATTEMPTS:
+            response = ChargeStopResponse()
+            response.set_device_serial(serial)
+            asyncio.get_running_loop().call_soon(lambda: asyncio.ensure_future(
+                self.communicator._process_datagram(response, addr)))
+
+async def late_confirmations(timeout):
+    client = EVSEClient()
+    client.communicator = communicator = make_communicator(Communicator, LateConfirmTransport)
+    for index in range(3):
+        serial = f"{index:016x}"
+        evse = EVSE(communicator, serial, f"192.168.1.{100 + index}", 28376)
+        evse.password = "123456"
+        evse._logged_in = True
+        communicator.evses[serial] = evse
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    stopped = await client.stop_many(list(communicator.evses), timeout=timeout)
+    return stopped, loop.time() - start
+
+def test_fleet_timeout_covers_retransmissions():
+    """Avec les vraies constantes, un arrêt confirmé au dernier envoi (7 s) réussit"""
+    stopped, elapsed = run_virtual(late_confirmations(FLEET_TIMEOUT))
+    assert set(stopped.values()) == {True}
+    assert 7.0 <= elapsed < FLEET_TIMEOUT
+    # L'ancien délai (6 s) abandonnait avant la 4e réémission
+    stopped, _ = run_virtual(late_confirmations(6.0))
+    assert set(stopped.values()) == {False}
+
+class SilentTransport:
+    """Transport qui note l'heure de chaque ChargeStop envoyé, sans jamais confirmer"""
+    def __init__(self, communicator):
+        self.sends = {}
+
+    def sendto(self, data, addr):
+        if int.from_bytes(data[19:21], 'big') == ChargeStop.COMMAND:
+            now = asyncio.get_running_loop().time()
+            self.sends.setdefault(data[5:13].hex(), []).append(now)
+
+async def unconfirmed_stops(concurrency):
+    client = EVSEClient()
+    client.communicator = communicator = make_communicator(Communicator, SilentTransport)
+    for index in range(EVSE_COUNT):
+        serial = f"{index:016x}"
+        evse = EVSE(communicator, serial, f"192.168.1.{100 + index}", 28376)
+        evse.password = "123456"
+        evse._logged_in = True
+        communicator.evses[serial] = evse
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    stopped = await client.stop_many(list(communicator.evses), concurrency=concurrency)
+    sends = {serial: [when - start for when in times] for serial, times in communicator.transport.sends.items()}
+    return stopped, sends, loop.time() - start
+
+def test_unconfirmed_stops_sent_at_once():
+    """Plus d'EVSE que la concurrence, aucun ne confirme: tous les arrêts partent à t=0"""
+    stopped, sends, elapsed = run_virtual(unconfirmed_stops(concurrency=8))
+    assert set(stopped.values()) == {False} and len(stopped) == EVSE_COUNT
+    assert len(sends) == EVSE_COUNT
+    # Premier envoi immédiat pour chacun (avant: t=15 s au-delà des 8 premiers),
+    # puis les réémissions à 1, 3 et 7 s
+    for times in sends.values():
+        assert [round(when, 1) for when in times] == [0.0, 1.0, 3.0, 7.0]
+    # Les attentes de confirmation se recouvrent: une seule période d'abandon
+    assert elapsed < FLEET_TIMEOUT
+
+if __name__ == "__main__":
+    print("🧪 Test des commandes de flotte...")
+    test_load_shedding()
+    test_stops_first_after_await()
+    test_fleet_timeout_covers_retransmissions()
+    test_unconfirmed_stops_sent_at_once()
+    _, _, _, elapsed = asyncio.run(load_shedding())
+    print(f"   {EVSE_COUNT} EVSE en {elapsed:.2f}s (séquentiel: {EVSE_COUNT * CONFIRM_DELAY + 0.5:.2f}s)")
+    print("   ✅ Commandes de flotte parallèles")
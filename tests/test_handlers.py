@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test de la table des gestionnaires de datagrammes
+register_handler associe une ou plusieurs commandes à un gestionnaire,
+refuse une commande déjà gérée, et les datagrammes sans gestionnaire
+sont comptés par commande
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, EVSE, DATAGRAM_HANDLERS, register_handler
+from protocol.datagrams import (
+    ChargeStartResponse, ChargeStopResponse, GetVersionResponse, Login, LoginResponse,
+    SingleACStatus,
+)
+
+from helpers import NullTransport, make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+def frame(datagram_cls):
+    datagram = datagram_cls()
+    datagram.set_device_serial(SERIAL)
+    return datagram
+
+def test_builtin_handlers():
+    """Les commandes du protocole ont leur gestionnaire"""
+    for datagram_cls in (Login, LoginResponse, SingleACStatus):
+        assert datagram_cls.COMMAND in DATAGRAM_HANDLERS
+
+async def dispatch():
+    communicator = make_communicator(Communicator, NullTransport())
+    evse = communicator.evses[SERIAL] = EVSE(communicator, SERIAL, *ADDR)
+    handled = []
+
+    @register_handler(ChargeStartResponse, ChargeStopResponse)
+    async def on_charge_response(communicator, evse, datagram):
+        handled.append((type(datagram).__name__, evse.info.serial))
+
+    try:
+        await communicator._process_datagram(frame(ChargeStartResponse), ADDR)
+        await communicator._process_datagram(frame(ChargeStopResponse), ADDR)
+        # Commande déjà gérée: refusée, le gestionnaire existant reste en place
+        try:
+            register_handler(ChargeStartResponse)(on_charge_response)
+            duplicate = False
+        except ValueError:
+            duplicate = True
+        registered = DATAGRAM_HANDLERS[ChargeStartResponse.COMMAND] is on_charge_response
+    finally:
+        for datagram_cls in (ChargeStartResponse, ChargeStopResponse):
+            DATAGRAM_HANDLERS.pop(datagram_cls.COMMAND, None)
+
+    # Sans gestionnaire: compté, et la requête qui l'attendait est tout de même résolue
+    waiter = communicator.expect_response(SERIAL, [GetVersionResponse.COMMAND])
+    await communicator._process_datagram(frame(GetVersionResponse), ADDR)
+    await communicator._process_datagram(frame(GetVersionResponse), ADDR)
+    await communicator._process_datagram(frame(ChargeStartResponse), ADDR)
+    return handled, duplicate, registered, waiter.done(), communicator.unhandled_commands
+
+def test_dispatch_and_unhandled():
+    """Dispatch par commande, doublon refusé, commandes sans gestionnaire comptées"""
+    handled, duplicate, registered, resolved, unhandled = asyncio.run(dispatch())
+    assert handled == [('ChargeStartResponse', SERIAL), ('ChargeStopResponse', SERIAL)]
+    assert duplicate and registered
+    assert resolved
+    assert unhandled == {GetVersionResponse.COMMAND: 2, ChargeStartResponse.COMMAND: 1}
+
+if __name__ == "__main__":
+    print("🧪 Test de la table des gestionnaires de datagrammes...")
+    test_builtin_handlers()
+    test_dispatch_and_unhandled()
+    print("   ✅ Datagrammes dispatchés par commande")
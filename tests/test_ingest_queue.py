@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test de la file de réception
+Quand la boîte d'un EVSE est pleine, les statuts périodiques les plus
+anciens sont abandonnés avant les réponses aux commandes; compteurs et
+histogramme de latence de la file
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.actor import INBOUND_QUEUE_SIZE
+from protocol.communicator import Communicator, EVSE
+from protocol.datagrams import ChargeStartResponse, SingleACStatus
+from protocol.metrics import LatencyHistogram
+
+from helpers import NullTransport, make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+def make_logged_in():
+    communicator = make_communicator(Communicator, NullTransport())
+    evse = EVSE(communicator, SERIAL, *ADDR)
+    evse.password = "123456"
+    evse._logged_in = True
+    communicator.evses[SERIAL] = evse
+    return communicator
+
+def packet(datagram_class):
+    datagram = datagram_class()
+    datagram.set_device_serial(SERIAL)
+    return datagram.pack()
+
+async def overflow():
+    communicator = make_logged_in()
+    status, response = packet(SingleACStatus), packet(ChargeStartResponse)
+    # Rien n'est traité avant le premier await: la boîte se remplit
+    for _ in range(INBOUND_QUEUE_SIZE):
+        communicator._schedule_message(status, ADDR)
+    for _ in range(5):
+        communicator._schedule_message(response, ADDR)
+    full_of_status = dict(communicator.frames_dropped)
+    # Plus que des réponses: la nouvelle trame est abandonnée
+    for _ in range(INBOUND_QUEUE_SIZE):
+        communicator._schedule_message(response, ADDR)
+    communicator._schedule_message(status, ADDR)
+    communicator._schedule_message(response, ADDR)
+    while communicator.get_ingest_stats()['depth']:
+        await asyncio.sleep(0)
+    return communicator.get_ingest_stats(), full_of_status
+
+def test_status_dropped_first():
+    """Les réponses remplacent les statuts en attente, jamais l'inverse"""
+    stats, full_of_status = asyncio.run(overflow())
+    assert full_of_status == {'status': 5, 'control': 0}
+    assert stats['dropped'] == {'status': INBOUND_QUEUE_SIZE + 1, 'control': 5 + 1}
+    assert stats['queued'] == 2 * INBOUND_QUEUE_SIZE
+    assert stats['processed'] == INBOUND_QUEUE_SIZE
+    assert stats['latency']['count'] == INBOUND_QUEUE_SIZE
+
+def test_histogram():
+    """Répartition par seau et percentiles"""
+    histogram = LatencyHistogram(bounds=(0.001, 0.01, 0.1))
+    for seconds in (0.0005, 0.0005, 0.005, 0.05, 0.5):
+        histogram.observe(seconds)
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {'<=0.001': 2, '<=0.01': 1, '<=0.1': 1, '>0.1': 1}
+    assert snapshot['count'] == 5 and snapshot['max'] == 0.5
+    assert snapshot['p50'] == 0.01
+    assert snapshot['p99'] == 0.5
+    assert LatencyHistogram().snapshot()['p50'] == 0.0
+
+if __name__ == "__main__":
+    print("🧪 Test de la file de réception...")
+    test_status_dropped_first()
+    test_histogram()
+    stats, _ = asyncio.run(overflow())
+    print(f"   {stats['queued']} en file, {stats['dropped']} abandonnés, {stats['processed']} traités, "
+          f"latence p50 {stats['latency']['p50'] * 1e3:.1f}ms")
+    print("   ✅ Statuts abandonnés avant les réponses")
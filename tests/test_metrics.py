@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test des métriques du protocole
+Trames reçues, erreurs de checksum, commandes inconnues, acquittements
+envoyés et temps aller-retour, par numéro de série et commande
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, EVSE
+from protocol.datagram import UNKNOWN_SERIAL, UnknownCommandBase
+from protocol.datagrams import (
+    ChargeStop, LoginResponse, RequestLogin, SingleACStatus, SingleACStatusResponse,
+)
+from protocol.metrics import MetricsRegistry
+
+from helpers import make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+class EchoTransport:
+    """Transport qui fait répondre LoginResponse à RequestLogin"""
+    def __init__(self, communicator):
+        self.communicator = communicator
+
+    def sendto(self, data, addr):
+        if int.from_bytes(data[19:21], 'big') == RequestLogin.COMMAND:
+            response = LoginResponse()
+            response.set_device_serial(SERIAL)
+            asyncio.get_running_loop().call_soon(
+                lambda: asyncio.ensure_future(self.communicator._handle_message(response.pack(), ADDR)))
+
+def packet(datagram):
+    datagram.set_device_serial(SERIAL)
+    return datagram.pack()
+
+async def traffic():
+    communicator = make_communicator(Communicator, EchoTransport)
+    evse = EVSE(communicator, SERIAL, *ADDR)
+    evse.password = "123456"
+    evse._logged_in = True
+    communicator.evses[SERIAL] = evse
+    status = packet(SingleACStatus())
+    await communicator._handle_message(status, ADDR)
+    # Un octet de la charge utile modifié: checksum invalide
+    corrupted = bytearray(status)
+    corrupted[25] ^= 0xFF
+    await communicator._handle_message(bytes(corrupted), ADDR)
+    unknown = type('UnknownCommand30583', (UnknownCommandBase,), {'COMMAND': 0x7777})()
+    await communicator._handle_message(packet(unknown), ADDR)
+    await evse._request(RequestLogin(), [LoginResponse.COMMAND], 1.0)
+    return communicator
+
+def test_protocol_metrics():
+    """Chaque chemin (analyse, traitement, envoi) alimente le registre"""
+    communicator = asyncio.run(traffic())
+    metrics = communicator.metrics
+    assert metrics.counter('frames_received', SERIAL, SingleACStatus.COMMAND) == 1
+    assert metrics.counter('frames_received', SERIAL, LoginResponse.COMMAND) == 1
+    assert metrics.counter('checksum_errors', SERIAL, SingleACStatus.COMMAND) == 1
+    assert metrics.counter('unknown_commands', SERIAL, 0x7777) == 1
+    assert metrics.counter('frames_sent', SERIAL, SingleACStatusResponse.COMMAND) == 1
+    assert metrics.total('acks_sent') == 1
+    assert metrics.total('frames_sent', SERIAL) == 2
+    snapshot = communicator.get_metrics()
+    rtt, = snapshot['histograms']['rtt']
+    assert rtt['serial'] == SERIAL and rtt['command'] == RequestLogin.COMMAND and rtt['count'] == 1
+    assert snapshot['gauges']['evses'] == [{'serial': None, 'command': None, 'value': 1}]
+    assert {entry['command'] for entry in snapshot['histograms']['dispatch_time']} >= {SingleACStatus.COMMAND}
+
+async def forged_traffic():
+    communicator = make_communicator(Communicator, EchoTransport)
+    communicator.evses[SERIAL] = EVSE(communicator, SERIAL, *ADDR)
+    # Trames invalides avec des numéros de série inventés, ou celui d'un
+    # EVSE connu envoyé depuis une autre adresse
+    for index in range(50):
+        forged = SingleACStatus()
+        forged.set_device_serial(f"{index:016x}")
+        corrupted = bytearray(forged.pack())
+        corrupted[25] ^= 0xFF
+        await communicator._handle_message(bytes(corrupted), ADDR)
+    corrupted = bytearray(packet(SingleACStatus()))
+    corrupted[25] ^= 0xFF
+    await communicator._handle_message(bytes(corrupted), ('192.168.1.66', 28376))
+    unknown = type('UnknownCommand30583', (UnknownCommandBase,), {'COMMAND': 0x7777})()
+    unknown.set_device_serial("00000000000000ff")
+    await communicator._handle_message(unknown.pack(), ADDR)
+    return communicator
+
+def test_invalid_frames_bucketed():
+    """Les erreurs de trames non fiables vont dans une seule étiquette"""
+    communicator = asyncio.run(forged_traffic())
+    metrics = communicator.metrics
+    assert metrics.counter('checksum_errors', UNKNOWN_SERIAL, SingleACStatus.COMMAND) == 51
+    assert metrics.counter('unknown_commands', UNKNOWN_SERIAL, 0x7777) == 1
+    errors = ('checksum_errors', 'parse_errors', 'unknown_commands')
+    assert {serial for name, serial, _ in metrics.counters if name in errors} == {UNKNOWN_SERIAL}
+
+def test_counters_derived():
+    """Compteurs du communicateur lus depuis le registre, sans double comptage"""
+    communicator = Communicator(port=0)
+    communicator.metrics.inc('logins', SERIAL, value=2)
+    communicator.metrics.inc('unhandled_commands', SERIAL, 0x7777)
+    communicator.metrics.inc('unhandled_commands', "00000000000000ff", 0x7777)
+    communicator.metrics.inc('frames_dropped', SERIAL, SingleACStatus.COMMAND)
+    communicator.metrics.inc('frames_dropped', SERIAL, RequestLogin.COMMAND, value=3)
+    assert communicator.logins_performed == 2
+    assert communicator.unhandled_commands == {0x7777: 2}
+    assert communicator.frames_dropped == {'status': 1, 'control': 3}
+    communicator.metrics.clear()
+    assert communicator.logins_performed == 0
+
+def test_registry():
+    """Compteurs, jauges et histogrammes indépendants par étiquette"""
+    metrics = MetricsRegistry()
+    metrics.inc('frames_received', 'a', 1)
+    metrics.inc('frames_received', 'a', 1)
+    metrics.inc('frames_received', 'b', 2, value=3)
+    metrics.set('depth', 4)
+    metrics.observe('rtt', 0.02, 'a', 1)
+    assert metrics.counter('frames_received', 'a', 1) == 2
+    assert metrics.total('frames_received') == 5
+    assert metrics.total('frames_received', 'b') == 3
+    # Sommes tenues à jour à chaque incrément, sans parcourir les compteurs
+    assert metrics.totals('a') == {'frames_received': 2}
+    assert metrics.by_command('frames_received') == {1: 2, 2: 3}
+    metrics.inc('events_emitted', 'a', 'evse_state_changed')
+    assert metrics.by_command('events_emitted') == {'evse_state_changed': 1}
+    snapshot = metrics.snapshot()
+    assert snapshot['gauges']['depth'][0]['value'] == 4
+    assert snapshot['histograms']['rtt'][0]['buckets']['<=0.05'] == 1
+    metrics.clear()
+    assert metrics.snapshot() == {'counters': {}, 'gauges': {}, 'histograms': {}}
+    assert metrics.total('frames_received') == 0 and metrics.totals('a') == {}
+
+async def communicator_counters():
+    communicator = make_communicator(Communicator)
+    evse = EVSE(communicator, SERIAL, *ADDR)
+    communicator.evses[SERIAL] = evse
+
+    async def callback(event, evse, changes):
+        pass
+
+    communicator.add_callback('test', callback)
+    status = SingleACStatus()
+    status.set_device_serial(SERIAL)
+    communicator._schedule_message(status.pack(), ADDR)
+    communicator._schedule_message(status.pack(), ADDR)
+    while communicator.get_ingest_stats()['depth'] or communicator.frames_processed < 2:
+        await asyncio.sleep(0)
+    communicator._record_confirmation(SERIAL, ChargeStop.COMMAND, 0.5, 2)
+    communicator._record_confirmation(SERIAL, ChargeStop.COMMAND, None, 4)
+    return communicator
+
+def test_communicator_counters_in_registry():
+    """Événements, confirmations et latences du communicateur dans le registre"""
+    communicator = asyncio.run(communicator_counters())
+    snapshot = communicator.get_metrics()
+    counters = snapshot['counters']
+    assert communicator.events_emitted['evse_state_changed'] == 1
+    assert communicator.events_suppressed['evse_state_changed'] == 1
+    assert {'serial': SERIAL, 'command': 'evse_state_changed', 'value': 1} in counters['events_emitted']
+    assert 'field_changes' in counters
+    assert communicator.get_confirm_stats()['ChargeStop'] == {
+        'count': 1, 'mean': 0.5, 'max': 0.5, 'retransmissions': 4, 'failures': 1}
+    assert snapshot['histograms']['confirm_time'][0]['command'] == ChargeStop.COMMAND
+    assert snapshot['histograms']['ingest_latency'][0]['count'] == 2
+    assert communicator.ingest_latency.count == 2
+    assert communicator.outbound_dropped == {'safety': 0, 'control': 0, 'ack': 0, 'poll': 0}
+    # Statistiques des boîtes aux lettres et des callbacks copiées en jauges
+    depth = {(entry['serial'], entry['command']): entry['value'] for entry in snapshot['gauges']['mailbox_processed']}
+    assert depth[(SERIAL, 'inbound')] == 2
+    calls, = snapshot['gauges']['callback_calls']
+    assert calls['command'] == 'test' and calls['value'] == 1
+
+if __name__ == "__main__":
+    print("🧪 Test des métriques du protocole...")
+    test_protocol_metrics()
+    test_invalid_frames_bucketed()
+    test_counters_derived()
+    test_registry()
+    test_communicator_counters_in_registry()
+    print("   ✅ Métriques par EVSE et par commande")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test de la file d'envoi par priorité
+Quand le transport est saturé, un ChargeStop passe avant les
+acquittements et les interrogations en attente, sans les affamer
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import (
+    Communicator, EVSE, OUTBOUND_QUEUE_SIZE, STARVATION_LIMIT, _EVSEDatagramProtocol,
+)
+from protocol.datagrams import (
+    ChargeStop, HeadingResponse, RequestChargeStatusRecord, SetAndGetOutputElectricity,
+    SingleACStatusResponse,
+)
+
+from helpers import make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+def make_endpoint():
+    communicator = make_communicator(Communicator)
+    evse = EVSE(communicator, SERIAL, *ADDR)
+    evse.password = "123456"
+    communicator.evses[SERIAL] = evse
+    return communicator, evse, _EVSEDatagramProtocol(communicator)
+
+async def burst():
+    communicator, evse, protocol = make_endpoint()
+    # Le buffer du transport dépasse son seuil haut
+    protocol.pause_writing()
+    for _ in range(30):
+        await evse.send_cached(SingleACStatusResponse)
+        await evse.send_cached(HeadingResponse)
+    for _ in range(5):
+        await evse.send_cached(RequestChargeStatusRecord)
+    await evse.send_datagram(SetAndGetOutputElectricity())
+    await evse.send_datagram(ChargeStop())
+    depths = communicator.get_send_queue_depths()
+    protocol.resume_writing()
+    return communicator, depths
+
+def test_priority_order():
+    """L'arrêt part en premier, puis la commande, puis les acquittements"""
+    communicator, depths = asyncio.run(burst())
+    assert depths == {'safety': 1, 'control': 1, 'ack': 60, 'poll': 5}
+    sent = communicator.transport.commands()
+    assert len(sent) == 67 and communicator.get_send_queue_depth() == 0
+    assert sent[0] == ChargeStop.COMMAND
+    assert sent[1] == SetAndGetOutputElectricity.COMMAND
+    # Les interrogations ne sont pas affamées par les 60 acquittements
+    polls = [index for index, command in enumerate(sent) if command == RequestChargeStatusRecord.COMMAND]
+    assert polls[0] <= STARVATION_LIMIT + 2
+    assert all(later - earlier <= STARVATION_LIMIT + 1 for earlier, later in zip(polls, polls[1:]))
+
+async def overflow():
+    communicator, evse, protocol = make_endpoint()
+    protocol.pause_writing()
+    for _ in range(OUTBOUND_QUEUE_SIZE):
+        await evse.send_cached(SingleACStatusResponse)
+    # File pleine d'acquittements: l'interrogation est abandonnée, l'arrêt remplace un acquittement
+    await evse.send_cached(RequestChargeStatusRecord)
+    await evse.send_datagram(ChargeStop())
+    depths = communicator.get_send_queue_depths()
+    protocol.resume_writing()
+    return communicator, depths
+
+def test_overflow_drops_least_urgent():
+    """Une file pleine n'abandonne jamais un arrêt"""
+    communicator, depths = asyncio.run(overflow())
+    assert depths == {'safety': 1, 'control': 0, 'ack': OUTBOUND_QUEUE_SIZE - 1, 'poll': 0}
+    assert communicator.outbound_dropped == {'safety': 0, 'control': 0, 'ack': 1, 'poll': 1}
+    assert communicator.transport.commands()[0] == ChargeStop.COMMAND
+
+if __name__ == "__main__":
+    print("🧪 Test de la file d'envoi par priorité...")
+    test_priority_order()
+    test_overflow_drops_least_urgent()
+    print("   ✅ Commandes de sécurité envoyées en premier")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test de la table de corrélation des requêtes
+Plusieurs requêtes en vol sur un ou plusieurs EVSE reçoivent chacune leur
+réponse, quel que soit l'ordre d'arrivée; un délai dépassé ou une
+annulation ne retire que l'attente concernée
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, EVSE
+from protocol.datagrams import (
+    ChargeStart, ChargeStartResponse, ChargeStop, ChargeStopResponse, LoginResponse, RequestLogin,
+)
+
+from helpers import NullTransport, make_communicator
+
+FIRST = "00000000000000aa"
+SECOND = "00000000000000bb"
+
+def make_evses():
+    communicator = make_communicator(Communicator, NullTransport())
+    evses = {}
+    for index, serial in enumerate((FIRST, SECOND)):
+        evses[serial] = communicator.evses[serial] = EVSE(communicator, serial, f"192.168.1.{100 + index}", 28376)
+    return communicator, evses
+
+def request(evse, datagram_cls, response_cls, timeout=1.0):
+    datagram = datagram_cls()
+    datagram.set_device_serial(evse.info.serial)
+    return asyncio.ensure_future(evse._request(datagram, [response_cls.COMMAND], timeout))
+
+def respond(communicator, serial, response_cls, marker=None):
+    response = response_cls()
+    response.set_device_serial(serial)
+    response.marker = marker
+    return communicator._resolve_pending(serial, response)
+
+async def in_flight():
+    communicator, evses = make_evses()
+    login = request(evses[FIRST], RequestLogin, LoginResponse)
+    start = request(evses[FIRST], ChargeStart, ChargeStartResponse)
+    stop_first = request(evses[FIRST], ChargeStop, ChargeStopResponse)
+    stop_again = request(evses[FIRST], ChargeStop, ChargeStopResponse)
+    other = request(evses[SECOND], ChargeStop, ChargeStopResponse)
+    await asyncio.sleep(0)
+    waiting = {serial: len(waiters) for serial, waiters in communicator._pending.items()}
+    # Réponses dans le désordre; deux réponses à la même commande: la plus ancienne d'abord
+    resolved = [
+        respond(communicator, SECOND, ChargeStopResponse, 'second'),
+        respond(communicator, FIRST, ChargeStopResponse, 'stop 1'),
+        respond(communicator, FIRST, ChargeStartResponse),
+        respond(communicator, FIRST, ChargeStopResponse, 'stop 2'),
+        respond(communicator, FIRST, LoginResponse),
+        # Personne n'attend plus cette réponse
+        respond(communicator, FIRST, LoginResponse),
+    ]
+    results = await asyncio.gather(login, start, stop_first, stop_again, other)
+    return waiting, resolved, results, communicator._pending
+
+def test_concurrent_requests():
+    """Chaque requête reçoit sa réponse, la table est vide ensuite"""
+    waiting, resolved, results, pending = asyncio.run(in_flight())
+    assert waiting == {FIRST: 4, SECOND: 1}
+    assert resolved == [True] * 5 + [False]
+    login, start, stop_first, stop_again, other = results
+    assert isinstance(login, LoginResponse) and isinstance(start, ChargeStartResponse)
+    assert (stop_first.marker, stop_again.marker, other.marker) == ('stop 1', 'stop 2', 'second')
+    assert pending == {}
+
+async def timeout_and_cancel():
+    communicator, evses = make_evses()
+    evse = evses[FIRST]
+    short = request(evse, ChargeStart, ChargeStartResponse, timeout=0.02)
+    long = request(evse, ChargeStart, ChargeStartResponse, timeout=1.0)
+    cancelled = request(evse, ChargeStop, ChargeStopResponse, timeout=1.0)
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    # Le délai de la première expire seul, la seconde attend toujours
+    timed_out = await short
+    after_timeout = [commands for commands, _, _ in communicator._pending[FIRST]]
+    respond(communicator, FIRST, ChargeStartResponse, 'late')
+    answered = await long
+    try:
+        await cancelled
+    except asyncio.CancelledError:
+        pass
+    # Réponse à la requête annulée: plus personne ne l'attend
+    unclaimed = respond(communicator, FIRST, ChargeStopResponse)
+    timeouts = communicator.metrics.counter('request_timeouts', FIRST, ChargeStart.COMMAND)
+    return timed_out, after_timeout, answered, unclaimed, timeouts, communicator._pending
+
+def test_timeout_and_cancel_cleanup():
+    """Délai et annulation par attente, sans fuite dans la table"""
+    timed_out, after_timeout, answered, unclaimed, timeouts, pending = asyncio.run(timeout_and_cancel())
+    assert timed_out is None
+    assert after_timeout == [frozenset({ChargeStartResponse.COMMAND})]
+    assert answered.marker == 'late'
+    assert not unclaimed
+    assert timeouts == 1
+    assert pending == {}
+
+if __name__ == "__main__":
+    print("🧪 Test de la table de corrélation des requêtes...")
+    test_concurrent_requests()
+    test_timeout_and_cancel_cleanup()
+    print("   ✅ Réponses corrélées, attentes nettoyées")
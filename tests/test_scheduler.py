@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test de l'ordonnanceur des tâches périodiques
+Chaque EVSE a ses propres échéances (keepalive, relogin, statut), étalées
+dans le temps, et les relogins tournent en parallèle
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, EVSE, LOGIN_TIMEOUT, MAX_CONCURRENT_LOGINS
+from protocol.scheduler import Scheduler
+
+from helpers import make_communicator
+
+class FakeClock:
+    """Horloge manuelle"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_deadlines():
+    """Les clés sortent dans l'ordre, une nouvelle échéance remplace l'ancienne"""
+    clock = FakeClock()
+    scheduler = Scheduler(jitter=0, clock=clock)
+    scheduler.schedule('a', 3)
+    scheduler.schedule('b', 1)
+    scheduler.schedule('c', 2)
+    scheduler.schedule('a', 0.5)
+    scheduler.cancel('c')
+    assert scheduler.next_deadline() == 0.5
+    clock.now = 1.0
+    assert scheduler.pop_due() == ['a', 'b']
+    clock.now = 10
+    assert scheduler.pop_due() == []
+    assert len(scheduler) == 0 and scheduler.next_deadline() is None
+
+def test_jitter_spreads_fleet():
+    """500 EVSE découverts en même temps ne sont pas interrogés au même instant"""
+    clock = FakeClock()
+    scheduler = Scheduler(clock=clock, rng=random.Random(1))
+    for index in range(500):
+        scheduler.schedule_spread((f"{index:016x}", 'status'), 5.0)
+    # Nombre d'interrogations par tranche de 100 ms sur trois cycles
+    busiest = 0
+    for step in range(150):
+        clock.now = (step + 1) * 0.1
+        due = scheduler.pop_due()
+        busiest = max(busiest, len(due))
+        for key in due:
+            scheduler.schedule(key, 5.0)
+    assert len(scheduler) == 500
+    # 10 en moyenne, 500 d'un coup avant
+    assert busiest < 30
+
+async def relogin_fleet():
+    communicator = make_communicator(Communicator)
+    done = {}
+    start = time.monotonic()
+
+    def make_login(evse, delay):
+        async def login(password):
+            await asyncio.sleep(delay)
+            done[evse.info.serial] = time.monotonic() - start
+            evse._logged_in = True
+            return True
+        return login
+
+    for index in range(20):
+        serial = f"{index:016x}"
+        evse = EVSE(communicator, serial, f"192.168.1.{100 + index}", 28376)
+        evse.password = "123456"
+        evse._logged_in = True
+        # Aucune trame authentifiée depuis plus de LOGIN_TIMEOUT
+        evse.last_authenticated = time.monotonic() - LOGIN_TIMEOUT - 5
+        # Le premier EVSE ne répond plus: son login dure bien plus que les autres
+        evse.login = make_login(evse, 1.0 if index == 0 else 0.05)
+        communicator.evses[serial] = evse
+
+    for evse in communicator.evses.values():
+        await communicator._check_keepalive(evse)
+    relogins = [key for key in list(communicator.scheduler._deadlines) if key[1] == 'relogin']
+    for serial, job in relogins:
+        await communicator._run_job(communicator.evses[serial], job)
+    running = len(communicator._relogin_tasks)
+    await asyncio.gather(*communicator._relogin_tasks.values())
+    # Une fois reconnecté, la prochaine vérification est juste après LOGIN_TIMEOUT
+    next_check = await communicator._check_keepalive(communicator.evses["0" * 16])
+    return relogins, running, done, next_check, communicator
+
+def test_concurrent_relogins():
+    """Un EVSE muet ne retarde pas le relogin des autres"""
+    relogins, running, done, next_check, communicator = asyncio.run(relogin_fleet())
+    assert len(relogins) == 20
+    assert running == 20
+    slow = done.pop("0" * 16)
+    # 19 logins rapides par vagues de MAX_CONCURRENT_LOGINS, pendant le login lent
+    assert max(done.values()) < 0.05 * (19 // (MAX_CONCURRENT_LOGINS - 1) + 2)
+    assert max(done.values()) < slow
+    assert not communicator._relogin_tasks
+    assert LOGIN_TIMEOUT <= next_check <= LOGIN_TIMEOUT + 2
+
+if __name__ == "__main__":
+    print("🧪 Test de l'ordonnanceur...")
+    test_deadlines()
+    test_jitter_spreads_fleet()
+    test_concurrent_relogins()
+    print("   ✅ Tâches périodiques étalées et relogins parallèles")
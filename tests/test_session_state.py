@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test de l'état de session
+Toute trame authentifiée prouve que la session est vivante: un EVSE qui
+parle ne subit plus de login complet, seule une session restée muette est
+sondée puis renouvelée
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, LOGIN_TIMEOUT, SessionState
+from protocol.datagrams import Login, LoginResponse, RequestChargeStatusRecord, SingleACStatus
+
+from helpers import RecordingTransport, make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+def frame(datagram_cls):
+    datagram = datagram_cls()
+    datagram.set_device_serial(SERIAL)
+    return datagram
+
+async def run_session():
+    transport = RecordingTransport()
+    communicator = make_communicator(Communicator, transport)
+    await communicator._process_datagram(frame(Login), ADDR)
+    evse = communicator.evses[SERIAL]
+    evse.password = "123456"
+    states = [evse.session]
+
+    # Session saine: aucun heading répondu depuis longtemps, mais des statuts reçus
+    evse.last_active_login = datetime.now() - timedelta(seconds=LOGIN_TIMEOUT + 10)
+    evse.last_authenticated = time.monotonic() - LOGIN_TIMEOUT - 10
+    await communicator._process_datagram(frame(SingleACStatus), ADDR)
+    next_check = await communicator._check_keepalive(evse)
+    # Vérification suivante, même login ancien: pas compté une seconde fois
+    await communicator._check_keepalive(evse)
+    states.append(evse.session)
+    healthy = (next_check, (SERIAL, 'relogin') in communicator.scheduler, communicator.logins_avoided)
+
+    # Session muette: sondée, puis relance annulée car l'EVSE a répondu
+    evse.last_authenticated = time.monotonic() - LOGIN_TIMEOUT - 1
+    transport.sent.clear()
+    await communicator._check_keepalive(evse)
+    states.append(evse.session)
+    probed = RequestChargeStatusRecord.COMMAND in transport.commands()
+    await communicator._process_datagram(frame(SingleACStatus), ADDR)
+    states.append(evse.session)
+    communicator.scheduler.cancel((SERIAL, 'relogin'))
+    await communicator._run_job(evse, 'relogin')
+    recovered = (probed, communicator.logins_performed, communicator.logins_avoided)
+
+    # Session toujours muette: login complet
+    evse.last_authenticated = time.monotonic() - LOGIN_TIMEOUT - 1
+    await communicator._check_keepalive(evse)
+    communicator.scheduler.cancel((SERIAL, 'relogin'))
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.01, lambda: asyncio.ensure_future(
+        communicator._process_datagram(frame(LoginResponse), ADDR)))
+    await communicator._run_job(evse, 'relogin')
+    # Login en cours, avant la réponse de l'EVSE
+    await asyncio.sleep(0.005)
+    states.append(evse.session)
+    await asyncio.gather(*communicator._relogin_tasks.values())
+    states.append(evse.session)
+    return states, healthy, recovered, communicator
+
+def test_session_states():
+    """ACTIVE tant que l'EVSE parle, STALE s'il se tait, relogin seulement si besoin"""
+    states, healthy, recovered, communicator = asyncio.run(run_session())
+    assert states == [
+        SessionState.ACTIVE, SessionState.ACTIVE, SessionState.STALE, SessionState.ACTIVE,
+        SessionState.AUTHENTICATING, SessionState.ACTIVE,
+    ]
+    next_check, relogin_scheduled, avoided = healthy
+    # Session saine: pas de relogin, évité par rapport à l'ancienne règle
+    assert not relogin_scheduled
+    assert next_check > LOGIN_TIMEOUT - 1
+    assert avoided == 1
+    # Session sondée qui répond: relogin évité, le même login déjà compté
+    probed, performed, avoided = recovered
+    assert probed and performed == 0 and avoided == 1
+    # Session vraiment muette: un seul login complet
+    assert communicator.logins_performed == 1
+    assert communicator.evses[SERIAL].is_logged_in()
+
+if __name__ == "__main__":
+    print("🧪 Test de l'état de session...")
+    test_session_states()
+    print("   ✅ Relogin uniquement pour les sessions muettes")
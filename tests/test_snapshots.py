@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test des instantanés d'EVSE du client
+Un instantané est réutilisé tant que rien ne change, et reconstruit après
+une transition de session, un changement de l'intervalle d'interrogation
+planifié ou quand last_seen avance d'un intervalle
+"""
+
+import asyncio
+import os
+import sys
+from datetime import timedelta
+
+# Ajouter la racine du projet pour importer le client
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+sys.path.insert(0, project_root)
+
+from custom_components.evsemasterudp.evse_client import EVSEClient
+from custom_components.evsemasterudp.protocol.communicator import Communicator, EVSE, SessionState
+
+from helpers import NullTransport, make_communicator, run_virtual
+
+SERIAL = "1368844619649410"
+
+def make_client():
+    client = EVSEClient()
+    client.communicator = communicator = make_communicator(Communicator, NullTransport())
+    evse = EVSE(communicator, SERIAL, "192.168.1.50", 28376)
+    communicator.evses[SERIAL] = evse
+    # Interrogation planifiée, comme à la découverte
+    communicator._update_poll_mode(evse)
+    return client, evse
+
+def test_reused_until_changed():
+    """Même objet sans changement, last_seen rafraîchi une fois par intervalle"""
+    client, evse = make_client()
+    first = client.get_evse(SERIAL)
+    assert client.get_evse(SERIAL) is first
+    interval = first['poll_interval']
+    # Trames sans changement: last_seen avance sans nouvelle version
+    evse.last_seen = first['last_seen'] + timedelta(seconds=interval)
+    refreshed = client.get_evse(SERIAL)
+    assert refreshed is not first and refreshed['last_seen'] == evse.last_seen
+    # Configuration des intervalles modifiée: prise en compte quand
+    # l'interrogation est replanifiée
+    client.communicator.poll_intervals[refreshed['state']] = interval / 2
+    assert client.get_evse(SERIAL) is refreshed
+    client.communicator._update_poll_mode(evse)
+    assert client.get_evse(SERIAL)['poll_interval'] == interval / 2
+
+async def failed_login(client, evse):
+    login = asyncio.ensure_future(evse.login("000000"))
+    await asyncio.sleep(0.01)
+    during = client.get_evse(SERIAL)
+    assert not await login
+    return during, client.get_evse(SERIAL)
+
+def test_session_transitions():
+    """Un échec de connexion (AUTHENTICATING -> DISCONNECTED) invalide l'instantané"""
+    client, evse = make_client()
+    during, after = run_virtual(failed_login(client, evse))
+    assert during['session'] == SessionState.AUTHENTICATING
+    assert after['session'] == SessionState.DISCONNECTED
+
+if __name__ == "__main__":
+    print("🧪 Test des instantanés d'EVSE...")
+    test_reused_until_changed()
+    test_session_transitions()
+    print("   ✅ Instantanés invalidés à chaque changement")
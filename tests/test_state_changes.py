@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test de la détection de changements
+Les trames de statut identiques (ou dans la bande morte) ne déclenchent
+plus d'événement, les événements émis portent les champs modifiés
+"""
+
+import asyncio
+import os
+import sys
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator, EVSEState, DEFAULT_DEADBANDS
+from protocol.datagrams import SingleACStatus, SingleACStatusResponse
+
+from helpers import make_communicator
+
+SERIAL = "1368844619649410"
+
+def status(**values):
+    datagram = SingleACStatus()
+    datagram.set_device_serial(SERIAL)
+    datagram.l1_voltage = 230.0
+    datagram.l1_electricity = 16.0
+    datagram.current_power = 3680
+    datagram.gun_state = 2
+    for name, value in values.items():
+        setattr(datagram, name, value)
+    return datagram
+
+def test_deadbands():
+    """Un champ avec bande morte n'est signalé qu'après un écart suffisant"""
+    state = EVSEState()
+    first = state.update({'l1_voltage': 230.0, 'gun_state': 0}, DEFAULT_DEADBANDS)
+    assert first == {'l1_voltage': 230.0, 'gun_state': 0}
+    assert state.update({'l1_voltage': 230.3, 'gun_state': 0}, DEFAULT_DEADBANDS) == {}
+    # La dernière valeur est toujours disponible, même sans événement
+    assert state.l1_voltage == 230.3
+    # L'écart est mesuré depuis la dernière valeur signalée (230.0)
+    assert state.update({'l1_voltage': 230.6}, DEFAULT_DEADBANDS) == {'l1_voltage': 230.6}
+    assert state.update({'gun_state': 1}, DEFAULT_DEADBANDS) == {'gun_state': 1}
+    # Sans bande morte, tout changement est signalé
+    assert state.update({'l1_voltage': 230.7}) == {'l1_voltage': 230.7}
+
+async def run_status_frames():
+    communicator = make_communicator(Communicator)
+    events = []
+
+    async def callback(event, evse, changes):
+        events.append((event, changes))
+
+    communicator.add_callback('test', callback)
+    addr = ('192.168.1.50', 28376)
+    frames = [
+        status(),
+        status(),                        # identique
+        status(l1_voltage=230.2),        # dans la bande morte
+        status(current_power=3685),      # dans la bande morte
+        status(l1_electricity=16.1),     # hors bande morte
+        status(l1_electricity=16.1, gun_state=1),
+    ]
+    for datagram in frames:
+        await communicator._process_datagram(datagram, addr)
+    return communicator, events
+
+def test_status_events():
+    """Seules les trames qui changent quelque chose déclenchent un événement"""
+    communicator, events = asyncio.run(run_status_frames())
+    state_events = [changes for event, changes in events if event == 'evse_state_changed']
+    assert len(state_events) == 3
+    assert 'l1_voltage' in state_events[0]
+    assert state_events[1] == {'l1_electricity': 16.1}
+    assert state_events[2] == {'gun_state': 1}
+    assert communicator.events_suppressed['evse_state_changed'] == 3
+    assert communicator.events_emitted['evse_state_changed'] == 3
+    assert communicator.field_changes['gun_state'] == 2
+    # Chaque trame de statut reste acquittée
+    acks = [frame for frame in communicator.transport.sent
+            if int.from_bytes(frame[19:21], 'big') == SingleACStatusResponse.COMMAND]
+    assert len(acks) == 6
+
+if __name__ == "__main__":
+    print("🧪 Test de la détection de changements...")
+    test_deadbands()
+    test_status_events()
+    print("   ✅ Événements émis uniquement sur changement")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test de l'attente de découverte d'un EVSE
+wait_for_evse() rend la main dès que le broadcast de l'EVSE est traité,
+au lieu d'attendre un délai fixe
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Ajouter le path vers le protocole dans custom_components
+# Utilise le chemin relatif depuis ce fichier
+test_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(test_dir)
+evse_module_path = os.path.join(project_root, 'custom_components', 'evsemasterudp')
+sys.path.insert(0, evse_module_path)
+
+from protocol.communicator import Communicator
+from protocol.datagrams import Login
+
+from helpers import make_communicator
+
+SERIAL = "1368844619649410"
+ADDR = ('192.168.1.50', 28376)
+
+def broadcast(serial=SERIAL):
+    datagram = Login()
+    datagram.set_device_serial(serial)
+    datagram.brand = "Morec"
+    return datagram
+
+async def wait_then_broadcast():
+    communicator = make_communicator(Communicator)
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.05, lambda: asyncio.ensure_future(
+        communicator._process_datagram(broadcast(), ADDR)))
+    start = time.monotonic()
+    evse = await communicator.wait_for_evse(SERIAL, 5)
+    return evse, time.monotonic() - start, communicator
+
+def test_returns_on_broadcast():
+    """L'attente se termine dès le broadcast, une fois le datagramme traité"""
+    evse, elapsed, communicator = asyncio.run(wait_then_broadcast())
+    assert evse is not None and evse.info.serial == SERIAL
+    assert evse.info.brand == "Morec"
+    assert elapsed < 1
+    assert not communicator._evse_waiters
+
+async def already_known():
+    communicator = make_communicator(Communicator)
+    await communicator._process_datagram(broadcast(), ADDR)
+    start = time.monotonic()
+    evse = await communicator.wait_for_evse(SERIAL, 5)
+    return evse, time.monotonic() - start
+
+def test_returns_immediately_when_known():
+    """Un EVSE déjà vu en ligne est rendu sans attendre"""
+    evse, elapsed = asyncio.run(already_known())
+    assert evse is not None
+    assert elapsed < 0.01
+
+async def other_serial_then_timeout():
+    communicator = make_communicator(Communicator)
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.01, lambda: asyncio.ensure_future(
+        communicator._process_datagram(broadcast("00000000000000ff"), ADDR)))
+    evse = await communicator.wait_for_evse(SERIAL, 0.1)
+    return evse, communicator
+
+def test_timeout():
+    """Sans broadcast de cet EVSE, l'attente expire et rend None"""
+    evse, communicator = asyncio.run(other_serial_then_timeout())
+    assert evse is None
+    assert not communicator._evse_waiters
+
+if __name__ == "__main__":
+    print("🧪 Test de wait_for_evse...")
+    test_returns_on_broadcast()
+    test_returns_immediately_when_known()
+    test_timeout()
+    print("   ✅ Découverte sans délai fixe")